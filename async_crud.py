@@ -0,0 +1,60 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models, schemas, cache, jobs, facets
+from crud import item_to_dict, item_media_to_dict
+
+# 비동기 라우트에서 쓰는 crud 함수 (crud.py 의 같은 이름 함수와 동작이 같다)
+
+# ID로 제품 불러오기
+async def get_item(db: AsyncSession, item_id: int):
+    result = await db.execute(select(models.Item).where(models.Item.id == item_id))
+    return result.scalars().first()
+
+# 캐시를 거쳐 제품 상세 불러오기
+async def get_item_cached(db: AsyncSession, item_id: int):
+    async def load():
+        return item_to_dict(await get_item(db, item_id))
+    return await cache.get_or_load_async(f"item:{item_id}", load)
+
+# 캐시를 거쳐 제품 미디어 경로 불러오기
+async def get_item_media_cached(db: AsyncSession, item_id: int):
+    async def load():
+        return item_media_to_dict(await get_item(db, item_id))
+    return await cache.get_or_load_async(f"item_media:{item_id}", load)
+
+# 제품 생성 (동영상이 있으면 GPU 복원 작업도 같은 트랜잭션으로 등록, 패싯 제품 수도 함께 더한다)
+async def create_item(db: AsyncSession, item: schemas.ItemSchema, image_path: str, video_path: str):
+    # 가격 컬럼은 정수이므로 저장 값과 패싯 가격대 모두 정수로 바꾼 가격을 쓴다
+    price = None if item.price is None else int(item.price)
+    db_item = models.Item(
+        name=item.name,
+        image=image_path,
+        splat=None,
+        video=video_path,
+        description=item.description,
+        price=price,
+        category_id=item.category_id
+    )
+    db.add(db_item)
+    if video_path:
+        await db.flush()
+        jobs.enqueue(db, db_item.id, video_path)
+    change = facets.item_count_change(db.get_bind().dialect.name, [(item.category_id, price)])
+    if change:
+        await db.execute(*change)
+    await db.commit()
+    await db.refresh(db_item)
+    # Redis 캐시면 네트워크 왕복이므로 이벤트 루프를 막지 않도록 스레드풀에서 실행한다
+    await run_in_threadpool(cache.invalidate_item_lists)
+    if video_path:
+        jobs.notify()
+    return db_item
+
+# 제품의 가장 최근 GPU 복원 작업
+async def get_latest_gpu_job(db: AsyncSession, item_id: int):
+    result = await db.execute(
+        select(models.GpuJob).where(models.GpuJob.item_id == item_id).order_by(models.GpuJob.id.desc()).limit(1)
+    )
+    return result.scalars().first()
@@ -0,0 +1,460 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+# /api 의 모든 라우트와 /ws 에 동시에 요청을 보내 라우트별 지연 시간(p50/p95/p99)과 처리량을 잰다.
+#
+#   python bench_load.py --items 10000 --requests 200 --concurrency 32
+#   python bench_load.py --compare bench-load-<이전 커밋>.json
+#
+# - 임시 디렉터리의 새 SQLite DB(또는 --db-url)에 사용자/카테고리/제품/주문/리뷰를 채운다
+# - S3 는 moto, GPU 서버는 gpu_stub 을 프로세스 안에서 띄워 외부로 나가는 요청이 없다
+# - 요청은 httpx ASGITransport 로 앱에 직접 보낸다 (네트워크/uvicorn 비용은 포함되지 않는다)
+# - ASGITransport 는 앱이 끝날 때까지 기다리므로 BackgroundTasks(이미지 파생본, .splat 변환) 시간도 지연에 포함된다
+# - mixed 모드의 라우트별 rps 는 전체 실행 시간 기준이다 (라우트 하나의 최대 처리량은 --mode isolated)
+# - 결과는 JSON 으로 저장해 커밋끼리 비교한다
+
+parser = argparse.ArgumentParser(description="Load benchmark for every /api route and /ws")
+parser.add_argument("--users", type=int, default=1000)
+parser.add_argument("--categories", type=int, default=20)
+parser.add_argument("--items", type=int, default=10000)
+parser.add_argument("--orders", type=int, default=20000)
+parser.add_argument("--reviews", type=int, default=20000)
+parser.add_argument("--requests", type=int, default=200, help="requests per route")
+parser.add_argument("--concurrency", type=int, default=32)
+parser.add_argument("--mode", choices=["mixed", "isolated"], default="mixed",
+                    help="mixed: all routes at once; isolated: one route at a time")
+parser.add_argument("--routes", nargs="*", help="only run routes containing one of these substrings")
+parser.add_argument("--db-url", help="scratch database (default: new SQLite file in a temp dir)")
+parser.add_argument("--output", help="result JSON path (default: bench-load-<commit>.json)")
+parser.add_argument("--compare", help="previous result JSON to diff against")
+parser.add_argument("--seed", type=int, default=1)
+args = parser.parse_args()
+
+# 앱 모듈을 불러오기 전에 설정한다 (database/crud/jobs 가 import 시점에 환경 변수를 읽는다)
+scratch_dir = tempfile.mkdtemp(prefix="bench-load-")
+os.environ["DB_URL"] = args.db_url or f"sqlite:///{scratch_dir}/bench.db"
+os.environ.pop("DB_READ_URL", None)
+os.environ.pop("CACHE_URL", None)
+os.environ.setdefault("S3_BUCKET", "bench-bucket")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.pop("S3_ENDPOINT_URL", None)
+os.environ["GPU_WORKER_ENABLED"] = "true"
+os.environ["GPU_SERVER_URL"] = "http://gpu-stub"
+os.environ.setdefault("GPU_PROGRESS_POLL_INTERVAL", "0.2")
+os.environ.setdefault("STUB_PROCESS_SECONDS", "1")
+
+from moto import mock_aws
+
+mock = mock_aws()
+mock.start()
+
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+from PIL import Image
+from sqlalchemy import insert
+
+import crud
+import facets
+import gpu
+import gpu_stub
+import main
+import media
+import migrations
+import models
+import reports
+from database import engine
+
+# moto 는 이 프로세스 안에서만 S3 를 흉내 내므로 미디어 변환도 같은 프로세스의 스레드에서 실행한다
+media._pool = ThreadPoolExecutor(max_workers=media.MEDIA_WORKERS)
+# GPU 서버 호출은 gpu_stub 앱으로 직접 보낸다
+gpu._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=gpu_stub.app), base_url="http://gpu-stub")
+
+PLY_BUCKET = "3d-modeling-mall"
+PLY_UUID = "bench"
+WORDS = ["셔츠", "바지", "모자", "가방", "신발", "shirt", "pants", "bag", "chair", "lamp", "table", "mug"]
+
+
+def png_bytes(size=(64, 64)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (120, 80, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def ply_bytes(count=256) -> bytes:
+    names = ["x", "y", "z", "f_dc_0", "f_dc_1", "f_dc_2", "opacity",
+             "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    header = "ply\nformat binary_little_endian 1.0\nelement vertex %d\n" % count
+    header += "".join(f"property float {name}\n" for name in names) + "end_header\n"
+    data = np.random.default_rng(0).normal(size=(count, len(names))).astype("<f4")
+    return header.encode() + data.tobytes()
+
+
+# ---------------------------------------------------------------------------
+# 시드 데이터
+# ---------------------------------------------------------------------------
+
+def seed(rng: random.Random) -> dict:
+    migrations.migrate(engine)
+    s3 = crud.get_s3_client()
+    for bucket in (crud.bucket_name, PLY_BUCKET):
+        s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "ap-northeast-2"})
+    s3.put_object(Bucket=PLY_BUCKET, Key=f"{PLY_UUID}.ply", Body=ply_bytes())
+    splat = media.convert_ply_to_splat(ply_bytes(4096))
+    s3.put_object(Bucket=crud.bucket_name, Key="bench.splat", Body=splat)
+    splat_url = crud.s3_url_for(crud.bucket_name, "bench.splat")
+
+    other_category = args.categories + 1
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"email": f"user{i}@example.com", "password": "password"} for i in range(1, args.users + 1)
+        ])
+        conn.execute(insert(models.Category), [{"name": f"category {i}"} for i in range(1, args.categories + 1)])
+        # DELETE /api/category 가 지울 '기타' 카테고리
+        conn.execute(insert(models.Category), [{"name": "기타"}])
+        conn.execute(insert(models.Item), [
+            {
+                "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                "description": " ".join(rng.choice(WORDS) for _ in range(8)),
+                "price": rng.randint(1, 500) * 100,
+                "category_id": rng.randint(1, args.categories),
+                "image": crud.s3_url_for(crud.bucket_name, f"items/{i}.jpg"),
+                "video": crud.s3_url_for(crud.bucket_name, f"items/{i}.mp4"),
+                "compact_splat": splat_url,
+            }
+            for i in range(1, args.items + 1)
+        ])
+        conn.execute(insert(models.Item), [
+            {"name": f"기타 {i}", "description": "기타", "price": 100, "category_id": other_category}
+            for i in range(20)
+        ])
+        conn.execute(insert(models.Order), [
+            {
+                "user_id": rng.randint(1, args.users),
+                "item_id": rng.randint(1, args.items),
+                "price": 1000,
+                "count": rng.randint(1, 3),
+                "pay": rng.random() < 0.5,
+                "created_at": datetime.utcnow() - timedelta(days=rng.randint(0, 89)),
+            }
+            for _ in range(args.orders)
+        ])
+        conn.execute(insert(models.Review), [
+            {
+                "user_id": rng.randint(1, args.users),
+                "item_id": rng.randint(1, args.items),
+                "content": " ".join(rng.choice(WORDS) for _ in range(5)),
+                "star": rng.randint(1, 5),
+            }
+            for _ in range(args.reviews)
+        ])
+        # GPU 작업은 이미 끝난 상태로 넣어 워커가 다시 보내지 않게 한다
+        conn.execute(insert(models.GpuJob), [
+            {"item_id": i, "video_uuid": f"items/{i}.mp4", "status": "done"} for i in range(1, min(args.items, 100) + 1)
+        ])
+        crud.rebuild_review_stats(conn)
+        reports.rebuild_sales_rollups(conn)
+        facets.rebuild_facets(conn)
+
+    return {"png": png_bytes(), "order_count": args.orders}
+
+
+# ---------------------------------------------------------------------------
+# 라우트별 요청 만들기: (method, path) -> async (ctx, rng, i) -> httpx 요청 인자
+# S3 에 미리 올려 둬야 하는 요청은 여기서 준비한다 (측정 시간에 포함되지 않는다)
+# ---------------------------------------------------------------------------
+
+def random_item(rng):
+    return rng.randint(1, args.items)
+
+
+def random_user(rng):
+    return rng.randint(1, args.users)
+
+
+async def uploads_complete(ctx, rng, i):
+    key = f"bench/{uuid.uuid4()}.mp4"
+
+    def prepare():
+        upload = crud.get_s3_client().create_multipart_upload(Bucket=crud.bucket_name, Key=key, ContentType="video/mp4")
+        part = crud.get_s3_client().upload_part(
+            Bucket=crud.bucket_name, Key=key, UploadId=upload["UploadId"], PartNumber=1, Body=b"v" * 1024
+        )
+        return upload["UploadId"], part["ETag"]
+
+    upload_id, etag = await asyncio.to_thread(prepare)
+    return {"json": {"key": key, "upload_id": upload_id, "parts": [{"part_number": 1, "etag": etag}]}}
+
+
+async def item_media(ctx, rng, i):
+    item_id = random_item(rng)
+    key = f"{crud.item_media_key_prefix(item_id)}{uuid.uuid4()}.png"
+    await asyncio.to_thread(
+        crud.get_s3_client().put_object, Bucket=crud.bucket_name, Key=key, Body=ctx["png"], ContentType="image/png"
+    )
+    return {"path": {"item_id": item_id}, "json": {"kind": "image", "key": key, "size": len(ctx["png"])}}
+
+
+SORTS = ["id", "rating", "price", "price_desc", "newest"]
+
+SCENARIOS = {
+    ("POST", "/api/join/"): lambda ctx, rng, i: {
+        "json": {"email": f"bench-{uuid.uuid4().hex}@example.com", "password": "password"}},
+    ("POST", "/api/login"): lambda ctx, rng, i: {
+        "json": {"email": f"user{random_user(rng)}@example.com", "password": "password"}},
+    ("GET", "/api/users/"): lambda ctx, rng, i: {"params": {"limit": 100}},
+    ("POST", "/api/items/"): lambda ctx, rng, i: {
+        "data": {"name": f"bench {i}", "description": "bench item", "price": "1000",
+                 "category_id": str(rng.randint(1, args.categories))},
+        "files": {"image": ("bench.png", ctx["png"], "image/png"),
+                  "video": ("bench.mp4", b"v" * 4096, "video/mp4")}},
+    ("POST", "/api/uploads/presign"): lambda ctx, rng, i: {
+        "json": {"item_id": random_item(rng), "kind": "video", "filename": "bench.mp4", "content_type": "video/mp4",
+                 "size": rng.choice([1024, 64 * 1024 * 1024])}},
+    ("POST", "/api/uploads/complete"): uploads_complete,
+    ("POST", "/api/items/{item_id}/media"): item_media,
+    ("GET", "/api/items/"): lambda ctx, rng, i: {
+        "params": {"sort": rng.choice(SORTS), "limit": rng.choice([20, 100]), **rng.choice([
+            {},
+            {"category_id": rng.sample(range(1, args.categories + 1), min(3, args.categories))},
+            {"min_price": 10000, "max_price": 30000},
+        ])}},
+    ("GET", "/api/items/category/{category_id}"): lambda ctx, rng, i: {
+        "path": {"category_id": rng.randint(1, args.categories)},
+        "params": {"sort": rng.choice(SORTS), "limit": 20,
+                   **rng.choice([{}, {"min_price": rng.randint(0, 400) * 100}])}},
+    ("GET", "/api/items/facets"): lambda ctx, rng, i: {
+        "params": rng.choice([{}, {"category_id": rng.randint(1, args.categories)}])},
+    ("GET", "/api/items/search/{item_name}"): lambda ctx, rng, i: {
+        "path": {"item_name": rng.choice(WORDS + ["셔", "la"])}, "params": {"limit": 20}},
+    ("GET", "/api/items/{item_id}"): lambda ctx, rng, i: {"path": {"item_id": random_item(rng)}},
+    ("POST", "/api/categorys"): lambda ctx, rng, i: {"json": {"name": f"bench {i}"}},
+    ("GET", "/api/reviews/"): lambda ctx, rng, i: {"params": {"limit": 100}},
+    ("POST", "/api/items/{item_id}/reviews/"): lambda ctx, rng, i: (lambda item_id: {
+        "path": {"item_id": item_id},
+        "json": {"content": "bench", "star": rng.randint(1, 5), "user_id": random_user(rng), "item_id": item_id}})(
+        random_item(rng)),
+    ("GET", "/api/items/{item_id}/reviews/"): lambda ctx, rng, i: {"path": {"item_id": random_item(rng)}},
+    ("GET", "/api/reviews/user/{user_id}"): lambda ctx, rng, i: {"path": {"user_id": random_user(rng)}},
+    ("POST", "/api/order/"): lambda ctx, rng, i: {
+        "json": {"user_id": random_user(rng), "item_id": random_item(rng), "price": 0, "count": 1, "pay": False}},
+    ("POST", "/api/orders/batch"): lambda ctx, rng, i: {
+        "json": {"orders": [{"user_id": random_user(rng), "item_id": random_item(rng), "count": 1} for _ in range(5)]}},
+    ("GET", "/api/orders/user/{user_id}"): lambda ctx, rng, i: {"path": {"user_id": random_user(rng)}},
+    ("GET", "/api/orders/user/{user_id}/history"): lambda ctx, rng, i: {
+        "path": {"user_id": random_user(rng)}, "params": {"limit": 20}},
+    ("GET", "/api/orders/items/{item_id}"): lambda ctx, rng, i: {"path": {"item_id": random_item(rng)}},
+    ("PUT", "/api/order/pay/{order_id}"): lambda ctx, rng, i: {"path": {"order_id": rng.randint(1, ctx["order_count"])}},
+    ("GET", "/api/items/{item_id}/multi/"): lambda ctx, rng, i: {"path": {"item_id": random_item(rng)}},
+    ("GET", "/api/items/{item_id}/image/"): lambda ctx, rng, i: {"path": {"item_id": random_item(rng)}},
+    ("GET", "/api/items/{item_id}/gpu-job"): lambda ctx, rng, i: {
+        "path": {"item_id": rng.randint(1, min(args.items, 100))}},
+    ("PUT", "/api/receive"): lambda ctx, rng, i: {"params": {"item_id": random_item(rng), "splat_uuid": PLY_UUID}},
+    ("GET", "/api/items/{item_id}/splat"): lambda ctx, rng, i: {
+        "path": {"item_id": random_item(rng)}, "headers": {"Range": "bytes=0-65535"}},
+    ("POST", "/api/items/import"): lambda ctx, rng, i: {
+        "params": {"format": "jsonl"},
+        "files": {"file": ("catalog.jsonl", b"".join(
+            json.dumps({"name": f"import {i}-{n}", "price": 1000 + n, "category_id": rng.randint(1, args.categories)}).encode()
+            + b"\n" for n in range(100)), "application/x-ndjson")}},
+    ("GET", "/api/export/{table}"): lambda ctx, rng, i: {"path": {"table": rng.choice(["items", "orders"])}},
+    ("GET", "/api/reports/top-items"): lambda ctx, rng, i: {
+        "params": {"by": rng.choice(["revenue", "units"]), "limit": 20}},
+    ("GET", "/api/reports/category-revenue"): lambda ctx, rng, i: {"params": {"daily": rng.choice(["true", "false"])}},
+    ("DELETE", "/api/category"): lambda ctx, rng, i: {},
+    ("GET", "/api/cache/stats"): lambda ctx, rng, i: {},
+}
+
+
+def api_routes():
+    for route in main.api_router.routes:
+        for method in sorted(route.methods):
+            yield method, route.path
+
+
+# ---------------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------------
+
+# 최소한의 ASGI WebSocket 클라이언트: 연결 -> 'send' 로 진행 상황 구독 -> 첫 메시지 수신 -> 종료
+async def websocket_session(timeout: float = 5.0):
+    to_app, from_app = asyncio.Queue(), asyncio.Queue()
+    scope = {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+        "path": "/ws", "raw_path": b"/ws", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "subprotocols": [],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await to_app.put({"type": "websocket.connect"})
+    app_task = asyncio.create_task(main.app(scope, to_app.get, from_app.put))
+    try:
+        message = await asyncio.wait_for(from_app.get(), timeout)
+        if message["type"] != "websocket.accept":
+            return 403
+        await to_app.put({"type": "websocket.receive", "text": "send"})
+        message = await asyncio.wait_for(from_app.get(), timeout)
+        return 101 if message["type"] == "websocket.send" else 500
+    finally:
+        await to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(app_task, timeout)
+
+
+async def run_one(client, key, ctx, rng, i):
+    method, path = key
+    if key == ("WS", "/ws"):
+        start = time.perf_counter()
+        status = await websocket_session()
+        return status, time.perf_counter() - start
+
+    builder = SCENARIOS[key]
+    request = builder(ctx, rng, i)
+    if asyncio.iscoroutine(request):
+        request = await request
+    url = path.format(**request.pop("path", {}))
+    start = time.perf_counter()
+    response = await client.request(method, url, **request)
+    return response.status_code, time.perf_counter() - start
+
+
+async def drive(client, jobs, ctx, rng, results):
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker():
+        while not queue.empty():
+            key, i = queue.get_nowait()
+            try:
+                status, elapsed = await run_one(client, key, ctx, rng, i)
+            except Exception as e:
+                results[key]["errors"].append(repr(e))
+                continue
+            results[key]["latencies"].append(elapsed)
+            results[key]["statuses"][status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return time.perf_counter() - start
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(data, elapsed):
+    latencies = sorted(data["latencies"])
+    ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "count": len(latencies),
+        "errors": len(data["errors"]),
+        "statuses": {str(status): count for status, count in sorted(data["statuses"].items())},
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "sample_errors": data["errors"][:3],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(routes, previous=None):
+    print(f"{'route':<48}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}  statuses")
+    for name, stats in routes.items():
+        line = (f"{name:<48}{stats['count']:>6}{stats['p50_ms'] or 0:>9.2f}{stats['p95_ms'] or 0:>9.2f}"
+                f"{stats['p99_ms'] or 0:>9.2f}{stats['rps'] or 0:>9.1f}  {stats['statuses']}")
+        if stats["errors"]:
+            line += f" errors={stats['errors']}"
+        before = (previous or {}).get(name)
+        if before and before.get("p95_ms") and stats["p95_ms"]:
+            line += f"  p95 {100 * (stats['p95_ms'] / before['p95_ms'] - 1):+.0f}%"
+        print(line)
+
+
+async def run():
+    rng = random.Random(args.seed)
+    print(f"Seeding scratch database {os.environ['DB_URL']}")
+    ctx = await asyncio.to_thread(seed, rng)
+
+    keys = [key for key in api_routes()]
+    skipped = [f"{method} {path}" for method, path in keys if (method, path) not in SCENARIOS]
+    keys = [key for key in keys if key in SCENARIOS] + [("WS", "/ws")]
+    if args.routes:
+        keys = [key for key in keys if any(part in f"{key[0]} {key[1]}" for part in args.routes)]
+    for name in skipped:
+        print(f"No scenario for {name}, skipping")
+
+    results = defaultdict(lambda: {"latencies": [], "statuses": Counter(), "errors": []})
+    elapsed = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if args.mode == "mixed":
+                jobs = [(key, i) for key in keys for i in range(args.requests)]
+                rng.shuffle(jobs)
+                total = await drive(client, jobs, ctx, rng, results)
+                elapsed = {key: total for key in keys}
+            else:
+                for key in keys:
+                    elapsed[key] = await drive(client, [(key, i) for i in range(args.requests)], ctx, rng, results)
+                total = sum(elapsed.values())
+
+    routes = {f"{method} {path}": summarize(results[(method, path)], elapsed[(method, path)]) for method, path in keys}
+    all_latencies = [value for data in results.values() for value in data["latencies"]]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "args": vars(args),
+            "skipped_routes": skipped,
+        },
+        "total": summarize({"latencies": all_latencies, "statuses": Counter(), "errors": []}, total),
+        "routes": routes,
+    }
+
+
+def cli():
+    report = asyncio.run(run())
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["routes"]
+    print_report(report["routes"], previous)
+    total = report["total"]
+    print(f"total: {total['count']} requests, p50 {total['p50_ms']} ms, p95 {total['p95_ms']} ms, "
+          f"p99 {total['p99_ms']} ms, {total['rps']} req/s")
+
+    output = args.output or f"bench-load-{report['meta']['commit']}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Saved {output}")
+    mock.stop()
+
+
+if __name__ == "__main__":
+    cli()
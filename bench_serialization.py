@@ -0,0 +1,105 @@
+import argparse
+import statistics
+import time
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import crud
+import models
+import schemas
+import serialization
+
+# 목록 응답 직렬화 비교: ORM 객체 + Pydantic 검증 (기존) vs 컬럼 튜플 + orjson (빠른 경로)
+#   python bench_serialization.py --rows 100 --repeat 300
+
+
+def seed(db, rows: int):
+    db.add(models.Category(name="bench"))
+    db.add(models.User(email="bench@example.com", password="x"))
+    db.flush()
+    db.add_all([
+        models.Item(
+            name=f"item {i}", description="description " * 8, price=1000 + i, category_id=1,
+            image=f"https://bucket.s3.amazonaws.com/{i}.jpg",
+            image_variants={"thumb": {"webp": f"https://bucket.s3.amazonaws.com/{i}.jpg.thumb.webp"}},
+            review_count=i % 7, star_sum=(i % 7) * 4, rating=4.0 if i % 7 else 0.0,
+        )
+        for i in range(rows)
+    ])
+    db.flush()
+    db.add_all([models.Review(content=f"review {i}", star=i % 5 + 1, user_id=1, item_id=i % rows + 1) for i in range(rows)])
+    db.add_all([models.Order(user_id=1, item_id=i % rows + 1, price=1000, count=1, pay=False) for i in range(rows)])
+    db.commit()
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-endpoint serialization paths")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    # 실제 DB 를 건드리지 않도록 메모리 DB 를 쓴다
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.rows)
+
+    item_page = TypeAdapter(schemas.ItemPage)
+    reviews = TypeAdapter(List[schemas.ReviewSchema])
+    orders = TypeAdapter(List[schemas.OrderSchema])
+
+    def orm(query, adapter, wrap=None):
+        def run():
+            db.expunge_all()
+            rows = query().all()
+            content = wrap(rows) if wrap else rows
+            adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+        return run
+
+    def fast(query, schema, wrap=None):
+        def run():
+            rows = serialization.rows_to_dicts(query().all(), schema)
+            orjson.dumps(wrap(rows) if wrap else rows)
+        return run
+
+    cases = {
+        "items": (
+            # 기존 경로: item_to_dict 로 캐시용 dict 를 만들고 response_model 로 다시 검증/직렬화
+            orm(lambda: db.query(models.Item).limit(args.rows), item_page,
+                lambda rows: {"items": [crud.item_to_dict(row) for row in rows], "next_cursor": None}),
+            fast(lambda: db.query(*crud.ITEM_COLUMNS).limit(args.rows), schemas.ItemResponseModel,
+                 lambda rows: {"items": rows, "next_cursor": None}),
+        ),
+        "reviews": (
+            orm(lambda: db.query(models.Review).limit(args.rows), reviews),
+            fast(lambda: db.query(*crud.REVIEW_COLUMNS).limit(args.rows), schemas.ReviewSchema),
+        ),
+        "orders": (
+            orm(lambda: db.query(models.Order).limit(args.rows), orders),
+            fast(lambda: db.query(*crud.ORDER_COLUMNS).limit(args.rows), schemas.OrderSchema),
+        ),
+    }
+
+    print(f"{'endpoint':<10}{'orm+pydantic ms':>18}{'columns+orjson ms':>20}{'speedup':>10}")
+    for name, (orm_path, fast_path) in cases.items():
+        orm_ms = timed(orm_path, args.repeat)
+        fast_ms = timed(fast_path, args.repeat)
+        print(f"{name:<10}{orm_ms:>18.3f}{fast_ms:>20.3f}{orm_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 워커 하나가 뜨는 데 걸리는 시간을 잰다: 새 프로세스에서 main 불러오기, lifespan 시작, 준비 완료(/healthz/ready), 첫 요청.
+#
+#   python bench_startup.py --items 10000 --runs 5
+#
+# - 임시 디렉터리의 SQLite DB 를 migrate 하고 제품을 채운 뒤, 실행마다 새 파이썬 프로세스를 띄운다
+# - cold: 준비 단계를 끄고(WARMUP_ENABLED=false) 시작하자마자 요청한다 (클라이언트/커넥션/캐시가 첫 요청에서 만들어진다)
+# - warm: /healthz/ready 가 200 이 될 때까지 기다렸다가 요청한다 (로드 밸런서가 준비된 워커에만 보내는 경우)
+# - 요청은 ASGI 앱을 직접 호출한다 (uvicorn/네트워크 비용은 포함되지 않는다)
+# - GPU 워커는 끄고, S3 는 클라이언트만 만들고 호출하지 않는다
+
+parser = argparse.ArgumentParser(description="Worker startup benchmark: import, lifespan, readiness and first requests")
+parser.add_argument("--categories", type=int, default=20)
+parser.add_argument("--items", type=int, default=10000)
+parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode")
+parser.add_argument("--paths", nargs="*", default=["/api/items/", "/api/items/facets", "/api/items/?sort=rating"],
+                    help="requests sent in order after startup")
+parser.add_argument("--ready-timeout", type=float, default=60)
+parser.add_argument("--output", help="result JSON path (default: bench-startup-<commit>.json)")
+parser.add_argument("--child", choices=["cold", "warm"], help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+MODES = ("cold", "warm")
+
+
+# ---------------------------------------------------------------------------
+# 자식 프로세스: 한 번 시작해서 시간을 재고 JSON 한 줄을 출력한다
+# ---------------------------------------------------------------------------
+
+# 최소한의 ASGI HTTP 클라이언트 (httpx 를 불러오면 main 이 불러오지 않는 모듈 비용이 섞인다)
+async def asgi_get(app, target: str) -> int:
+    path, _, query = target.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def child_run(start: float) -> dict:
+    import_start = time.perf_counter()
+    import main
+    result = {"import_ms": (time.perf_counter() - import_start) * 1000}
+
+    lifespan_start = time.perf_counter()
+    async with main.lifespan(main.app):
+        result["lifespan_ms"] = (time.perf_counter() - lifespan_start) * 1000
+        if args.child == "warm":
+            deadline = time.perf_counter() + args.ready_timeout
+            while await asgi_get(main.app, "/healthz/ready") != 200:
+                if time.perf_counter() > deadline:
+                    raise SystemExit("worker did not become ready")
+                await asyncio.sleep(0.005)
+        result["ready_ms"] = (time.perf_counter() - lifespan_start) * 1000
+
+        requests = {}
+        for path in args.paths:
+            request_start = time.perf_counter()
+            status = await asgi_get(main.app, path)
+            requests[path] = {"status": status, "ms": (time.perf_counter() - request_start) * 1000}
+            if "first_response_ms" not in result:
+                result["first_response_ms"] = (time.perf_counter() - start) * 1000
+        result["requests"] = requests
+    return result
+
+
+def child():
+    start = time.perf_counter()
+    print(json.dumps(asyncio.run(child_run(start))))
+
+
+# ---------------------------------------------------------------------------
+# 부모 프로세스: DB 를 준비하고 모드별로 자식을 띄운다
+# ---------------------------------------------------------------------------
+
+# 앱 모듈은 환경 변수를 설정한 뒤에 불러온다 (database 가 import 시점에 DB_URL 을 읽는다)
+def seed(env: dict):
+    os.environ.update(env)
+    from sqlalchemy import insert
+
+    import facets
+    import migrations
+    import models
+    from database import SessionLocal, engine
+
+    migrations.migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Category), [{"name": f"category {i}"} for i in range(1, args.categories + 1)])
+        conn.execute(insert(models.Item), [
+            {
+                "name": f"item {i}", "description": f"bench item {i}",
+                "price": (i % 500 + 1) * 100, "category_id": i % args.categories + 1,
+            }
+            for i in range(1, args.items + 1)
+        ])
+    # 제품을 직접 INSERT 했으므로 패싯 제품 수를 다시 계산한다
+    db = SessionLocal()
+    try:
+        facets.rebuild_facets(db)
+        db.commit()
+    finally:
+        db.close()
+    engine.dispose()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_child(mode: str, env: dict) -> dict:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--paths", *args.paths,
+         "--ready-timeout", str(args.ready_timeout)],
+        env={**env, "WARMUP_ENABLED": "true" if mode == "warm" else "false"},
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def summarize(runs: list) -> dict:
+    metrics = {name: [run[name] for run in runs] for name in ("import_ms", "lifespan_ms", "ready_ms", "first_response_ms", "process_ms")}
+    for path in args.paths:
+        metrics[f"GET {path}"] = [run["requests"][path]["ms"] for run in runs]
+    return {
+        name: {"median": round(statistics.median(values), 2), "min": round(min(values), 2), "max": round(max(values), 2)}
+        for name, values in metrics.items()
+    }
+
+
+def cli():
+    scratch_dir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = dict(os.environ)
+    env.update({
+        "DB_URL": f"sqlite:///{scratch_dir}/bench.db",
+        "GPU_WORKER_ENABLED": "false",
+        "S3_BUCKET": env.get("S3_BUCKET", "bench-bucket"),
+        "AWS_ACCESS_KEY_ID": env.get("AWS_ACCESS_KEY_ID", "bench"),
+        "AWS_SECRET_ACCESS_KEY": env.get("AWS_SECRET_ACCESS_KEY", "bench"),
+    })
+    for name in ("DB_READ_URL", "CACHE_URL", "WS_BROKER_URL", "S3_ENDPOINT_URL"):
+        env.pop(name, None)
+    print(f"Seeding scratch database {env['DB_URL']}")
+    seed(env)
+
+    modes = {}
+    for mode in MODES:
+        runs = [run_child(mode, env) for _ in range(args.runs)]
+        modes[mode] = {"summary": summarize(runs), "runs": runs}
+
+    print(f"{'median ms':<40}" + "".join(f"{mode:>12}" for mode in MODES))
+    for name in modes[MODES[0]]["summary"]:
+        print(f"{name:<40}" + "".join(f"{modes[mode]['summary'][name]['median']:>12.1f}" for mode in MODES))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "modes": modes,
+    }
+    output = args.output or f"bench-startup-{report['meta']['commit']}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    if args.child:
+        child()
+    else:
+        cli()
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from fastapi.concurrency import run_in_threadpool
+
+# 카탈로그 읽기 캐시 설정
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+CACHE_TTL = float(os.getenv("CACHE_TTL", 60))
+# redis://... 를 지정하면 워커끼리 공유하는 캐시를 쓴다
+CACHE_URL = os.getenv("CACHE_URL")
+
+
+# 프로세스 내부 LRU + TTL 캐시
+class LRUTTLCache:
+    remote = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # 세대 번호 같은 카운터는 LRU 로 밀려나면 안 되므로 따로 보관
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # 키가 없을 때만 저장한다 (저장했으면 True)
+    def add(self, key, value, ttl: float = None) -> bool:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.monotonic():
+                return False
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def get_counter(self, key) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+# Redis 호환 클라이언트를 쓰는 공유 캐시 (redis.Redis, fakeredis.FakeRedis 등)
+class RedisCache:
+    # 네트워크를 타므로 비동기 코드에서는 스레드풀에서 호출한다
+    remote = True
+
+    def __init__(self, client, ttl: float = CACHE_TTL, prefix: str = "cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value, default=str), px=int(ttl * 1000))
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        ttl = self.ttl if ttl is None else ttl
+        return bool(self.client.set(self.prefix + key, json.dumps(value, default=str), px=int(ttl * 1000), nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def get_counter(self, key) -> int:
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key) -> int:
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def _create_backend():
+    if CACHE_URL:
+        import redis
+        return RedisCache(redis.Redis.from_url(CACHE_URL))
+    return LRUTTLCache()
+
+
+backend = _create_backend()
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+# 캐시 백엔드 교체 (테스트에서 로컬 대체재를 끼울 때)
+def set_backend(new_backend):
+    global backend
+    backend = new_backend
+
+
+def _record(key: str, result: str):
+    namespace = key.split(":", 1)[0]
+    with _stats_lock:
+        _stats[(namespace, result)] += 1
+
+
+# 캐시에 있으면 돌려주고, 없으면 loader 로 읽어 저장 (None 은 저장하지 않는다)
+def get_or_load(key: str, loader, ttl: float = None):
+    value = backend.get(key)
+    if value is not None:
+        _record(key, "hits")
+        return value
+    _record(key, "misses")
+    value = loader()
+    if value is not None:
+        backend.set(key, value, ttl)
+    return value
+
+
+# get_or_load 의 비동기 버전 (loader 는 코루틴 함수)
+async def get_or_load_async(key: str, loader, ttl: float = None):
+    if backend.remote:
+        value = await run_in_threadpool(backend.get, key)
+    else:
+        value = backend.get(key)
+    if value is not None:
+        _record(key, "hits")
+        return value
+    _record(key, "misses")
+    value = await loader()
+    if value is not None:
+        if backend.remote:
+            await run_in_threadpool(backend.set, key, value, ttl)
+        else:
+            backend.set(key, value, ttl)
+    return value
+
+
+# 목록 페이지 키: 제품이 바뀔 때마다 세대 번호를 올려 이전 페이지를 한꺼번에 무효화한다
+def item_list_key(*params) -> str:
+    generation = backend.get_counter("item_lists:generation")
+    return "item_list:" + ":".join([str(generation)] + ["" if p is None else str(p) for p in params])
+
+
+def invalidate_item_lists():
+    backend.incr("item_lists:generation")
+
+
+# 제품 하나가 바뀌었을 때 상세/미디어 경로와 목록 페이지를 무효화
+def invalidate_item(*item_ids):
+    keys = []
+    for item_id in item_ids:
+        keys += [f"item:{item_id}", f"item_media:{item_id}"]
+    backend.delete(*keys)
+    invalidate_item_lists()
+
+
+def stats() -> dict:
+    with _stats_lock:
+        snapshot = dict(_stats)
+    namespaces = sorted({namespace for namespace, _ in snapshot})
+    result = {}
+    for namespace in namespaces:
+        hits = snapshot.get((namespace, "hits"), 0)
+        misses = snapshot.get((namespace, "misses"), 0)
+        total = hits + misses
+        result[namespace] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+    return result
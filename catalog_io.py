@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import os
+
+import orjson
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import cache
+import facets
+import models
+
+# 공급사 카탈로그 일괄 등록 / 내보내기
+# 가져오기는 CSV 나 JSONL 을 한 줄씩 읽어 CATALOG_CHUNK_SIZE 행마다 INSERT 한 번, 커밋 한 번으로 넣는다.
+# 잘못된 행은 건너뛰고 줄 번호와 이유를 보고한다.
+
+CATALOG_CHUNK_SIZE = int(os.getenv("CATALOG_CHUNK_SIZE", 5000))
+# 보고서에 담는 오류 행 수 상한 (나머지는 개수만 센다)
+CATALOG_MAX_REPORTED_ERRORS = int(os.getenv("CATALOG_MAX_REPORTED_ERRORS", 1000))
+# 내보내기에서 한 번에 읽는 행 수
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+FORMATS = ("csv", "jsonl")
+IMPORT_FIELDS = ("name", "description", "price", "image", "video")
+
+
+def detect_format(filename: str, default: str = "jsonl") -> str:
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension in FORMATS:
+        return extension
+    if extension in ("json", "ndjson"):
+        return "jsonl"
+    return default
+
+
+# 입력을 (줄 번호, dict 또는 파싱 오류) 로 하나씩 돌려준다
+def read_records(text_stream, fmt: str):
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError("each line must be a JSON object")
+            continue
+        yield line_number, record
+
+
+class CatalogImport:
+    def __init__(self, db: Session, create_categories: bool = False, chunk_size: int = CATALOG_CHUNK_SIZE):
+        self.db = db
+        self.create_categories = create_categories
+        self.chunk_size = max(chunk_size, 1)
+        self.categories = {name: category_id for category_id, name in db.execute(
+            select(models.Category.id, models.Category.name)
+        )}
+        self.category_ids = set(self.categories.values())
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+        self.categories_created = 0
+
+    def _error(self, line_number: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < CATALOG_MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def _category_id(self, record: dict) -> int:
+        category_id = record.get("category_id")
+        if category_id not in (None, ""):
+            category_id = int(category_id)
+            if category_id not in self.category_ids:
+                raise ValueError(f"unknown category_id {category_id}")
+            return category_id
+
+        name = (record.get("category") or "").strip()
+        if not name:
+            raise ValueError("category or category_id is required")
+        if name not in self.categories:
+            if not self.create_categories:
+                raise ValueError(f"unknown category '{name}'")
+            # 뒤에서 묶음 INSERT 가 롤백되어도 카테고리는 남도록 바로 커밋한다
+            category_id = self.db.execute(insert(models.Category).values(name=name).returning(models.Category.id)).scalar_one()
+            self.db.commit()
+            self.categories[name] = category_id
+            self.category_ids.add(category_id)
+            self.categories_created += 1
+        return self.categories[name]
+
+    def _row(self, record: dict) -> dict:
+        name = (record.get("name") or "").strip()
+        if not name:
+            raise ValueError("name is required")
+        try:
+            price = int(float(record.get("price")))
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"invalid price {record.get('price')!r}")
+        if price < 0:
+            raise ValueError("price must not be negative")
+        row = {field: record.get(field) or None for field in IMPORT_FIELDS}
+        # 제품 응답의 description 은 필수 문자열이므로 비어 있으면 "" 로 넣는다
+        row.update(name=name, description=record.get("description") or "", price=price,
+                   category_id=self._category_id(record))
+        return row
+
+    def _flush(self, chunk: list):
+        if not chunk:
+            return
+        try:
+            self.db.execute(insert(models.Item), [row for _, row in chunk])
+            facets.record_items(self.db, [(row["category_id"], row["price"]) for _, row in chunk])
+            self.db.commit()
+            self.inserted += len(chunk)
+            return
+        except SQLAlchemyError:
+            self.db.rollback()
+
+        # 묶음 INSERT 가 실패하면 그 묶음만 한 행씩 넣어 어느 행이 문제인지 찾는다
+        for line_number, row in chunk:
+            try:
+                self.db.execute(insert(models.Item), [row])
+                facets.record_items(self.db, [(row["category_id"], row["price"])])
+                self.db.commit()
+                self.inserted += 1
+            except SQLAlchemyError as e:
+                self.db.rollback()
+                self._error(line_number, f"database error: {e.orig if hasattr(e, 'orig') else e}")
+
+    def run(self, records) -> dict:
+        chunk = []
+        for line_number, record in records:
+            if isinstance(record, Exception):
+                self._error(line_number, str(record))
+                continue
+            try:
+                chunk.append((line_number, self._row(record)))
+            except ValueError as e:
+                self._error(line_number, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        self._flush(chunk)
+        # 카테고리만 새로 만들고 제품이 하나도 안 들어간 경우도 커밋한다
+        self.db.commit()
+        if self.inserted:
+            cache.invalidate_item_lists()
+        return {
+            "inserted": self.inserted,
+            "categories_created": self.categories_created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+# 바이너리 스트림(업로드 파일, 열린 파일)에서 카탈로그를 가져온다
+def import_items(db: Session, binary_stream, fmt: str, create_categories: bool = False,
+                 chunk_size: int = CATALOG_CHUNK_SIZE) -> dict:
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    text_stream = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    try:
+        return CatalogImport(db, create_categories, chunk_size).run(read_records(text_stream, fmt))
+    finally:
+        # 원래 스트림은 호출한 쪽에서 닫는다
+        text_stream.detach()
+
+
+# ---------------------------------------------------------------------------
+# 내보내기: id 키셋으로 EXPORT_BATCH_SIZE 행씩 읽어 JSONL 로 내보낸다
+# 테이블 전체를 메모리에 올리지 않고, 긴 트랜잭션이나 서버 측 커서도 잡지 않는다.
+# ---------------------------------------------------------------------------
+
+ITEM_EXPORT_COLUMNS = [
+    models.Item.id, models.Item.name, models.Item.description, models.Item.price,
+    models.Item.category_id, models.Category.name.label("category"),
+    models.Item.image, models.Item.image_variants, models.Item.video,
+    models.Item.splat, models.Item.compact_splat,
+    models.Item.review_count, models.Item.rating, models.Item.updated_at,
+]
+
+ORDER_EXPORT_COLUMNS = [
+    models.Order.id, models.Order.user_id, models.Order.item_id,
+    models.Order.price, models.Order.count, models.Order.pay,
+]
+
+EXPORTS = {
+    "items": (
+        lambda: select(*ITEM_EXPORT_COLUMNS).outerjoin(models.Category, models.Item.category_id == models.Category.id),
+        models.Item.id,
+    ),
+    "orders": (lambda: select(*ORDER_EXPORT_COLUMNS), models.Order.id),
+}
+
+
+def export_jsonl(session_factory, table: str, batch_size: int = EXPORT_BATCH_SIZE):
+    statement, id_column = EXPORTS[table]
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(
+                statement().where(id_column > last_id).order_by(id_column).limit(batch_size)
+            ).mappings().all()
+        finally:
+            db.close()
+        if not rows:
+            return
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+        last_id = rows[-1]["id"]
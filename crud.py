@@ -1,12 +1,16 @@
 import os
+import asyncio
 from fastapi import HTTPException, UploadFile
-from sqlalchemy.orm import Session
-import models, schemas
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, func, select, update, case, insert
+from sqlalchemy.orm import Session, joinedload
+import models, schemas, search, cache, jobs, serialization, metrics, reports, facets, websocket
+import time
+import threading
+from pagination import paginate
 import uuid
-import requests
 
-import boto3
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 
 import json
 
@@ -14,9 +18,9 @@ import json
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-# 모든 사용자 찾기
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+# 모든 사용자 찾기 (id 순 키셋 페이지네이션)
+def get_users(db: Session, cursor: str = None, skip: int = None, limit: int = 100):
+    return paginate(db.query(models.User), models.User.id, limit, cursor=cursor, skip=skip)
 
 def get_user_by_id(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -33,9 +37,49 @@ def create_user(db: Session, user: schemas.UserSchema):
 def verify_password(plain_password, hashed_password):
     return plain_password == hashed_password
 
+# 목록 응답에 필요한 컬럼만 튜플로 불러온다 (ORM 객체 생성과 행마다의 Pydantic 검증을 건너뛴다)
+ITEM_COLUMNS = serialization.columns_for(models.Item, schemas.ItemResponseModel)
+REVIEW_COLUMNS = serialization.columns_for(models.Review, schemas.ReviewSchema)
+ORDER_COLUMNS = serialization.columns_for(models.Order, schemas.OrderSchema)
+# 주문한 제품의 카테고리 (결제 UPDATE ... RETURNING 에서 집계용으로 함께 받는다)
+ORDER_CATEGORY = select(models.Item.category_id).where(models.Item.id == models.Order.item_id).scalar_subquery()
+
+# 제품 목록 정렬: 이름 -> (정렬 컬럼, 내림차순 여부)
+# newest 는 id 역순 (id 는 등록 순서대로 늘어난다)
+ITEM_SORTS = {
+    "id": (None, False),
+    "rating": (models.Item.rating, True),
+    "price": (models.Item.price, False),
+    "price_desc": (models.Item.price, True),
+    "newest": (None, True),
+}
+
+def paginate_items(query, sort: str = "id", cursor: str = None, skip: int = None, limit: int = 100):
+    sort_column, descending = ITEM_SORTS[sort]
+    if sort_column is not None:
+        # 키셋 커서는 NULL 과 비교할 수 없으므로 정렬 값이 없는 제품(가격 미정)은 빠진다
+        query = query.filter(sort_column.isnot(None))
+    return paginate(
+        query, models.Item.id, limit, cursor=cursor, skip=skip,
+        sort_column=sort_column, descending=descending
+    )
+
+# 카테고리(여러 개)/가격 범위 필터
+# (category_id, price, id), (price, id) 인덱스로 범위와 가격 순 정렬을 함께 처리한다
+def filter_items(query, category_ids=None, min_price: int = None, max_price: int = None):
+    if category_ids:
+        query = query.filter(models.Item.category_id.in_(category_ids))
+    if min_price is not None:
+        query = query.filter(models.Item.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Item.price <= max_price)
+    return query
+
 # 모든 제품 목록 불러오기
-def get_items(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Item).offset(skip).limit(limit).all()
+def get_items(db: Session, cursor: str = None, skip: int = None, limit: int = 100, sort: str = "id",
+              category_ids=None, min_price: int = None, max_price: int = None):
+    query = filter_items(db.query(*ITEM_COLUMNS), category_ids, min_price, max_price)
+    return paginate_items(query, sort=sort, cursor=cursor, skip=skip, limit=limit)
 
 def get_item_by_id(db: Session, item_id: int):
     return db.query(models.Item).filter(models.Item.id == item_id).first()
@@ -44,26 +88,86 @@ def get_item_by_id(db: Session, item_id: int):
 def get_item(db: Session, item_id: int):
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
+# 캐시에 저장할 수 있도록 응답 형태의 dict 로 변환
+def item_to_dict(db_item: models.Item):
+    if db_item is None:
+        return None
+    return schemas.ItemResponseModel.model_validate(db_item, from_attributes=True).model_dump(mode="json")
+
+def item_media_to_dict(db_item: models.Item):
+    if db_item is None:
+        return None
+    return {
+        "image_path": db_item.image,
+        "video_path": db_item.video,
+        "splat_path": db_item.splat,
+        "compact_splat_path": db_item.compact_splat
+    }
+
+def item_page_to_dict(rows, next_cursor):
+    return {"items": serialization.rows_to_dicts(rows, schemas.ItemResponseModel), "next_cursor": next_cursor}
+
+# 캐시를 거쳐 제품 상세 불러오기
+def get_item_cached(db: Session, item_id: int):
+    return cache.get_or_load(f"item:{item_id}", lambda: item_to_dict(get_item(db, item_id)))
+
+# 캐시를 거쳐 제품 미디어 경로 불러오기
+def get_item_media_cached(db: Session, item_id: int):
+    return cache.get_or_load(f"item_media:{item_id}", lambda: item_media_to_dict(get_item(db, item_id)))
+
+# 캐시를 거쳐 제품 목록 불러오기
+def get_items_cached(db: Session, cursor: str = None, skip: int = None, limit: int = 100, sort: str = "id",
+                     category_ids=None, min_price: int = None, max_price: int = None):
+    category_ids = sorted(set(category_ids)) if category_ids else None
+    key = cache.item_list_key(
+        "all", sort, cursor, skip, limit,
+        ",".join(map(str, category_ids)) if category_ids else None, min_price, max_price,
+    )
+    return cache.get_or_load(key, lambda: item_page_to_dict(*get_items(
+        db, cursor=cursor, skip=skip, limit=limit, sort=sort,
+        category_ids=category_ids, min_price=min_price, max_price=max_price,
+    )))
+
+def get_items_by_category_cached(db: Session, category_id: int, cursor: str = None, skip: int = None, limit: int = 100, sort: str = "id",
+                                 min_price: int = None, max_price: int = None):
+    key = cache.item_list_key("category", category_id, sort, cursor, skip, limit, min_price, max_price)
+    return cache.get_or_load(key, lambda: item_page_to_dict(*get_items_by_category(
+        db, category_id=category_id, cursor=cursor, skip=skip, limit=limit, sort=sort,
+        min_price=min_price, max_price=max_price,
+    )))
+
+# 캐시를 거쳐 패싯 불러오기 (제품이 바뀌면 목록 페이지와 함께 무효화된다)
+def get_facets_cached(db: Session, category_ids=None):
+    category_ids = sorted(set(category_ids)) if category_ids else None
+    key = cache.item_list_key("facets", ",".join(map(str, category_ids)) if category_ids else None)
+    return cache.get_or_load(key, lambda: facets.get_facets(db, category_ids))
+
 # 제품 생성
 def create_item(db: Session, item: schemas.ItemSchema, image_path: str, video_path: str):
+    # 가격 컬럼은 정수이므로 저장 값과 패싯 가격대 모두 정수로 바꾼 가격을 쓴다
+    price = None if item.price is None else int(item.price)
     db_item = models.Item(
         name=item.name,
         image=image_path,
         splat=None,  
         video=video_path,
         description=item.description,
-        price=item.price,
+        price=price,
         category_id=item.category_id
     )
     db.add(db_item)
+    facets.record_items(db, [(item.category_id, price)])
     db.commit()
     db.refresh(db_item)
+    cache.invalidate_item_lists()
     return db_item
 
 
 # 카테고리 별 제품 목록
-def get_items_by_category(db: Session, category_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Item).filter(models.Item.category_id == category_id).offset(skip).limit(limit).all()
+def get_items_by_category(db: Session, category_id: int, cursor: str = None, skip: int = None, limit: int = 100, sort: str = "id",
+                          min_price: int = None, max_price: int = None):
+    query = filter_items(db.query(*ITEM_COLUMNS), [category_id], min_price, max_price)
+    return paginate_items(query, sort=sort, cursor=cursor, skip=skip, limit=limit)
 
 # 카테고리 생성
 def create_item_category(db: Session, category: schemas.CategorySchema):
@@ -73,8 +177,14 @@ def create_item_category(db: Session, category: schemas.CategorySchema):
     db.refresh(db_category)
     return db_category
 
+# 제품 검색 (FTS 인덱스가 있으면 관련도 순, 없으면 제품명/설명 부분 일치)
 def search_items_by_name(db: Session, name: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Item).filter(models.Item.name.ilike(f"%{name}%")).offset(skip).limit(limit).all()
+    if search.search_index_enabled(db):
+        return search.search_items(db, name, ITEM_COLUMNS, skip=skip, limit=limit)
+    pattern = f"%{name}%"
+    return db.query(*ITEM_COLUMNS).filter(
+        or_(models.Item.name.ilike(pattern), models.Item.description.ilike(pattern))
+    ).order_by(models.Item.id).offset(skip).limit(limit).all()
 
 # 데이터 삭제하기 - 제품 카테고리
 def delete_item_category(db: Session, item_id: int, category_id: int):
@@ -86,43 +196,136 @@ def delete_item_category(db: Session, item_id: int, category_id: int):
     return Item
 
 # 리뷰 조회
-def get_reviews(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Review).offset(skip).limit(limit).all()
+def get_reviews(db: Session, cursor: str = None, skip: int = None, limit: int = 100):
+    return paginate(db.query(*REVIEW_COLUMNS), models.Review.id, limit, cursor=cursor, skip=skip)
 
-# 리뷰 생성
+# 리뷰 생성 (제품의 리뷰 수/별점 합계/평균 별점도 같은 트랜잭션에서 갱신)
 def create_review(db: Session, review: schemas.ReviewSchema):
     db_review = models.Review(user_id=review.user_id, item_id=review.item_id, content=review.content, star=review.star)
     db.add(db_review)
+    db.query(models.Item).filter(models.Item.id == review.item_id).update({
+        models.Item.review_count: models.Item.review_count + 1,
+        models.Item.star_sum: models.Item.star_sum + review.star,
+        models.Item.rating: (models.Item.star_sum + review.star) * 1.0 / (models.Item.review_count + 1),
+    }, synchronize_session=False)
     db.commit()
     db.refresh(db_review)
+    cache.invalidate_item(review.item_id)
     return db_review
 
+# 리뷰 집계를 reviews 테이블에서 다시 계산 (기존 데이터 백필)
+def rebuild_review_stats(db):
+    review_count = select(func.count(models.Review.id)).where(
+        models.Review.item_id == models.Item.id
+    ).scalar_subquery()
+    star_sum = select(func.coalesce(func.sum(models.Review.star), 0)).where(
+        models.Review.item_id == models.Item.id
+    ).scalar_subquery()
+    db.execute(update(models.Item).values(
+        review_count=review_count,
+        star_sum=star_sum,
+        rating=case((review_count > 0, star_sum * 1.0 / review_count), else_=0.0),
+    ))
+
 # 제품별 리뷰 불러오기
 def get_item_reviews(db: Session, item_id: int):
-    return db.query(models.Review).filter(models.Review.item_id == item_id).all()
+    return db.query(*REVIEW_COLUMNS, models.Review.updated_at).filter(
+        models.Review.item_id == item_id
+    ).order_by(models.Review.id).all()
+
+# 주문/리뷰 내역에 제품 요약(이름, 이미지, 가격)을 같은 쿼리에서 JOIN 으로 불러온다
+def _with_item_summary(relationship):
+    return joinedload(relationship).load_only(
+        models.Item.id, models.Item.name, models.Item.image, models.Item.image_variants, models.Item.price
+    )
+
+# 사용자가 쓴 리뷰 (최신순, 제품 요약 포함)
+def get_user_review_history(db: Session, user_id: int, cursor: str = None, limit: int = 100):
+    query = db.query(models.Review).options(_with_item_summary(models.Review.item)).filter(
+        models.Review.user_id == user_id
+    )
+    return paginate(query, models.Review.id, limit, cursor=cursor, descending=True)
 
-# 주문 생성
+# 주문 생성 (매출 집계도 같은 트랜잭션에서 더한다)
 def create_order(db: Session, order: schemas.OrderSchema):
     db_order = models.Order(user_id=order.user_id, item_id=order.item_id, price=order.price, count=order.count, pay=order.pay)
     db.add(db_order)
+    db.flush()
+    reports.record_orders(db, [db_order])
     db.commit()
     db.refresh(db_order)
     return db_order
 
+# 여러 주문을 한 트랜잭션으로 생성
+# 제품/사용자는 IN 쿼리 한 번씩으로 확인하고, 주문은 INSERT 한 번과 커밋 한 번으로 저장한다.
+def create_orders_batch(db: Session, lines: list):
+    item_ids = {line.item_id for line in lines}
+    user_ids = {line.user_id for line in lines}
+
+    prices = dict(db.query(models.Item.id, models.Item.price).filter(models.Item.id.in_(item_ids)).all())
+    found_users = {user_id for (user_id,) in db.query(models.User.id).filter(models.User.id.in_(user_ids))}
+
+    missing_items = item_ids - prices.keys()
+    if missing_items:
+        raise HTTPException(status_code=404, detail=f"Item not found: {sorted(missing_items)}")
+    missing_users = user_ids - found_users
+    if missing_users:
+        raise HTTPException(status_code=404, detail=f"User not found: {sorted(missing_users)}")
+    unpriced = sorted(item_id for item_id in item_ids if prices[item_id] is None)
+    if unpriced:
+        raise HTTPException(status_code=400, detail=f"Item has no price: {unpriced}")
+
+    rows = [
+        {
+            "user_id": line.user_id,
+            "item_id": line.item_id,
+            "price": prices[line.item_id] * line.count,
+            "count": line.count,
+            "pay": line.pay,
+        }
+        for line in lines
+    ]
+    db_orders = db.scalars(
+        insert(models.Order).returning(models.Order, sort_by_parameter_order=True), rows
+    ).all()
+    # 커밋하면 객체가 만료되어 다시 SELECT 하게 되므로 응답은 커밋 전에 만든다
+    created = [schemas.OrderSchema.model_validate(db_order, from_attributes=True) for db_order in db_orders]
+    reports.record_orders(db, db_orders)
+    db.commit()
+    return created
+
 def get_orders_by_user(db: Session, user_id: int):
-    return db.query(models.Order).filter(models.Order.user_id == user_id).all()
+    return db.query(*ORDER_COLUMNS).filter(models.Order.user_id == user_id).order_by(models.Order.id).all()
 
 def get_orders_by_item(db: Session, item_id: int):
-    return db.query(models.Order).filter(models.Order.item_id == item_id).all()
+    return db.query(*ORDER_COLUMNS).filter(models.Order.item_id == item_id).order_by(models.Order.id).all()
 
+# 사용자 주문 내역 (최신순, 제품 요약 포함)
+def get_order_history(db: Session, user_id: int, cursor: str = None, limit: int = 100):
+    query = db.query(models.Order).options(_with_item_summary(models.Order.item)).filter(
+        models.Order.user_id == user_id
+    )
+    return paginate(query, models.Order.id, limit, cursor=cursor, descending=True)
+
+# 결제 완료 처리
+# 미결제인 경우에만 바꾸는 조건부 UPDATE ... RETURNING 한 번으로 결제하고 응답할 주문을 받는다.
+# 같은 주문을 두 번 결제해도 집계에는 한 번만 반영되고, 이미 결제된 주문은 그대로 돌려준다 (없으면 None)
 def update_order_payment(db: Session, order_id: int):
-    db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if db_order:
-        db_order.pay = True
+    paid = db.execute(
+        update(models.Order)
+        .where(models.Order.id == order_id, or_(models.Order.pay.is_(False), models.Order.pay.is_(None)))
+        .values(pay=True)
+        .returning(*ORDER_COLUMNS, models.Order.created_at, ORDER_CATEGORY.label("category_id"))
+        .execution_options(synchronize_session=False)
+    ).first()
+    if paid:
+        reports.record_payment(db, paid, categories={paid.item_id: paid.category_id})
         db.commit()
-        db.refresh(db_order)
-        return db_order
-    return None
+    else:
+        paid = db.query(*ORDER_COLUMNS).filter(models.Order.id == order_id).first()
+        if paid is None:
+            return None
+    return schemas.OrderSchema.model_validate(paid, from_attributes=True)
 
 async def save_upload_file(file: UploadFile, folder: str):
     unique_filename = str(uuid.uuid4())
@@ -134,49 +337,295 @@ async def save_upload_file(file: UploadFile, folder: str):
 
     return file_path
 
-s3_client = boto3.client(
-    service_name='s3', region_name='',
-    aws_access_key_id='', aws_secret_access_key=""
-)
-bucket_name = ""
-# GPU 서버 API 호출
-def send_video(db: Session, item_id: int):
-    try:
-        db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
-        server_url = 'http://163.180.117.43:9003/api/downloadvideo'
-
-        parsed_url = urlparse(db_item.video)
-        path_components = parsed_url.path.split('/')
-        file_name = path_components[-1]
-        file_name_without_extension = file_name.split('.')[0]
-        video_uuid = file_name_without_extension
-
-        data = {"item_id": item_id, "video_uuid": video_uuid}
-        response = requests.post(server_url, json=data)
-        response.raise_for_status()
-        return video_uuid
-    except requests.RequestException as e:
-        print(f"An error occurred while sending image URL to another server: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send image URL to GPU server")
-    
-    
+# S3 설정 (S3_ENDPOINT_URL 을 지정하면 moto 서버 같은 로컬 S3 로 붙을 수 있다)
+# boto3 는 불러오는 데만 수백 ms 가 걸리므로 처음 클라이언트를 만들 때 불러온다
+def make_s3_client():
+    import boto3
+    return boto3.client(
+        service_name='s3',
+        region_name=os.getenv("S3_REGION", "ap-northeast-2"),
+        endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID") or None,
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY") or None,
+    )
 
-# S3 파일 업로드
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+# 프로세스 안에서 공유하는 S3 클라이언트 (처음 부를 때 만든다, 서버는 시작 준비 단계에서 미리 만든다)
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        # boto3 의 기본 세션은 여러 스레드가 동시에 클라이언트를 만들면 안전하지 않다
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = make_s3_client()
+    return _s3_client
+
+def close_s3_client():
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is not None:
+            _s3_client.close()
+            _s3_client = None
+
+bucket_name = os.getenv("S3_BUCKET", "")
+
+# 멀티파트 업로드 설정: 업로드 하나가 메모리에 들고 있는 최대 크기는 PART_SIZE * MAX_CONCURRENT_PARTS
+S3_PART_SIZE = max(int(os.getenv("S3_PART_SIZE", 8 * 1024 * 1024)), 5 * 1024 * 1024)  # S3 최소 파트 크기 5MB
+S3_MAX_CONCURRENT_PARTS = max(int(os.getenv("S3_MAX_CONCURRENT_PARTS", 4)), 1)
+
+# 클라이언트 직접 업로드(presigned URL) 설정
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", 3600))
+S3_MAX_UPLOAD_SIZE = int(os.getenv("S3_MAX_UPLOAD_SIZE", 5 * 1024 * 1024 * 1024))
+S3_MAX_PARTS = 10000
+# 미디어 종류별로 허용하는 Content-Type 접두어
+MEDIA_CONTENT_TYPES = {"image": "image/", "video": "video/"}
+
+def _make_s3_key(filename: str, prefix: str = "") -> str:
+    unique_filename = str(uuid.uuid4())
+    file_extension = filename.split(".")[-1]
+    return f"{prefix}{unique_filename}.{file_extension}"
+
+# 직접 업로드 키는 제품 번호로 시작한다: 다른 제품용으로 올린 객체를 등록할 수 없다
+# (GPU 서버가 버킷 최상위에서 동영상을 찾으므로 디렉터리가 아닌 파일명 접두어를 쓴다)
+def item_media_key_prefix(item_id: int) -> str:
+    return f"item-{item_id}-"
+
+def s3_url_for(bucket: str, s3_key: str) -> str:
+    return f"https://{bucket}.s3.amazonaws.com/{s3_key}"
+
+def _s3_url(s3_key: str) -> str:
+    return s3_url_for(bucket_name, s3_key)
+
+# https://{bucket}.s3[.region].amazonaws.com/{key} 형태의 URL 에서 (bucket, key) 추출
+def s3_location_from_url(url: str):
+    parsed = urlparse(url)
+    bucket = parsed.netloc.split(".s3", 1)[0]
+    return bucket, unquote(parsed.path.lstrip("/"))
+
+# S3 객체를 Range 요청으로 읽는다 (StreamingBody 와 S3 응답 헤더를 돌려준다)
+def get_s3_object_range(bucket: str, s3_key: str, byte_range: str = None):
+    params = {"Bucket": bucket, "Key": s3_key}
+    if byte_range:
+        params["Range"] = byte_range
+    return get_s3_client().get_object(**params)
+
+# S3 파일 업로드 (동기, boto3 가 파일 객체를 조각내서 올린다)
 def upload_file_to_s3(file: UploadFile) -> str:
+    start = time.perf_counter()
     try:
-        unique_filename = str(uuid.uuid4())
-        file_extension = file.filename.split(".")[-1]
-        s3_key = f"{unique_filename}.{file_extension}"
-        file_body = file.file.read()
-        response = s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=file_body)
+        s3_key = _make_s3_key(file.filename)
+        extra_args = {"ContentType": file.content_type} if file.content_type else None
+        get_s3_client().upload_fileobj(file.file, bucket_name, s3_key, ExtraArgs=extra_args)
 
-        s3_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
+        metrics.S3_UPLOAD_SECONDS.observe(time.perf_counter() - start, method="upload_fileobj")
+        metrics.S3_UPLOAD_BYTES.observe(file.file.tell(), method="upload_fileobj")
+        s3_url = _s3_url(s3_key)
         return s3_url   
 
     except Exception as e:
         print(f"An error occurred while uploading file to S3: {str(e)}")
+        metrics.S3_UPLOAD_ERRORS.inc(method="upload_fileobj")
+        raise HTTPException(status_code=500, detail="Failed to upload file to S3")
+
+# S3 파일 업로드 (비동기 스트리밍)
+# 파일을 S3_PART_SIZE 단위로 읽어 멀티파트로 올리고, 파트 업로드는 스레드풀에서 병렬로 실행한다.
+# 동시에 올리는 파트 수를 세마포어로 제한하므로 업로드 하나의 메모리 사용량이 일정하게 유지된다.
+async def upload_file_to_s3_streaming(file: UploadFile) -> str:
+    s3_client = get_s3_client()
+    s3_key = _make_s3_key(file.filename)
+    extra_args = {"ContentType": file.content_type} if file.content_type else {}
+    upload_id = None
+    method = "put_object"
+    start = time.perf_counter()
+    try:
+        first_chunk = await file.read(S3_PART_SIZE)
+        if len(first_chunk) < S3_PART_SIZE:
+            # 파트 하나에 들어가는 작은 파일은 put_object 한 번으로 끝낸다
+            await run_in_threadpool(
+                s3_client.put_object, Bucket=bucket_name, Key=s3_key, Body=first_chunk, **extra_args
+            )
+            metrics.S3_UPLOAD_SECONDS.observe(time.perf_counter() - start, method=method)
+            metrics.S3_UPLOAD_BYTES.observe(len(first_chunk), method=method)
+            return _s3_url(s3_key)
+
+        method = "multipart"
+
+        response = await run_in_threadpool(
+            s3_client.create_multipart_upload, Bucket=bucket_name, Key=s3_key, **extra_args
+        )
+        upload_id = response["UploadId"]
+
+        slots = asyncio.Semaphore(S3_MAX_CONCURRENT_PARTS)
+
+        async def upload_part(part_number: int, body: bytes):
+            try:
+                part = await run_in_threadpool(
+                    s3_client.upload_part,
+                    Bucket=bucket_name, Key=s3_key, UploadId=upload_id,
+                    PartNumber=part_number, Body=body,
+                )
+                return {"PartNumber": part_number, "ETag": part["ETag"]}
+            finally:
+                slots.release()
+
+        tasks = []
+        part_number = 1
+        chunk = first_chunk
+        total_bytes = len(first_chunk)
+        await slots.acquire()
+        try:
+            while chunk:
+                tasks.append(asyncio.create_task(upload_part(part_number, chunk)))
+                chunk = None
+                # 앞선 파트가 끝나 자리가 날 때까지 다음 조각을 읽지 않는다
+                await slots.acquire()
+                if any(task.done() and task.exception() for task in tasks):
+                    slots.release()
+                    break
+                part_number += 1
+                chunk = await file.read(S3_PART_SIZE)
+                total_bytes += len(chunk)
+                if not chunk:
+                    slots.release()
+            parts = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        await run_in_threadpool(
+            s3_client.complete_multipart_upload,
+            Bucket=bucket_name, Key=s3_key, UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        metrics.S3_UPLOAD_SECONDS.observe(time.perf_counter() - start, method=method)
+        metrics.S3_UPLOAD_BYTES.observe(total_bytes, method=method)
+        return _s3_url(s3_key)
+
+    except Exception as e:
+        print(f"An error occurred while uploading file to S3: {str(e)}")
+        metrics.S3_UPLOAD_ERRORS.inc(method=method)
+        if upload_id:
+            try:
+                await run_in_threadpool(
+                    s3_client.abort_multipart_upload, Bucket=bucket_name, Key=s3_key, UploadId=upload_id
+                )
+            except Exception as abort_error:
+                print(f"Failed to abort multipart upload {upload_id}: {abort_error}")
         raise HTTPException(status_code=500, detail="Failed to upload file to S3")
 
+# 여러 파일을 동시에 업로드 (None 은 건너뛰고 None 을 돌려준다)
+async def upload_files_to_s3(*files: UploadFile):
+    async def upload(file):
+        if not file:
+            return None
+        return await upload_file_to_s3_streaming(file)
+
+    return await asyncio.gather(*(upload(file) for file in files))
+
+def _check_media_content_type(kind: str, content_type: str):
+    if not (content_type or "").startswith(MEDIA_CONTENT_TYPES[kind]):
+        raise HTTPException(status_code=400, detail=f"Content type {content_type!r} is not allowed for {kind}")
+
+# 클라이언트가 S3 로 직접 올릴 수 있는 presigned URL 발급
+# S3_PART_SIZE 이하는 크기/Content-Type 조건이 걸린 presigned POST 하나, 그보다 크면 파트별 presigned URL 을 준다.
+def create_presigned_upload(db: Session, item_id: int, kind: str, filename: str, content_type: str, size: int):
+    _check_media_content_type(kind, content_type)
+    if size > S3_MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=400, detail="File is too large")
+    if not db.query(models.Item.id).filter(models.Item.id == item_id).first():
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    s3_client = get_s3_client()
+    s3_key = _make_s3_key(filename, prefix=item_media_key_prefix(item_id))
+    if size <= S3_PART_SIZE:
+        post = s3_client.generate_presigned_post(
+            Bucket=bucket_name, Key=s3_key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, size]],
+            ExpiresIn=S3_PRESIGN_EXPIRES,
+        )
+        return {"key": s3_key, "method": "POST", "url": post["url"], "fields": post["fields"]}
+
+    part_size = max(S3_PART_SIZE, -(-size // S3_MAX_PARTS))
+    part_count = -(-size // part_size)
+    upload = s3_client.create_multipart_upload(Bucket=bucket_name, Key=s3_key, ContentType=content_type)
+    upload_id = upload["UploadId"]
+    parts = [
+        {
+            "part_number": part_number,
+            "url": s3_client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket_name, "Key": s3_key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=S3_PRESIGN_EXPIRES,
+            ),
+        }
+        for part_number in range(1, part_count + 1)
+    ]
+    return {
+        "key": s3_key, "method": "MULTIPART", "upload_id": upload_id,
+        "part_size": part_size, "parts": parts,
+    }
+
+# 파트를 모두 올린 멀티파트 업로드 완료
+def complete_presigned_upload(s3_key: str, upload_id: str, parts: list):
+    s3_client = get_s3_client()
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=s3_key, UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": part.part_number, "ETag": part.etag}
+                for part in sorted(parts, key=lambda part: part.part_number)
+            ]},
+        )
+    except s3_client.exceptions.NoSuchUpload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except Exception as e:
+        print(f"An error occurred while completing multipart upload: {str(e)}")
+        raise HTTPException(status_code=400, detail="Failed to complete multipart upload")
+
+# 직접 업로드된 객체를 HEAD 로 확인한 뒤 제품에 기록
+# 이 제품용으로 발급한 키만 받고, 이미 GPU 작업을 등록한 동영상은 다시 등록하지 않는다
+def finalize_item_media(db: Session, item_id: int, kind: str, s3_key: str, size: int = None):
+    db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not s3_key.startswith(item_media_key_prefix(item_id)) or "/" in s3_key:
+        raise HTTPException(status_code=400, detail="Upload key was not issued for this item")
+    s3_url = _s3_url(s3_key)
+    if kind == "video" and db.query(models.GpuJob.id).filter(
+        models.GpuJob.item_id == item_id, models.GpuJob.video_uuid == jobs.video_uuid_from_url(s3_url)
+    ).first():
+        raise HTTPException(status_code=409, detail="Video is already registered")
+
+    try:
+        head = get_s3_client().head_object(Bucket=bucket_name, Key=s3_key)
+    except Exception as e:
+        print(f"Uploaded object {s3_key} not found: {str(e)}")
+        raise HTTPException(status_code=400, detail="Uploaded object not found")
+
+    content_length = head["ContentLength"]
+    if content_length == 0 or content_length > S3_MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=400, detail="Uploaded object has an invalid size")
+    if size is not None and content_length != size:
+        raise HTTPException(status_code=400, detail="Uploaded object size does not match")
+    _check_media_content_type(kind, head.get("ContentType"))
+
+    if kind == "image":
+        db_item.image = s3_url
+    else:
+        db_item.video = s3_url
+        jobs.enqueue(db, item_id, s3_url)
+    db.commit()
+    db.refresh(db_item)
+    cache.invalidate_item(item_id)
+    if kind == "video":
+        jobs.notify()
+    return db_item
+
 def upload_splat_to_s3(db: Session, item_id: int, splat_file: UploadFile):
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
     
@@ -187,6 +636,7 @@ def upload_splat_to_s3(db: Session, item_id: int, splat_file: UploadFile):
 
     db_item.splat = splat_path
     db.commit()
+    cache.invalidate_item(item_id)
     return db_item
 
 
@@ -201,13 +651,14 @@ def receive_splat(db: Session, item_id: int, splat_uuid: str):
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
     
     if db_item:
-        # 아이템에 URL 업데이트하고 커밋
+        # 아이템에 URL 업데이트하고 GPU 작업 완료 처리 후 커밋
         db_item.splat = response
         print(db_item.splat)
+        db.query(models.GpuJob).filter(
+            models.GpuJob.item_id == item_id, models.GpuJob.status.in_(jobs.ACTIVE_STATUSES)
+        ).update({models.GpuJob.status: "done", models.GpuJob.locked_until: None}, synchronize_session=False)
         db.commit()
         db.refresh(db_item)
+        cache.invalidate_item(item_id)
+        websocket.publish_item_event_threadsafe(item_id, "job", {"status": "done", "splat": db_item.splat}, video_uuid=splat_uuid)
         return db_item
-
-def delete_items_in_other_category(db: Session):
-    db.query(models.Item).filter(models.Item.category.has(models.Category.name == "기타")).delete(synchronize_session=False)
-    db.commit()
@@ -1,15 +1,90 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DB_URL = "sqlite:///./sql_app.db"
+# DB 설정 (환경 변수로 덮어쓸 수 있다)
+DB_URL = os.getenv("DB_URL", "sqlite:///./sql_app.db")
+# 읽기 전용 복제본, 지정하지 않으면 읽기도 기본 DB 로 보낸다
+DB_READ_URL = os.getenv("DB_READ_URL") or None
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# 쿼리 하나의 최대 실행 시간(ms), 0 이면 제한 없음. SQLite 에서는 잠금 대기 시간(busy_timeout)으로 쓴다
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+# 동기 URL 에 대응하는 비동기 드라이버 (로컬은 aiosqlite, 운영 PostgreSQL 은 asyncpg)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+ASYNC_DB_URL = to_async_url(DB_URL)
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if _is_sqlite(url):
+        if ":memory:" not in url:
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+        if "aiosqlite" not in url:
+            options["connect_args"] = {"check_same_thread": False}
+        return options
 
-engine = create_engine(
-    DB_URL, connect_args={"check_same_thread": False}
-)
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    if DB_STATEMENT_TIMEOUT_MS:
+        if "asyncpg" in url:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+# SQLite 연결마다 WAL 모드 적용: 쓰기 중에도 읽기가 막히지 않는다
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    if DB_STATEMENT_TIMEOUT_MS:
+        cursor.execute(f"PRAGMA busy_timeout={DB_STATEMENT_TIMEOUT_MS}")
+    cursor.close()
+
+def make_engine(url: str):
+    engine = create_engine(url, **_engine_options(url))
+    if _is_sqlite(url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+def make_async_engine(url: str):
+    engine = create_async_engine(url, **_engine_options(url))
+    if _is_sqlite(url):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+engine = make_engine(DB_URL)
+read_engine = make_engine(DB_READ_URL) if DB_READ_URL else engine
+
+# 비동기 라우트용 엔진
+async_engine = make_async_engine(ASYNC_DB_URL)
+async_read_engine = make_async_engine(to_async_url(DB_READ_URL)) if DB_READ_URL else async_engine
 
 # DB 세션 생성하기
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 읽기 전용 라우트용 세션 (복제본이 없으면 SessionLocal 과 같은 DB)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# 비동기 DB 세션 (commit 후에도 응답을 만들 수 있도록 객체를 만료시키지 않는다)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class 생성하기
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
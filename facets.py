@@ -0,0 +1,102 @@
+import os
+from bisect import bisect_right
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+import models
+
+# 카탈로그 패싯 (카테고리별 제품 수, 가격대별 제품 수)
+# category_price_buckets 에 (카테고리, 가격대) 별 제품 수를 두고, 제품을 추가/삭제하는 트랜잭션에서 함께 더하고 뺀다.
+# 패싯 요청은 이 작은 테이블만 합산하므로 items 를 COUNT(*) 하지 않는다.
+
+# 가격대 경계 (원). 100,300 이면 [0, 100), [100, 300), [300, ∞) 세 구간
+# 경계를 바꾸면 python manage.py rebuild-facets 로 다시 계산해야 한다
+FACET_PRICE_BUCKETS = sorted(
+    int(bound) for bound in os.getenv("FACET_PRICE_BUCKETS", "10000,30000,50000,100000,300000").split(",") if bound.strip()
+)
+# 가격이 없는 제품의 구간 번호 (카테고리 제품 수에는 들어가고 가격대 패싯에서는 빠진다)
+NO_PRICE_BUCKET = -1
+
+
+def bucket_for(price) -> int:
+    if price is None:
+        return NO_PRICE_BUCKET
+    return bisect_right(FACET_PRICE_BUCKETS, price)
+
+
+def bucket_range(bucket: int):
+    low = FACET_PRICE_BUCKETS[bucket - 1] if bucket > 0 else 0
+    high = FACET_PRICE_BUCKETS[bucket] if bucket < len(FACET_PRICE_BUCKETS) else None
+    return low, high
+
+
+# (category_id, price) 목록을 (category_id, bucket) 별 증감으로 바꿔 upsert 문과 파라미터로 돌려준다
+# 동기/비동기 세션 모두 db.execute(*change) 로 실행한다. 바뀐 것이 없으면 None
+def item_count_change(dialect_name: str, items, sign: int = 1):
+    counts = Counter(
+        (category_id, bucket_for(price)) for category_id, price in items if category_id is not None
+    )
+    if not counts:
+        return None
+    table = models.CategoryPriceBucket.__table__
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["category_id", "bucket"],
+        set_={"item_count": table.c.item_count + statement.excluded.item_count},
+    )
+    # 키를 정렬해서 넣어 동시에 들어온 쓰기끼리 행 잠금 순서를 맞춘다
+    return statement, [
+        {"category_id": category_id, "bucket": bucket, "item_count": sign * count}
+        for (category_id, bucket), count in sorted(counts.items())
+    ]
+
+
+# 동기 세션용 (커밋은 호출한 쪽에서 제품 변경과 함께)
+def record_items(db, items, sign: int = 1):
+    change = item_count_change(db.get_bind().dialect.name, items, sign)
+    if change:
+        db.execute(*change)
+
+
+# items 에서 다시 계산한다 (마이그레이션, 가격대 경계를 바꾼 뒤)
+def rebuild_facets(db):
+    db.execute(delete(models.CategoryPriceBucket))
+    rows = db.execute(
+        select(models.Item.category_id, models.Item.price, func.count(models.Item.id))
+        .where(models.Item.category_id.isnot(None))
+        .group_by(models.Item.category_id, models.Item.price)
+    ).all()
+    counts = Counter()
+    for category_id, price, count in rows:
+        counts[(category_id, bucket_for(price))] += count
+    if counts:
+        db.execute(insert(models.CategoryPriceBucket), [
+            {"category_id": category_id, "bucket": bucket, "item_count": count}
+            for (category_id, bucket), count in sorted(counts.items())
+        ])
+
+
+# 카테고리별 제품 수(전체)와 가격대별 제품 수(category_ids 를 주면 그 카테고리들만)
+def get_facets(db, category_ids=None) -> dict:
+    model = models.CategoryPriceBucket
+    categories = db.execute(
+        select(model.category_id, models.Category.name, func.sum(model.item_count).label("item_count"))
+        .join(models.Category, models.Category.id == model.category_id)
+        .group_by(model.category_id, models.Category.name)
+        .having(func.sum(model.item_count) > 0)
+        .order_by(model.category_id)
+    ).mappings().all()
+
+    query = select(model.bucket, func.sum(model.item_count)).where(model.bucket != NO_PRICE_BUCKET).group_by(model.bucket)
+    if category_ids:
+        query = query.where(model.category_id.in_(category_ids))
+    bucket_counts = dict(db.execute(query).all())
+
+    price_buckets = []
+    for bucket in range(len(FACET_PRICE_BUCKETS) + 1):
+        low, high = bucket_range(bucket)
+        price_buckets.append({"min_price": low, "max_price": high, "item_count": bucket_counts.get(bucket) or 0})
+    return {"categories": [dict(row) for row in categories], "price_buckets": price_buckets}
@@ -0,0 +1,43 @@
+import os
+
+import metrics
+
+# GPU 서버 주소
+GPU_SERVER_URL = os.getenv("GPU_SERVER_URL", "http://163.180.117.43:9003")
+GPU_REQUEST_TIMEOUT = float(os.getenv("GPU_REQUEST_TIMEOUT", 10))
+
+_http_client = None
+
+# GPU 서버 호출에 공통으로 쓰는 비동기 HTTP 클라이언트 (커넥션 풀을 프로세스 안에서 공유)
+# httpx 는 처음 클라이언트를 만들 때 불러온다 (서버는 시작 준비 단계에서 미리 만든다)
+def get_http_client():
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        import httpx
+        _http_client = httpx.AsyncClient(
+            base_url=GPU_SERVER_URL,
+            timeout=GPU_REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# GPU 서버의 현재 진행 상황 (응답 본문을 그대로 돌려준다)
+async def get_progress() -> str:
+    with metrics.track(metrics.GPU_REQUEST_SECONDS, metrics.GPU_REQUEST_ERRORS, operation="progress"):
+        response = await get_http_client().get("/api/proginfo")
+        response.raise_for_status()
+    return response.text
+
+# 3D 복원 요청: GPU 서버가 S3 에서 동영상을 내려받아 처리한다
+async def send_video(item_id: int, video_uuid: str):
+    with metrics.track(metrics.GPU_REQUEST_SECONDS, metrics.GPU_REQUEST_ERRORS, operation="send_video"):
+        response = await get_http_client().post(
+            "/api/downloadvideo", json={"item_id": item_id, "video_uuid": video_uuid}
+        )
+        response.raise_for_status()
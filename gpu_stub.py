@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+# 테스트용 GPU 서버 대역
+#   uvicorn gpu_stub:app --port 9003
+#   GPU_SERVER_URL=http://127.0.0.1:9003 uvicorn main:app
+# STUB_CALLBACK_URL 을 지정하면 처리가 끝난 뒤 쇼핑몰 서버의 PUT /api/receive 를 호출한다.
+STUB_CALLBACK_URL = os.getenv("STUB_CALLBACK_URL")
+STUB_PROCESS_SECONDS = float(os.getenv("STUB_PROCESS_SECONDS", 3))
+# 처음 N번의 요청은 500 으로 실패시켜 재시도를 확인한다
+STUB_FAIL_FIRST = int(os.getenv("STUB_FAIL_FIRST", 0))
+
+app = FastAPI()
+
+received = []
+progress = {"progress": 0, "elapsed_time": 0, "remain_time": 0}
+_failures_left = STUB_FAIL_FIRST
+
+
+async def _process(item_id: int, video_uuid: str):
+    steps = 10
+    for step in range(steps + 1):
+        progress.update(
+            progress=step * 10,
+            elapsed_time=round(step * STUB_PROCESS_SECONDS / steps, 2),
+            remain_time=round((steps - step) * STUB_PROCESS_SECONDS / steps, 2),
+            item_id=item_id,
+            video_uuid=video_uuid,
+        )
+        await asyncio.sleep(STUB_PROCESS_SECONDS / steps)
+
+    if STUB_CALLBACK_URL:
+        async with httpx.AsyncClient() as client:
+            await client.put(STUB_CALLBACK_URL, params={"item_id": item_id, "splat_uuid": video_uuid})
+
+
+@app.post("/api/downloadvideo")
+async def download_video(payload: dict):
+    global _failures_left
+    if _failures_left > 0:
+        _failures_left -= 1
+        raise HTTPException(status_code=500, detail="stub failure")
+    received.append(payload)
+    asyncio.create_task(_process(payload["item_id"], payload["video_uuid"]))
+    return {"status": "accepted"}
+
+
+@app.get("/api/proginfo")
+async def proginfo():
+    return progress
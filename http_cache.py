@@ -0,0 +1,86 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+# 카탈로그 응답의 Cache-Control (0 이면 매번 ETag 로 재검증)
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 0))
+# 이 크기(바이트)보다 작은 응답은 압축하지 않는다
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+
+
+def cache_control() -> str:
+    if HTTP_CACHE_MAX_AGE <= 0:
+        return "no-cache"
+    return f"public, max-age={HTTP_CACHE_MAX_AGE}"
+
+
+def _field(row, name):
+    return row.get(name) if isinstance(row, dict) else getattr(row, name)
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+# 행 목록(ORM 객체나 캐시에 저장된 dict)의 (id, updated_at) 로 약한 ETag 를 만든다
+# 압축 여부와 상관없이 같은 내용이면 같은 값이어야 하므로 W/ 를 붙인다
+def etag_for(rows, *extra) -> str:
+    digest = hashlib.sha1()
+    for row in rows:
+        updated_at = _as_datetime(_field(row, "updated_at"))
+        digest.update(f"{_field(row, 'id')}:{updated_at.isoformat() if updated_at else ''};".encode())
+    for value in extra:
+        digest.update(f"|{'' if value is None else value}".encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def last_modified_for(rows):
+    values = [_as_datetime(_field(row, "updated_at")) for row in rows]
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match 는 약한 비교를 쓴다
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+# 검증자 헤더를 붙이고, 클라이언트가 가진 버전과 같으면 본문 없이 304 응답을 돌려준다.
+# If-None-Match 가 있으면 If-Modified-Since 는 보지 않는다 (RFC 9110).
+# 목록은 행이 빠져도 최대 updated_at 이 줄어들지 않으므로 last_modified 없이 ETag 만 쓴다.
+def check_not_modified(request: Request, response: Response, etag: str, last_modified: datetime = None):
+    headers = {"ETag": etag, "Cache-Control": cache_control()}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    elif if_modified_since is not None and last_modified is not None:
+        not_modified = _not_modified_since(if_modified_since, last_modified)
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+import cache
+import database
+import models
+
+# Idempotency-Key 헤더로 재시도한 주문/결제 요청에 처음 요청의 응답을 그대로 돌려준다
+# 재시도는 주문/결제 쿼리를 거치지 않고 키 저장소에서 응답을 읽는다.
+# 재시도는 다른 워커로 갈 수 있으므로 키는 워커끼리 공유한다: CACHE_URL 이 있으면 Redis, 없으면 DB 의 idempotency_keys 테이블
+
+# 응답을 기억하는 시간(초)
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", 24 * 60 * 60))
+# DB 저장소에서 만료된 키를 지우는 간격(초)
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", 300))
+# 처리 중 표시를 유지하는 시간(초): 요청을 처리하던 프로세스가 죽어도 이 시간이 지나면 다시 시도할 수 있다
+IDEMPOTENCY_LOCK_TTL = float(os.getenv("IDEMPOTENCY_LOCK_TTL", 60))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+# idempotency_keys 테이블 저장소 (cache.RedisCache 와 같은 get/set/add/delete)
+# 키마다 짧은 트랜잭션 하나로 요청 트랜잭션과 따로 커밋하고, 만료된 키는 IDEMPOTENCY_SWEEP_INTERVAL 마다 한 번에 지운다
+class DatabaseStore:
+    def __init__(self, engine, ttl: float = IDEMPOTENCY_TTL):
+        self.engine = engine
+        self.ttl = ttl
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _expires_at(self, ttl: float = None) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.ttl if ttl is None else ttl)
+
+    def get(self, key):
+        Key = models.IdempotencyKey
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(Key.value).where(Key.key == key, Key.expires_at > datetime.utcnow())
+            ).scalar()
+
+    def set(self, key, value, ttl: float = None):
+        Key = models.IdempotencyKey
+        values = {"value": value, "expires_at": self._expires_at(ttl)}
+        with self.engine.begin() as conn:
+            if not conn.execute(update(Key).where(Key.key == key).values(**values)).rowcount:
+                conn.execute(insert(Key).values(key=key, **values))
+
+    # 키가 없거나 만료됐을 때만 저장한다 (기본 키 충돌로 워커끼리 한 번만 성공한다)
+    def add(self, key, value, ttl: float = None) -> bool:
+        Key = models.IdempotencyKey
+        self.sweep()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(delete(Key).where(Key.key == key, Key.expires_at <= datetime.utcnow()))
+                conn.execute(insert(Key).values(key=key, value=value, expires_at=self._expires_at(ttl)))
+        except IntegrityError:
+            return False
+        return True
+
+    def delete(self, *keys):
+        if keys:
+            with self.engine.begin() as conn:
+                conn.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.key.in_(keys)))
+
+    def sweep(self, force: bool = False):
+        with self._lock:
+            if not force and time.monotonic() < self._next_sweep:
+                return
+            self._next_sweep = time.monotonic() + IDEMPOTENCY_SWEEP_INTERVAL
+        with self.engine.begin() as conn:
+            conn.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at <= datetime.utcnow()))
+
+
+def _create_store():
+    if cache.CACHE_URL:
+        import redis
+        return cache.RedisCache(redis.Redis.from_url(cache.CACHE_URL), ttl=IDEMPOTENCY_TTL, prefix="idempotency:")
+    return DatabaseStore(database.engine, ttl=IDEMPOTENCY_TTL)
+
+
+store = _create_store()
+
+
+# 키 저장소 교체 (테스트에서 로컬 대체재를 끼울 때)
+def set_store(new_store):
+    global store
+    store = new_store
+
+
+def _fingerprint(payload) -> str:
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+# key 가 없으면 handler() 를 그대로 실행한다.
+# 처음 보는 키면 처리 중으로 표시하고 handler() 를 실행해 성공한 응답을 저장한다 (실패하면 표시를 지워 다시 시도할 수 있다).
+# 저장된 키면 응답을 다시 돌려주고, 같은 키를 다른 요청에 쓰면 422, 처리 중이면 409
+def run(scope: str, key, payload, handler):
+    if key is None:
+        return handler()
+
+    store_key = f"{scope}:{key}"
+    fingerprint = _fingerprint(payload)
+    if store.add(store_key, {"fingerprint": fingerprint, "done": False}, IDEMPOTENCY_LOCK_TTL):
+        try:
+            result = handler()
+        except BaseException:
+            store.delete(store_key)
+            raise
+        store.set(store_key, {"fingerprint": fingerprint, "done": True, "response": jsonable_encoder(result)})
+        return result
+
+    stored = store.get(store_key)
+    if stored is None or not stored["done"]:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+    if stored["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was used for a different request")
+    return JSONResponse(stored["response"], headers={"Idempotent-Replayed": "true"})
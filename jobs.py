@@ -0,0 +1,176 @@
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from sqlalchemy import and_, or_, select, update
+
+import gpu
+import models
+import websocket
+from database import AsyncSessionLocal
+
+# GPU 복원 작업 워커 설정
+GPU_WORKER_ENABLED = os.getenv("GPU_WORKER_ENABLED", "true").lower() in ("1", "true", "yes")
+GPU_WORKER_CONCURRENCY = max(int(os.getenv("GPU_WORKER_CONCURRENCY", 2)), 1)
+GPU_WORKER_POLL_INTERVAL = float(os.getenv("GPU_WORKER_POLL_INTERVAL", 5))
+GPU_JOB_MAX_ATTEMPTS = int(os.getenv("GPU_JOB_MAX_ATTEMPTS", 8))
+GPU_JOB_RETRY_BASE = float(os.getenv("GPU_JOB_RETRY_BASE", 5))
+GPU_JOB_RETRY_MAX = float(os.getenv("GPU_JOB_RETRY_MAX", 600))
+# 워커 하나가 작업을 점유하는 시간: 이 시간 안에 끝내지 못하면(프로세스 종료 등) 다른 워커가 다시 가져간다
+GPU_JOB_LEASE = float(os.getenv("GPU_JOB_LEASE", 120))
+# GPU 서버가 접수한 뒤 결과(/api/receive)가 오지 않으면 다시 보낼 때까지 기다리는 시간
+GPU_JOB_RESULT_TIMEOUT = float(os.getenv("GPU_JOB_RESULT_TIMEOUT", 6 * 3600))
+
+ACTIVE_STATUSES = ("queued", "processing", "sent")
+
+_wakeup = None
+_loop = None
+
+
+# 동영상 URL 의 파일명(확장자 제외)이 GPU 서버에 넘기는 video_uuid
+def video_uuid_from_url(video_url: str) -> str:
+    file_name = urlparse(video_url).path.split('/')[-1]
+    return file_name.split('.')[0]
+
+
+# 새 작업 추가 (호출한 쪽의 트랜잭션에서 커밋된다)
+def enqueue(db, item_id: int, video_url: str) -> models.GpuJob:
+    job = models.GpuJob(item_id=item_id, video_uuid=video_uuid_from_url(video_url))
+    db.add(job)
+    return job
+
+
+# 작업이 추가되었음을 워커에게 알려 다음 폴링까지 기다리지 않게 한다 (스레드풀에서 불러도 된다)
+def notify():
+    if _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(GPU_JOB_RETRY_BASE * 2 ** (attempts - 1), GPU_JOB_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _runnable(now: datetime):
+    return or_(
+        and_(models.GpuJob.status == "queued", models.GpuJob.next_attempt_at <= now),
+        # 점유한 워커가 사라진 작업
+        and_(models.GpuJob.status == "processing", models.GpuJob.locked_until < now),
+    )
+
+
+# 결과가 오지 않는 작업을 다시 대기열로 돌린다
+async def requeue_stale_jobs():
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.GpuJob)
+            .where(
+                models.GpuJob.status == "sent",
+                models.GpuJob.updated_at < now - timedelta(seconds=GPU_JOB_RESULT_TIMEOUT),
+            )
+            .values(status="queued", next_attempt_at=now, last_error="result timeout")
+        )
+        await db.commit()
+
+
+# 실행할 작업을 최대 limit 개 점유한다. 조건부 UPDATE 로 점유하므로 여러 프로세스가 같은 작업을 가져가지 않는다
+async def claim_jobs(limit: int):
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        candidates = (await db.execute(
+            select(models.GpuJob.id).where(_runnable(now)).order_by(models.GpuJob.next_attempt_at).limit(limit)
+        )).scalars().all()
+
+        claimed = []
+        for job_id in candidates:
+            result = await db.execute(
+                update(models.GpuJob)
+                .where(models.GpuJob.id == job_id, _runnable(now))
+                .values(status="processing", locked_until=now + timedelta(seconds=GPU_JOB_LEASE))
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        await db.commit()
+
+        if not claimed:
+            return []
+        return (await db.execute(
+            select(models.GpuJob).where(models.GpuJob.id.in_(claimed))
+        )).scalars().all()
+
+
+async def _finish_attempt(job: models.GpuJob, error: str = None):
+    attempts = job.attempts + 1
+    if error is None:
+        values = dict(status="sent", attempts=attempts, locked_until=None, last_error=None)
+    elif attempts >= GPU_JOB_MAX_ATTEMPTS:
+        values = dict(status="failed", attempts=attempts, locked_until=None, last_error=error[:1024])
+    else:
+        values = dict(
+            status="queued", attempts=attempts, locked_until=None, last_error=error[:1024],
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=_retry_delay(attempts)),
+        )
+    async with AsyncSessionLocal() as db:
+        # 그사이 결과가 먼저 도착해 done 이 된 작업은 건드리지 않는다
+        result = await db.execute(
+            update(models.GpuJob)
+            .where(models.GpuJob.id == job.id, models.GpuJob.status == "processing")
+            .values(**values)
+        )
+        await db.commit()
+    if result.rowcount == 1:
+        await websocket.publish_item_event(job.item_id, "job", {
+            "job_id": job.id, "status": values["status"], "attempts": attempts,
+        }, video_uuid=job.video_uuid)
+
+
+# GPU 서버로 작업 전송
+async def run_job(job: models.GpuJob):
+    import httpx
+    try:
+        await gpu.send_video(job.item_id, job.video_uuid)
+    except httpx.HTTPError as e:
+        print(f"Failed to send job {job.id} (item {job.item_id}) to GPU server: {e!r}")
+        await _finish_attempt(job, error=repr(e))
+    else:
+        await _finish_attempt(job)
+
+
+# 작업 큐를 비우는 워커: 동시에 GPU_WORKER_CONCURRENCY 개까지 전송한다
+async def run_worker():
+    global _wakeup, _loop
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    running = set()
+
+    try:
+        while True:
+            try:
+                await requeue_stale_jobs()
+                free = GPU_WORKER_CONCURRENCY - len(running)
+                if free > 0:
+                    for job in await claim_jobs(free):
+                        task = asyncio.create_task(run_job(job))
+                        running.add(task)
+                        task.add_done_callback(running.discard)
+                        # 자리가 나면 폴링 주기를 기다리지 않고 다음 작업을 가져온다
+                        task.add_done_callback(lambda _: notify())
+            except Exception as e:
+                print(f"GPU job worker error: {e!r}")
+
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=GPU_WORKER_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+def start_worker() -> asyncio.Task:
+    return asyncio.create_task(run_worker())
@@ -1,23 +1,53 @@
-from typing import List
+from datetime import date
+from typing import List, Literal, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, APIRouter, BackgroundTasks
+from fastapi import Depends, FastAPI, HTTPException, APIRouter, BackgroundTasks, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from fastapi.responses import StreamingResponse
+from botocore.exceptions import ClientError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import File, UploadFile
 from fastapi import Form
 from websocket import websocket_endpoint
 from typing import Dict
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-import requests
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 
-import crud, models, schemas, websocket
-from database import SessionLocal, engine
+import crud, async_crud, models, schemas, websocket, migrations, cache, jobs, gpu, media, http_cache, serialization, metrics, catalog_io, reports, purge, idempotency, warmup
+from database import SessionLocal, ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal, engine
+from database import read_engine, async_engine, async_read_engine
 import time
+import re
+
+# 서버가 떠 있는 동안 GPU 복원 작업 워커를 함께 실행
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 스키마 버전만 확인한다 (테이블 생성과 마이그레이션은 python manage.py migrate)
+    await run_in_threadpool(migrations.check_schema, engine)
+    # 스레드풀의 동기 코드도 WebSocket 이벤트를 보낼 수 있도록 허브를 미리 시작한다
+    await websocket.hub.start()
+    worker = jobs.start_worker() if jobs.GPU_WORKER_ENABLED else None
+    await run_in_threadpool(purge.resume_jobs)
+    # S3/GPU 클라이언트와 DB 커넥션, 카탈로그 캐시를 미리 만든다 (끝나면 /healthz/ready 가 200)
+    warming = asyncio.create_task(warmup.run(app))
+    try:
+        yield
+    finally:
+        for task in (warming, worker):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        await websocket.hub.close()
+        await gpu.close_http_client()
+        crud.close_s3_client()
+        media.shutdown_process_pool()
 
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 UPLOAD_DIR = "./photo"
 
@@ -29,6 +59,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 응답 압축 (brotli-asgi 가 설치되어 있으면 br 우선, 아니면 gzip)
+# .splat 은 Range 요청으로 받으므로 압축하지 않는다
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=http_cache.COMPRESSION_MINIMUM_SIZE,
+        excluded_handlers=[r"^/api/items/\d+/splat$"],
+    )
+else:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=http_cache.COMPRESSION_MINIMUM_SIZE,
+        compresslevel=6,
+        exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/octet-stream",),
+    )
+
+# 지표 수집: 라우트별 지연 시간/처리 중인 요청 수, 요청당 SQL 수/시간, WebSocket 연결 수
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine, "primary")
+metrics.instrument_engine(async_engine, "primary")
+if read_engine is not engine:
+    metrics.instrument_engine(read_engine, "replica")
+    metrics.instrument_engine(async_read_engine, "replica")
+metrics.Gauge("websocket_connections", "Open /ws connections", function=lambda: len(websocket.client_connections))
+
+# Prometheus 수집용
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 로드 밸런서용: 시작 준비가 끝난 워커만 200 (스레드풀이 준비 작업으로 바빠도 바로 답하도록 async)
+@app.get("/healthz/ready", include_in_schema=False)
+async def read_ready():
+    status = warmup.status()
+    return serialization.ORJSONResponse(status, status_code=200 if status["ready"] else 503)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -36,6 +107,23 @@ def get_db():
     finally:
         db.close()
 
+# 읽기 전용 라우트용 세션 (DB_READ_URL 복제본으로 보낸다)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# async def 라우트용 세션 (이벤트 루프를 막지 않는다)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 api_router = APIRouter(prefix="/api")
 
 app.websocket("/ws")(websocket_endpoint)
@@ -57,10 +145,15 @@ def login(user: schemas.UserSchema, db: Session = Depends(get_db)):
     return True
 
 # 모든 사용자 보기
-@api_router.get("/users/", response_model=List[schemas.UserSchema])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+@api_router.get("/users/", response_model=schemas.UserPage)
+def read_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    skip: Optional[int] = Query(None, deprecated=True),
+    db: Session = Depends(get_read_db),
+):
+    users, next_cursor = crud.get_users(db, cursor=cursor, skip=skip, limit=limit)
+    return {"users": users, "next_cursor": next_cursor}
 
 # 상품 등록
 @api_router.post("/items/")
@@ -72,20 +165,14 @@ async def create_item(
     category_id: int = Form(...),
     image: UploadFile = File(None),
     video: UploadFile = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        # 이미지와 동영상을 S3에 업로드하고 경로 획득
-        image_path = None
-        video_path = None
-
-        if image:
-            image_path = crud.upload_file_to_s3(image)
-        if video:
-            video_path = crud.upload_file_to_s3(video)
+        # 이미지와 동영상을 S3에 동시에 업로드하고 경로 획득
+        image_path, video_path = await crud.upload_files_to_s3(image, video)
 
         # 데이터베이스에 아이템 생성 및 이미지 및 동영상 경로 저장
-        db_item = crud.create_item(
+        db_item = await async_crud.create_item(
             db,
             schemas.ItemSchema(
                 name=name,
@@ -98,37 +185,144 @@ async def create_item(
             image_path,
             video_path
         )
-        #crud.send_video(db, db_item.id)
-        background_tasks.add_task(crud.send_video, db, db_item.id)
+        # 동영상은 GPU 작업 큐(jobs.py)를 통해 GPU 서버로 전송된다
+        # 목록용 축소 이미지는 응답 후 프로세스 풀에서 만든다
+        if image_path:
+            background_tasks.add_task(media.process_image, db_item.id, image_path)
         return {"item": db_item}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# 모든 상품 목록 조회
-@api_router.get("/items/", response_model=List[schemas.ItemResponseModel])
-def read_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = crud.get_items(db, skip=skip, limit=limit)
-    return items
+# 미디어 직접 업로드용 presigned URL 발급 (큰 파일은 멀티파트)
+@api_router.post("/uploads/presign", response_model=schemas.PresignUploadResponse)
+def presign_upload(request: schemas.PresignUploadRequest, db: Session = Depends(get_db)):
+    return crud.create_presigned_upload(
+        db, request.item_id, request.kind, request.filename, request.content_type, request.size
+    )
+
+# 멀티파트 직접 업로드 완료
+@api_router.post("/uploads/complete")
+def complete_upload(request: schemas.CompleteUploadRequest):
+    crud.complete_presigned_upload(request.key, request.upload_id, request.parts)
+    return {"key": request.key}
+
+# 직접 업로드한 이미지/동영상을 확인하고 상품에 등록
+@api_router.post("/items/{item_id}/media", response_model=schemas.ItemResponseModel)
+def finalize_item_media(
+    item_id: int,
+    request: schemas.FinalizeMediaRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    db_item = crud.finalize_item_media(db, item_id, request.kind, request.key, size=request.size)
+    if request.kind == "image":
+        background_tasks.add_task(media.process_image, db_item.id, db_item.image)
+    return db_item
+
+# 카탈로그 일괄 등록 (CSV/JSONL, 카테고리는 이름으로 찾는다)
+@api_router.post("/items/import", response_model=schemas.CatalogImportReport)
+def import_items(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl"]] = None,
+    create_categories: bool = False,
+    db: Session = Depends(get_db),
+):
+    fmt = format or catalog_io.detect_format(file.filename)
+    return catalog_io.import_items(db, file.file, fmt, create_categories=create_categories)
+
+# 제품/주문 전체를 JSONL 로 내려받기 (배치로 읽어 바로 흘려보낸다)
+@api_router.get("/export/{table}")
+def export_table(table: Literal["items", "orders"]):
+    return StreamingResponse(
+        catalog_io.export_jsonl(ReadSessionLocal, table),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{table}.jsonl"'},
+    )
+
+ItemSort = Literal["id", "rating", "price", "price_desc", "newest"]
+
+def _check_price_range(min_price: Optional[int], max_price: Optional[int]):
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="min_price must not be greater than max_price")
+
+# 모든 상품 목록 조회 (category_id 를 여러 번 주면 그 카테고리들의 제품만)
+@api_router.get("/items/", response_model=schemas.ItemPage)
+def read_items(
+    request: Request,
+    response: Response,
+    sort: ItemSort = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    skip: Optional[int] = Query(None, deprecated=True),
+    category_id: Optional[List[int]] = Query(None),
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    _check_price_range(min_price, max_price)
+    page = crud.get_items_cached(
+        db, cursor=cursor, skip=skip, limit=limit, sort=sort,
+        category_ids=category_id, min_price=min_price, max_price=max_price,
+    )
+    etag = http_cache.etag_for(page["items"], page["next_cursor"])
+    return http_cache.check_not_modified(request, response, etag) or serialization.ORJSONResponse(
+        page, headers=response.headers
+    )
 
 # 카테고리 별 상품 목록 조회
-@api_router.get("/items/category/{category_id}", response_model=List[schemas.ItemResponseModel])
-def get_items_by_category(category_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = crud.get_items_by_category(db, category_id=category_id, skip=skip, limit=limit)
-    return items
+@api_router.get("/items/category/{category_id}", response_model=schemas.ItemPage)
+def get_items_by_category(
+    request: Request,
+    response: Response,
+    category_id: int,
+    sort: ItemSort = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    skip: Optional[int] = Query(None, deprecated=True),
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    _check_price_range(min_price, max_price)
+    page = crud.get_items_by_category_cached(
+        db, category_id=category_id, cursor=cursor, skip=skip, limit=limit, sort=sort,
+        min_price=min_price, max_price=max_price,
+    )
+    etag = http_cache.etag_for(page["items"], page["next_cursor"])
+    return http_cache.check_not_modified(request, response, etag) or serialization.ORJSONResponse(
+        page, headers=response.headers
+    )
+
+# 카테고리별 제품 수와 가격대별 제품 수 (category_id 를 주면 가격대는 그 카테고리들 기준)
+@api_router.get("/items/facets", response_model=schemas.ItemFacets)
+def read_item_facets(category_id: Optional[List[int]] = Query(None), db: Session = Depends(get_read_db)):
+    return crud.get_facets_cached(db, category_ids=category_id)
 
 # 제품 명 검색
 @api_router.get("/items/search/{item_name}", response_model=List[schemas.ItemResponseModel])
-def search_items_by_name(item_name: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = crud.search_items_by_name(db, name=item_name, skip=skip, limit=limit)
-    return items
+def search_items_by_name(
+    request: Request,
+    response: Response,
+    item_name: str,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+):
+    items = serialization.rows_to_dicts(
+        crud.search_items_by_name(db, name=item_name, skip=skip, limit=limit), schemas.ItemResponseModel
+    )
+    return http_cache.check_not_modified(request, response, http_cache.etag_for(items)) or serialization.ORJSONResponse(
+        items, headers=response.headers
+    )
 
 # 상품 상세 보기
 @api_router.get("/items/{item_id}", response_model=schemas.ItemResponseModel)
-def read_item(item_id: int, db: Session = Depends(get_db)):
-    item = crud.get_item(db, item_id=item_id)
+def read_item(item_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    item = crud.get_item_cached(db, item_id=item_id)
     if item is None:
         raise HTTPException(status_code=404, detail="item not found")
-    return item
+    etag = http_cache.etag_for([item])
+    return http_cache.check_not_modified(request, response, etag, http_cache.last_modified_for([item])) or item
 
 # 카테고리 생성
 @api_router.post("/categorys", response_model=schemas.CategorySchema)
@@ -136,10 +330,18 @@ def create_item_category(category: schemas.CategorySchema, db: Session = Depends
     return crud.create_item_category(db=db, category=category)
 
 # 전체 리뷰 불러오기
-@api_router.get("/reviews/", response_model=List[schemas.ReviewSchema])
-def read_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    reviews = crud.get_reviews(db, skip=skip, limit=limit)
-    return reviews
+@api_router.get("/reviews/", response_model=schemas.ReviewPage)
+def read_reviews(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    skip: Optional[int] = Query(None, deprecated=True),
+    db: Session = Depends(get_read_db),
+):
+    reviews, next_cursor = crud.get_reviews(db, cursor=cursor, skip=skip, limit=limit)
+    return serialization.ORJSONResponse({
+        "reviews": serialization.rows_to_dicts(reviews, schemas.ReviewSchema),
+        "next_cursor": next_cursor,
+    })
 
 # 리뷰 생성
 @api_router.post("/items/{item_id}/reviews/", response_model=schemas.ReviewSchema)
@@ -148,52 +350,138 @@ def create_review_for_item(item_id: int, review: schemas.ReviewSchema, db: Sessi
 
 # 제품별 리뷰 불러오기
 @api_router.get("/items/{item_id}/reviews/", response_model=List[schemas.ReviewSchema])
-def read_item_reviews(item_id: int, db: Session = Depends(get_db)):
+def read_item_reviews(item_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     reviews = crud.get_item_reviews(db=db, item_id=item_id)
-    return reviews
-
-# 주문하기
-@api_router.post("/order/", response_model=schemas.OrderSchema)
-def create_order(order: schemas.OrderSchema, db: Session = Depends(get_db)):
-    item = crud.get_item_by_id(db, item_id=order.item_id)
+    return http_cache.check_not_modified(request, response, http_cache.etag_for(reviews)) or serialization.ORJSONResponse(
+        serialization.rows_to_dicts(reviews, schemas.ReviewSchema), headers=response.headers
+    )
+
+# 유저ID로 작성한 리뷰 조회 (제품 이름/이미지/가격 포함, 최신순)
+@api_router.get("/reviews/user/{user_id}", response_model=schemas.ReviewHistoryPage)
+def read_user_reviews(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    db: Session = Depends(get_read_db),
+):
+    user = crud.get_user_by_id(db, user_id=user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    user = crud.get_user_by_id(db, user_id=order.user_id)
+    reviews, next_cursor = crud.get_user_review_history(db, user_id=user_id, cursor=cursor, limit=limit)
+    return {"reviews": reviews, "next_cursor": next_cursor}
 
-    item.price = item.price * order.count
+# 결제/주문 재시도용 Idempotency-Key 헤더
+IdempotencyKey = Header(None, alias="Idempotency-Key", max_length=idempotency.IDEMPOTENCY_KEY_MAX_LENGTH)
 
-    db_order = crud.create_order(db=db, order=order)
-    return db_order
+# 주문하기
+@api_router.post("/order/", response_model=schemas.OrderSchema)
+def create_order(order: schemas.OrderSchema, db: Session = Depends(get_db), idempotency_key: Optional[str] = IdempotencyKey):
+    def place_order():
+        item = crud.get_item_by_id(db, item_id=order.item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        user = crud.get_user_by_id(db, user_id=order.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if item.price is None:
+            raise HTTPException(status_code=400, detail=f"Item has no price: {[item.id]}")
+
+        # 주문 금액은 제품 가격 * 수량 (세션에 붙어 있는 제품 가격은 건드리지 않는다)
+        order.price = item.price * order.count
+
+        db_order = crud.create_order(db=db, order=order)
+        return schemas.OrderSchema.model_validate(db_order, from_attributes=True)
+
+    return idempotency.run("order", idempotency_key, order.model_dump(exclude={"price"}), place_order)
+
+# 장바구니 일괄 주문
+@api_router.post("/orders/batch", response_model=List[schemas.OrderSchema])
+def create_orders_batch(
+    batch: schemas.BatchOrderSchema,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = IdempotencyKey,
+):
+    return idempotency.run("orders_batch", idempotency_key, batch, lambda: crud.create_orders_batch(db, batch.orders))
 
 # 유저ID로 주문 내역 조회
 @api_router.get("/orders/user/{user_id}", response_model=List[schemas.OrderSchema])
-def get_orders_by_user(user_id: int, db: Session = Depends(get_db)):
+def get_orders_by_user(user_id: int, db: Session = Depends(get_read_db)):
     user = crud.get_user_by_id(db, user_id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     orders = crud.get_orders_by_user(db, user_id=user_id)
-    
-    return orders
+    return serialization.ORJSONResponse(serialization.rows_to_dicts(orders, schemas.OrderSchema))
+
+# 유저ID로 주문 내역 조회 (제품 이름/이미지/가격 포함, 최신순)
+@api_router.get("/orders/user/{user_id}/history", response_model=schemas.OrderHistoryPage)
+def get_order_history(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    db: Session = Depends(get_read_db),
+):
+    user = crud.get_user_by_id(db, user_id=user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    orders, next_cursor = crud.get_order_history(db, user_id=user_id, cursor=cursor, limit=limit)
+    return {"orders": orders, "next_cursor": next_cursor}
 
 # 상품ID로 주문 내역 조회
 # item.user_id와 조회하는 Id가 다를 경우 접근 불가
 @api_router.get("/orders/items/{item_id}", response_model=List[schemas.OrderSchema])
-def get_orders_by_item(item_id: int, db: Session = Depends(get_db)):
+def get_orders_by_item(item_id: int, db: Session = Depends(get_read_db)):
     item = crud.get_item_by_id(db, item_id=item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
     orders = crud.get_orders_by_item(db, item_id=item_id)
-    return orders
+    return serialization.ORJSONResponse(serialization.rows_to_dicts(orders, schemas.OrderSchema))
 
 # 결제 완료
 @api_router.put("/order/pay/{order_id}", response_model=schemas.OrderSchema)
-def update_order_payment(order_id: int, db: Session = Depends(get_db)):
-    db_order = crud.update_order_payment(db, order_id=order_id)
-    if db_order:
-        return db_order
-    else:
-        raise HTTPException(status_code=404, detail="Order not found")
+def update_order_payment(order_id: int, db: Session = Depends(get_db), idempotency_key: Optional[str] = IdempotencyKey):
+    def pay():
+        db_order = crud.update_order_payment(db, order_id=order_id)
+        if db_order:
+            return db_order
+        else:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+    return idempotency.run("order_pay", idempotency_key, {"order_id": order_id}, pay)
+
+# 매출 리포트 (집계 테이블만 읽는다, 기간 기본값은 최근 REPORT_DEFAULT_DAYS 일)
+def _report_range(start: Optional[date], end: Optional[date]):
+    start, end = reports.date_range(start, end)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start, end
+
+# 기간 내 매출/판매량 상위 제품
+@api_router.get("/reports/top-items", response_model=schemas.TopItemsReport)
+def report_top_items(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    by: Literal["revenue", "units", "paid_revenue"] = "revenue",
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    start, end = _report_range(start, end)
+    return {"start": start, "end": end, "items": reports.top_items(db, start, end, by=by, limit=limit)}
+
+# 기간 내 카테고리별 매출 (daily=true 면 날짜별)
+@api_router.get("/reports/category-revenue", response_model=schemas.CategoryRevenueReport)
+def report_category_revenue(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    daily: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    start, end = _report_range(start, end)
+    return {"start": start, "end": end, "categories": reports.category_revenue(db, start, end, daily=daily)}
     
 '''
 # .jpeg 업로드
@@ -226,40 +514,106 @@ async def create_upload_file(file: UploadFile = File(...)):
 '''
 
 @api_router.get("/items/{item_id}/multi/")
-async def get_item_multi_paths(item_id: int, db: Session = Depends(get_db)):
-    db_item = crud.get_item(db, item_id=item_id)
+async def get_item_multi_paths(item_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    media = await async_crud.get_item_media_cached(db, item_id=item_id)
     
-    if not db_item:
+    if not media:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    return {
-        "image_path": db_item.image,
-        "video_path": db_item.video,
-        "splat_path": db_item.splat
-    }
+    return media
 
 @api_router.get("/items/{item_id}/image/")
-async def get_item_multi_paths(item_id: int, db: Session = Depends(get_db)):
-    db_item = crud.get_item(db, item_id=item_id)
+async def get_item_multi_paths(item_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    media = await async_crud.get_item_media_cached(db, item_id=item_id)
     
-    if not db_item:
+    if not media:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    return db_item.image
+    return media["image_path"]
+
+# 제품의 3D 복원 작업 상태
+@api_router.get("/items/{item_id}/gpu-job", response_model=schemas.GpuJobSchema)
+async def get_item_gpu_job(item_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    job = await async_crud.get_latest_gpu_job(db, item_id=item_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="GPU job not found")
+    return job
 
 # GPU 서버에서 이미지 받아오기
 @api_router.put("/receive")
-def receive_splat(item_id: int, splat_uuid: str, db: Session = Depends(get_db)):
+def receive_splat(item_id: int, splat_uuid: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     try:
-        return crud.receive_splat(db, item_id, splat_uuid)
+        db_item = crud.receive_splat(db, item_id, splat_uuid)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.delete("/category")
-def delete_other_category_items(db: Session = Depends(get_db)):
-    crud.delete_items_in_other_category(db)
+    # .ply 를 점진적 렌더링용 .splat 으로 변환 (프로세스 풀에서 실행)
+    if db_item and db_item.splat:
+        background_tasks.add_task(media.process_splat, item_id, db_item.splat)
+    return db_item
 
-    return True
+# 단일 구간 Range 헤더 (bytes=a-b, bytes=a-, bytes=-n)
+RANGE_PATTERN = re.compile(r"bytes=(\d+-\d*|-\d+)")
+SPLAT_CHUNK_SIZE = 64 * 1024
+
+# 변환된 .splat 다운로드: Range 요청을 지원하므로 뷰어가 앞부분부터 받으면서 렌더링할 수 있다
+@api_router.get("/items/{item_id}/splat")
+async def download_item_splat(item_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    media_paths = await async_crud.get_item_media_cached(db, item_id=item_id)
+    if not media_paths or not media_paths.get("compact_splat_path"):
+        raise HTTPException(status_code=404, detail="Splat not found")
+
+    byte_range = request.headers.get("range")
+    if byte_range and not RANGE_PATTERN.fullmatch(byte_range.replace(" ", "")):
+        raise HTTPException(status_code=416, detail="Only a single byte range is supported")
+
+    bucket, s3_key = crud.s3_location_from_url(media_paths["compact_splat_path"])
+    try:
+        s3_object = await run_in_threadpool(crud.get_s3_object_range, bucket, s3_key, byte_range)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code == "InvalidRange":
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable")
+        if code in ("NoSuchKey", "404"):
+            raise HTTPException(status_code=404, detail="Splat not found")
+        raise HTTPException(status_code=502, detail="Failed to read splat from S3")
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(s3_object["ContentLength"])}
+    if s3_object.get("ETag"):
+        headers["ETag"] = s3_object["ETag"]
+    status_code = 200
+    if s3_object.get("ContentRange"):
+        headers["Content-Range"] = s3_object["ContentRange"]
+        status_code = 206
+
+    return StreamingResponse(
+        iterate_in_threadpool(s3_object["Body"].iter_chunks(SPLAT_CHUNK_SIZE)),
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+# '기타' 카테고리 제품 일괄 삭제: 작업만 만들고 바로 202 를 돌려준다 (진행 상황은 Location 의 작업 조회)
+@api_router.delete("/category", status_code=202, response_model=schemas.PurgeJobSchema)
+def delete_other_category_items(response: Response, db: Session = Depends(get_db)):
+    job, created = purge.create_job(db)
+    if created:
+        purge.start(job.id)
+    response.headers["Location"] = f"/api/purge-jobs/{job.id}"
+    return job
+
+# 일괄 삭제 작업 진행 상황
+@api_router.get("/purge-jobs/{job_id}", response_model=schemas.PurgeJobSchema)
+def read_purge_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(models.PurgeJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job
+
+# 카탈로그 캐시 적중/실패 횟수
+@api_router.get("/cache/stats")
+def read_cache_stats():
+    return cache.stats()
 
 app.include_router(api_router)
 
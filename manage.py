@@ -0,0 +1,166 @@
+import argparse
+import sys
+from concurrent.futures import as_completed
+from datetime import date
+
+import cache
+import catalog_io
+import crud
+import facets
+import media
+import migrations
+import models
+import reports
+from database import SessionLocal, ReadSessionLocal, engine
+
+# 운영용 일회성 명령: python manage.py <command>
+
+
+# 테이블을 만들고 적용되지 않은 마이그레이션을 적용한다 (배포할 때 워커를 띄우기 전에 한 번)
+def migrate(args):
+    before = migrations.stored_version(engine)
+    migrations.migrate(engine)
+    print(f"Schema version {before} -> {migrations.LATEST_VERSION}")
+
+
+# 리뷰 수/별점 집계를 reviews 테이블 기준으로 다시 채운다
+def backfill_review_stats(args):
+    db = SessionLocal()
+    try:
+        crud.rebuild_review_stats(db)
+        db.commit()
+        print("Review stats rebuilt")
+    finally:
+        db.close()
+
+
+# 축소 이미지가 없는 제품의 파생본을 프로세스 풀에서 만든다 (--all 이면 전부 다시 만든다)
+def backfill_image_variants(args):
+    db = SessionLocal()
+    try:
+        query = db.query(models.Item.id, models.Item.image).filter(models.Item.image.isnot(None))
+        if not args.all:
+            query = query.filter(models.Item.image_variants.is_(None))
+        items = query.order_by(models.Item.id).all()
+        print(f"Building image variants for {len(items)} items")
+
+        pool = media.get_process_pool()
+        futures = {pool.submit(media.build_image_variants, image_url): (item_id, image_url) for item_id, image_url in items}
+        done = failed = 0
+        for future in as_completed(futures):
+            item_id, image_url = futures[future]
+            try:
+                variants = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Item {item_id}: failed ({e!r})")
+                continue
+            db.query(models.Item).filter(models.Item.id == item_id, models.Item.image == image_url).update(
+                {models.Item.image_variants: variants}, synchronize_session=False
+            )
+            db.commit()
+            cache.invalidate_item(item_id)
+            done += 1
+        print(f"Image variants built: {done}, failed: {failed}")
+    finally:
+        media.shutdown_process_pool()
+        db.close()
+
+
+# CSV/JSONL 카탈로그 일괄 등록
+def import_catalog(args):
+    fmt = args.format or catalog_io.detect_format(args.path)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            report = catalog_io.import_items(
+                db, f, fmt, create_categories=args.create_categories, chunk_size=args.chunk_size
+            )
+    finally:
+        db.close()
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"Imported {report['inserted']} items, created {report['categories_created']} categories, "
+          f"{report['error_count']} rows failed")
+
+
+# 제품/주문을 JSONL 로 내보내기 (--output 이 없으면 표준 출력)
+def export_table(args):
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in catalog_io.export_jsonl(ReadSessionLocal, args.table):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+# 매출 집계를 orders 에서 다시 계산한다 (--since 이후 날짜만)
+def rebuild_sales_rollups(args):
+    db = SessionLocal()
+    try:
+        reports.rebuild_sales_rollups(db, since=args.since)
+        db.commit()
+        print("Sales rollups rebuilt" + (f" since {args.since}" if args.since else ""))
+    finally:
+        db.close()
+
+
+# 카테고리/가격대별 제품 수를 items 에서 다시 계산한다 (FACET_PRICE_BUCKETS 를 바꾼 뒤)
+def rebuild_facets(args):
+    db = SessionLocal()
+    try:
+        facets.rebuild_facets(db)
+        db.commit()
+        cache.invalidate_item_lists()
+        print("Facet counts rebuilt")
+    finally:
+        db.close()
+
+
+COMMANDS = {
+    "migrate": (migrate, "create tables and apply pending schema migrations"),
+    "backfill-review-stats": (backfill_review_stats, "recompute items.review_count/star_sum/rating from reviews"),
+    "backfill-image-variants": (backfill_image_variants, "build thumb/card/detail WebP and JPEG images for items"),
+    "import-catalog": (import_catalog, "bulk import items from a CSV or JSONL file"),
+    "export": (export_table, "stream items or orders as JSONL"),
+    "rebuild-sales-rollups": (rebuild_sales_rollups, "recompute daily item/category sales from orders and archived orders"),
+    "rebuild-facets": (rebuild_facets, "recompute per-category and price bucket item counts"),
+}
+
+# 명령별 추가 인자
+ARGUMENTS = {
+    "backfill-image-variants": [
+        (("--all",), {"action": "store_true", "help": "rebuild variants for items that already have them"}),
+    ],
+    "import-catalog": [
+        (("path",), {"help": "CSV (header row) or JSONL file"}),
+        (("--format",), {"choices": catalog_io.FORMATS, "help": "default: from the file extension"}),
+        (("--create-categories",), {"action": "store_true", "help": "create categories that do not exist yet"}),
+        (("--chunk-size",), {"type": int, "default": catalog_io.CATALOG_CHUNK_SIZE}),
+    ],
+    "export": [
+        (("table",), {"choices": sorted(catalog_io.EXPORTS)}),
+        (("--output", "-o"), {"help": "output file (default: stdout)"}),
+    ],
+    "rebuild-sales-rollups": [
+        (("--since",), {"type": date.fromisoformat, "help": "only rebuild days from this date (YYYY-MM-DD)"}),
+    ],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShoppingMall management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (handler, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        for flags, options in ARGUMENTS.get(name, []):
+            subparser.add_argument(*flags, **options)
+        subparser.set_defaults(handler=handler)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import update
+
+import cache
+import crud
+import models
+import websocket
+from database import AsyncSessionLocal
+
+# 무거운 미디어 변환은 요청 경로가 아니라 프로세스 풀에서 실행한다
+MEDIA_WORKERS = max(int(os.getenv("MEDIA_WORKERS", min(os.cpu_count() or 1, 4))), 1)
+
+_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+    return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# 프로세스 풀 안에서 쓰는 S3 클라이언트 (부모 프로세스의 클라이언트를 fork 로 공유하지 않는다)
+_worker_s3_client = None
+
+
+def _s3():
+    global _worker_s3_client
+    if _worker_s3_client is None:
+        _worker_s3_client = crud.make_s3_client()
+    return _worker_s3_client
+
+
+# ---------------------------------------------------------------------------
+# .ply -> .splat 변환
+#
+# .splat 은 가우시안 하나를 32바이트로 저장한다.
+#   position float32 x3 | scale float32 x3 | rgba uint8 x4 | rotation uint8 x4
+# 색은 0차 SH 계수로, 투명도는 sigmoid 로, 회전은 정규화한 쿼터니언을 8비트로 양자화한다.
+# 크기 * 불투명도가 큰(화면에 많이 보이는) 가우시안부터 저장하므로 앞부분만 받아도 렌더링할 수 있다.
+# ---------------------------------------------------------------------------
+
+SH_C0 = 0.28209479177387814
+
+# numpy/PIL 은 불러오는 데 시간이 걸리므로 프로세스 풀에서 실행하는 변환 함수 안에서 불러온다
+SPLAT_FIELDS = [
+    ("position", "<f4", 3),
+    ("scale", "<f4", 3),
+    ("rgba", "u1", 4),
+    ("rotation", "u1", 4),
+]
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+# binary PLY 의 vertex 요소를 numpy 구조화 배열로 읽는다
+def read_ply_vertices(data: bytes):
+    import numpy as np
+
+    header_end = data.find(b"end_header\n")
+    if not data.startswith(b"ply") or header_end < 0:
+        raise ValueError("Not a PLY file")
+    header = data[:header_end].decode("ascii").splitlines()
+
+    byte_order = None
+    vertex_count = 0
+    fields = []
+    current_element = None
+    for line in header:
+        tokens = line.split()
+        if not tokens:
+            continue
+        if tokens[0] == "format":
+            byte_order = {"binary_little_endian": "<", "binary_big_endian": ">"}.get(tokens[1])
+        elif tokens[0] == "element":
+            current_element = tokens[1]
+            if current_element == "vertex":
+                vertex_count = int(tokens[2])
+        elif tokens[0] == "property" and current_element == "vertex":
+            if tokens[1] == "list":
+                raise ValueError("List properties on vertices are not supported")
+            fields.append((tokens[2], byte_order + PLY_TYPES[tokens[1]]))
+    if byte_order is None:
+        raise ValueError("Only binary PLY files are supported")
+
+    return np.frombuffer(data, dtype=np.dtype(fields), count=vertex_count, offset=header_end + len(b"end_header\n"))
+
+
+def convert_ply_to_splat(data: bytes) -> bytes:
+    import numpy as np
+
+    vertices = read_ply_vertices(data)
+    names = vertices.dtype.names
+
+    def columns(*keys):
+        return np.column_stack([vertices[key].astype(np.float32) for key in keys])
+
+    scales = np.exp(columns("scale_0", "scale_1", "scale_2"))
+    opacity = 1 / (1 + np.exp(-vertices["opacity"].astype(np.float32)))
+    if "f_dc_0" in names:
+        colors = 0.5 + SH_C0 * columns("f_dc_0", "f_dc_1", "f_dc_2")
+    else:
+        colors = columns("red", "green", "blue") / 255
+    rotations = columns("rot_0", "rot_1", "rot_2", "rot_3")
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True).clip(min=1e-12)
+
+    order = np.argsort(-(scales.prod(axis=1) * opacity), kind="stable")
+
+    splat = np.empty(len(vertices), dtype=np.dtype(SPLAT_FIELDS))
+    splat["position"] = columns("x", "y", "z")[order]
+    splat["scale"] = scales[order]
+    splat["rgba"] = np.clip(np.column_stack([colors, opacity]) * 255, 0, 255)[order].astype(np.uint8)
+    splat["rotation"] = np.clip(rotations * 128 + 128, 0, 255)[order].astype(np.uint8)
+    return splat.tobytes()
+
+
+# 프로세스 풀에서 실행: S3 에서 .ply 를 받아 변환하고 같은 버킷에 .splat 으로 올린다
+def convert_splat_object(ply_url: str) -> str:
+    bucket, ply_key = crud.s3_location_from_url(ply_url)
+    ply = _s3().get_object(Bucket=bucket, Key=ply_key)["Body"].read()
+    splat = convert_ply_to_splat(ply)
+
+    splat_key = os.path.splitext(ply_key)[0] + ".splat"
+    _s3().put_object(Bucket=bucket, Key=splat_key, Body=splat, ContentType="application/octet-stream")
+    return crud.s3_url_for(bucket, splat_key)
+
+
+# GPU 서버가 만든 .ply 를 변환해 제품에 기록 (백그라운드 작업)
+async def process_splat(item_id: int, ply_url: str):
+    loop = asyncio.get_running_loop()
+    try:
+        splat_url = await loop.run_in_executor(get_process_pool(), convert_splat_object, ply_url)
+    except Exception as e:
+        print(f"Failed to convert splat for item {item_id}: {e!r}")
+        return
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.Item).where(models.Item.id == item_id).values(compact_splat=splat_url)
+        )
+        await db.commit()
+    cache.invalidate_item(item_id)
+    await websocket.publish_item_event(item_id, "splat", {"compact_splat": splat_url})
+
+
+# ---------------------------------------------------------------------------
+# 이미지 파생본 (목록/카드/상세용 축소본)
+#
+# 원본 이미지는 그대로 두고 긴 변 기준으로 줄인 WebP 와 JPEG 를 원본 옆 키에 올린다.
+#   <원본 키>.thumb.webp, <원본 키>.thumb.jpg, ...
+# 키가 원본마다 달라 내용이 바뀌지 않으므로 긴 Cache-Control 을 붙인다.
+# ---------------------------------------------------------------------------
+
+IMAGE_VARIANTS = {
+    "thumb": int(os.getenv("IMAGE_THUMB_SIZE", 200)),
+    "card": int(os.getenv("IMAGE_CARD_SIZE", 480)),
+    "detail": int(os.getenv("IMAGE_DETAIL_SIZE", 1200)),
+}
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", 80))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": IMAGE_WEBP_QUALITY, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": IMAGE_JPEG_QUALITY, "optimize": True, "progressive": True}),
+}
+IMAGE_EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+
+
+# 이미지 바이트를 받아 {크기 이름: {포맷: 바이트}} 로 줄인 파생본을 만든다
+def make_image_variants(data: bytes) -> dict:
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG 는 가장 큰 파생본 크기까지 디코딩 단계에서 줄여 읽는다 (전체 해상도 디코딩을 피한다)
+    largest = max(IMAGE_VARIANTS.values())
+    image.draft("RGB", (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel("A"))
+    else:
+        image = image.convert("RGB")
+
+    variants = {}
+    # 큰 크기부터 줄여 나가며 앞 단계 결과를 다시 줄인다
+    for name, size in sorted(IMAGE_VARIANTS.items(), key=lambda entry: -entry[1]):
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        variants[name] = {}
+        for fmt, (pil_format, _, options) in IMAGE_FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            variants[name][fmt] = buffer.getvalue()
+    return variants
+
+
+# 프로세스 풀에서 실행: S3 의 원본 이미지로 파생본을 만들어 올리고 URL 을 돌려준다
+def build_image_variants(image_url: str) -> dict:
+    bucket, image_key = crud.s3_location_from_url(image_url)
+    data = _s3().get_object(Bucket=bucket, Key=image_key)["Body"].read()
+
+    urls = {}
+    for name, formats in make_image_variants(data).items():
+        urls[name] = {}
+        for fmt, body in formats.items():
+            variant_key = f"{image_key}.{name}{IMAGE_EXTENSIONS[fmt]}"
+            _s3().put_object(
+                Bucket=bucket,
+                Key=variant_key,
+                Body=body,
+                ContentType=IMAGE_FORMATS[fmt][1],
+                CacheControl=IMAGE_CACHE_CONTROL,
+            )
+            urls[name][fmt] = crud.s3_url_for(bucket, variant_key)
+    return urls
+
+
+# 업로드된 제품 이미지의 파생본을 만들어 제품에 기록 (백그라운드 작업)
+async def process_image(item_id: int, image_url: str):
+    loop = asyncio.get_running_loop()
+    try:
+        variants = await loop.run_in_executor(get_process_pool(), build_image_variants, image_url)
+    except Exception as e:
+        print(f"Failed to build image variants for item {item_id}: {e!r}")
+        return
+
+    async with AsyncSessionLocal() as db:
+        # 그 사이 이미지가 바뀌었으면 옛 이미지의 파생본으로 덮어쓰지 않는다
+        await db.execute(
+            update(models.Item)
+            .where(models.Item.id == item_id, models.Item.image == image_url)
+            .values(image_variants=variants)
+        )
+        await db.commit()
+    cache.invalidate_item(item_id)
@@ -0,0 +1,262 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# Prometheus 텍스트 형식 지표 (/metrics)
+# prometheus_client 없이 이 서비스에 필요한 Counter / Gauge / Histogram 만 구현한다.
+# 값은 워커 프로세스마다 따로 모이므로 모든 시계열에 worker 라벨을 붙인다 (합계는 Prometheus 에서 sum without (worker))
+
+# 이 시간(ms)보다 오래 걸린 SQL 을 로그로 남긴다 (0 이면 끔)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1024, 16 * 1024, 256 * 1024, 1024 ** 2, 16 * 1024 ** 2, 128 * 1024 ** 2, 1024 ** 3)
+# worker 라벨 값, 지정하지 않으면 프로세스 id (fork 한 워커도 서로 다르도록 읽을 때마다 확인한다)
+METRICS_WORKER = os.getenv("METRICS_WORKER")
+
+_registry = []
+
+
+def worker_label() -> str:
+    return METRICS_WORKER or str(os.getpid())
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [("worker", worker_label())] + [(name, value) for name, value in zip(names, values)] + list(extra)
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        # function 을 주면 /metrics 를 읽을 때 값을 계산한다 (라벨 없는 게이지용)
+        self.function = function
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        if self.function is not None:
+            with self._lock:
+                self._values[()] = self.function()
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# 지표 정의
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled", ("method",))
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of single SQL statements", ("engine",))
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Number of SQL statements run while handling a request", ("route",), COUNT_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request", "Total SQL time spent while handling a request", ("route",),
+)
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("engine",))
+
+S3_UPLOAD_SECONDS = Histogram("s3_upload_duration_seconds", "Server-side S3 upload duration", ("method",))
+S3_UPLOAD_BYTES = Histogram("s3_upload_bytes", "Size of server-side S3 uploads", ("method",), BYTES_BUCKETS)
+S3_UPLOAD_ERRORS = Counter("s3_upload_errors_total", "Failed server-side S3 uploads", ("method",))
+
+GPU_REQUEST_SECONDS = Histogram("gpu_request_duration_seconds", "GPU server call latency", ("operation",))
+GPU_REQUEST_ERRORS = Counter("gpu_request_errors_total", "Failed GPU server calls", ("operation",))
+
+WS_MESSAGES_DROPPED = Counter(
+    "websocket_messages_dropped_total", "WebSocket updates replaced by a newer one or dropped for slow clients", ("reason",),
+)
+WS_CONNECTIONS_REJECTED = Counter("websocket_connections_rejected_total", "WebSocket connections over WS_MAX_CONNECTIONS")
+WS_SLOW_CLIENTS_CLOSED = Counter("websocket_slow_clients_closed_total", "WebSocket clients closed after WS_SEND_TIMEOUT")
+
+
+# with 블록의 실행 시간을 기록하고, 예외가 나면 오류 수를 센다
+@contextmanager
+def track(histogram: Histogram, errors: Counter = None, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if errors is not None:
+            errors.inc(**labels)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+# ---------------------------------------------------------------------------
+# SQL 계측: 요청마다 [쿼리 수, 누적 시간] 을 contextvar 에 모은다
+# run_in_threadpool 과 async 세션 모두 요청의 컨텍스트를 이어받으므로 같은 리스트에 더해진다.
+# ---------------------------------------------------------------------------
+
+_request_sql = contextvars.ContextVar("request_sql", default=None)
+
+
+def instrument_engine(engine, name: str):
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_SECONDS.observe(elapsed, engine=name)
+        stats = _request_sql.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            DB_SLOW_QUERIES.inc(engine=name)
+            print(f"Slow query ({elapsed * 1000:.1f} ms, {name}): {' '.join(statement.split())[:1000]}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+# ---------------------------------------------------------------------------
+# 라우트별 지연 시간 / 처리 중인 요청 수 (ASGI 미들웨어)
+# 라벨은 실제 경로가 아니라 라우터가 scope 에 남기는 라우트 템플릿(/api/items/{item_id})을 써서
+# 시계열 수가 늘어나지 않게 한다. 라우트는 처리가 끝나야 알 수 있으므로 처리 중인 요청 수는 메서드별로 센다.
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500, "finished": None}
+
+        # 지연 시간은 응답 본문을 다 보낸 시점까지 잰다 (뒤이어 실행되는 BackgroundTasks 는 제외)
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                status["finished"] = time.perf_counter()
+
+        sql = [0, 0.0]
+        token = _request_sql.set(sql)
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (status["finished"] or time.perf_counter()) - start
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            _request_sql.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=status["code"])
+            DB_QUERIES_PER_REQUEST.observe(sql[0], route=route)
+            DB_SECONDS_PER_REQUEST.observe(sql[1], route=route)
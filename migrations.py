@@ -0,0 +1,170 @@
+import os
+
+from sqlalchemy import inspect, text
+
+import facets
+import models
+import reports
+import search
+
+# 서버 시작 시 스키마가 최신이 아니면 직접 마이그레이션한다 (기본값은 중단하고 python manage.py migrate 를 안내)
+# 여러 워커가 동시에 뜨는 배포에서는 끄고, 배포 단계에서 한 번만 migrate 를 실행한다
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+
+# 여러 단계를 하나의 마이그레이션으로 묶는다
+def chain(*steps):
+    def step(conn):
+        for each in steps:
+            each(conn)
+    return step
+
+
+# models 에 선언된 컬럼을 기존 테이블에 추가 (이미 있으면 건너뜀)
+def add_model_columns(table_name, *column_names):
+    def step(conn):
+        existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+        table = models.Base.metadata.tables[table_name]
+        for name in column_names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            ddl = f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+    return step
+
+
+# create_all 로 새로 만든 행이 아니라 컬럼 추가 전부터 있던 행의 값을 채운다
+def fill_nulls(table_name, column_name, sql_value):
+    def step(conn):
+        conn.execute(text(f"UPDATE {table_name} SET {column_name} = {sql_value} WHERE {column_name} IS NULL"))
+    return step
+
+
+# 작성 당시의 SQL 을 그대로 실행한다
+# 배포된 마이그레이션은 바뀌면 안 되므로 현재 모델(onupdate 기본값, 새 컬럼)을 따르는 ORM 쿼리 대신 쓴다
+def run_sql(*statements):
+    def step(conn):
+        for statement in statements:
+            conn.execute(text(statement))
+    return step
+
+
+# models 에 선언된 테이블을 만든다 (이미 있으면 건너뜀)
+def create_model_tables(*names):
+    def step(conn):
+        for name in names:
+            models.Base.metadata.tables[name].create(conn, checkfirst=True)
+    return step
+
+
+# models 에 선언된 인덱스를 이름으로 찾아 만든다 (이미 있으면 건너뜀)
+def create_model_indexes(*names):
+    def step(conn):
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in names:
+                    index.create(conn, checkfirst=True)
+    return step
+
+
+# create_all 로 만들 수 없는 스키마 변경(가상 테이블, 트리거, 인덱스, 컬럼 추가)을 순서대로 적용한다.
+# create_all 로 새로 만든 DB 에도 그대로 적용되므로 각 단계는 IF NOT EXISTS 처럼 멱등하게 작성한다.
+MIGRATIONS = [
+    (1, "items full-text search index", search.create_search_index),
+    (2, "items (category_id, id) index", create_model_indexes("ix_items_category_id_id")),
+    (3, "item review aggregates", chain(
+        add_model_columns("items", "review_count", "star_sum", "rating"),
+        create_model_indexes("ix_items_rating_id", "ix_items_category_id_rating_id"),
+        # 당시의 crud.rebuild_review_stats
+        run_sql(
+            "UPDATE items SET "
+            "review_count = (SELECT count(reviews.id) FROM reviews WHERE reviews.item_id = items.id), "
+            "star_sum = (SELECT coalesce(sum(reviews.star), 0) FROM reviews WHERE reviews.item_id = items.id), "
+            "rating = CASE WHEN (SELECT count(reviews.id) FROM reviews WHERE reviews.item_id = items.id) > 0 "
+            "THEN (SELECT coalesce(sum(reviews.star), 0) FROM reviews WHERE reviews.item_id = items.id) * 1.0 "
+            "/ (SELECT count(reviews.id) FROM reviews WHERE reviews.item_id = items.id) ELSE 0.0 END"
+        ),
+    )),
+    (4, "orders/reviews foreign key indexes", create_model_indexes(
+        "ix_orders_user_id_id", "ix_orders_item_id_id", "ix_reviews_item_id_id", "ix_reviews_user_id_id",
+    )),
+    (5, "items.compact_splat", add_model_columns("items", "compact_splat")),
+    (6, "items.image_variants", add_model_columns("items", "image_variants")),
+    (7, "updated_at on items/categories/reviews", chain(
+        add_model_columns("items", "updated_at"),
+        add_model_columns("categories", "updated_at"),
+        add_model_columns("reviews", "updated_at"),
+        fill_nulls("items", "updated_at", "CURRENT_TIMESTAMP"),
+        fill_nulls("categories", "updated_at", "CURRENT_TIMESTAMP"),
+        fill_nulls("reviews", "updated_at", "CURRENT_TIMESTAMP"),
+    )),
+    # 이전 주문은 주문 시각을 알 수 없으므로 마이그레이션한 날의 매출로 집계된다
+    (8, "orders.created_at and sales rollups", chain(
+        add_model_columns("orders", "created_at"),
+        fill_nulls("orders", "created_at", "CURRENT_TIMESTAMP"),
+        reports.rebuild_sales_rollups,
+    )),
+    (9, "items price indexes and facet counts", chain(
+        create_model_indexes("ix_items_price_id", "ix_items_category_id_price_id"),
+        facets.rebuild_facets,
+    )),
+    # 카탈로그 가져오기로 description 없이 들어간 제품 (제품 응답에서 description 은 필수 문자열)
+    (10, "empty descriptions of imported items", fill_nulls("items", "description", "''")),
+    # archived_orders 테이블은 create_all 이 만든다
+    (11, "purge_jobs.orders_archived", add_model_columns("purge_jobs", "orders_archived")),
+    (12, "idempotency_keys table", create_model_tables("idempotency_keys")),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+# 아직 적용되지 않은 마이그레이션을 단계별 트랜잭션으로 적용
+def upgrade(engine):
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    for target, description, step in MIGRATIONS:
+        if target <= version:
+            continue
+        print(f"Applying migration {target}: {description}")
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": target})
+
+
+# 스키마를 최신으로 만든다: 테이블 생성(create_all) 후 마이그레이션 (python manage.py migrate)
+def migrate(engine):
+    models.Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+
+
+# 적용된 스키마 버전을 읽기만 한다 (schema_version 이 없으면 0)
+def stored_version(engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("schema_version"):
+            return 0
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+# 서버 시작 시 확인: 최신이면 쿼리 한두 번으로 끝난다
+def check_schema(engine, auto_migrate: bool = AUTO_MIGRATE):
+    version = stored_version(engine)
+    if version >= LATEST_VERSION:
+        return
+    if not auto_migrate:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {LATEST_VERSION}. "
+            "Run 'python manage.py migrate' (or set AUTO_MIGRATE=true)."
+        )
+    migrate(engine)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Index, Float, Date, DateTime, JSON
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -21,10 +23,18 @@ class Item(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(255), nullable=True)
     image = Column(String(255), nullable=True) # 이미지 파일의 경로 저장
+    image_variants = Column(JSON(none_as_null=True), nullable=True) # 축소 이미지 경로 {"thumb": {"webp": ..., "jpeg": ...}, "card": ..., "detail": ...}
     splat = Column(String(255), nullable=True)
+    compact_splat = Column(String(255), nullable=True) # .ply 를 양자화/정렬한 .splat 경로 (점진적 렌더링용)
     video = Column(String(255), nullable=True) # 동영상 파일의 경로 저장
     description = Column(String(255), nullable=True)
     price = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow) # 마지막 수정 시각 (ETag/Last-Modified)
+
+    # 리뷰 집계 (create_review 에서 같은 트랜잭션으로 갱신)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    star_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating = Column(Float, nullable=False, default=0, server_default="0") # 평균 별점, 별점 순 정렬용
 
     category_id = Column(Integer, ForeignKey("categories.id"))
     category = relationship("Category", backref="items")
@@ -32,6 +42,17 @@ class Item(Base):
     orders = relationship("Order", backref="item")
     reviews = relationship("Review", backref="item")
 
+    __table_args__ = (
+        # 카테고리 별 목록의 키셋 페이지네이션 (category_id, id)
+        Index("ix_items_category_id_id", "category_id", "id"),
+        # 별점 순 정렬
+        Index("ix_items_rating_id", "rating", "id"),
+        Index("ix_items_category_id_rating_id", "category_id", "rating", "id"),
+        # 가격 범위 필터와 가격 순 정렬
+        Index("ix_items_price_id", "price", "id"),
+        Index("ix_items_category_id_price_id", "category_id", "price", "id"),
+    )
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -42,6 +63,29 @@ class Order(Base):
     price = Column(Integer, nullable=True)
     count = Column(Integer, nullable=True)
     pay = Column(Boolean, default=False, nullable=True)
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow) # 주문 시각 (UTC, 매출 집계의 날짜)
+
+    __table_args__ = (
+        # 사용자/제품별 주문 내역 조회와 (user_id, id) 키셋 페이지네이션
+        Index("ix_orders_user_id_id", "user_id", "id"),
+        Index("ix_orders_item_id_id", "item_id", "id"),
+    )
+
+
+# 카테고리 일괄 삭제(purge.py)로 제품이 지워진 주문
+# 매출 집계를 orders 에서 다시 계산해도 지난 매출이 남도록 주문과 당시 카테고리를 옮겨 둔다
+class ArchivedOrder(Base):
+    __tablename__ = "archived_orders"
+
+    id = Column(Integer, primary_key=True) # 원래 주문 id
+    user_id = Column(Integer, nullable=True)
+    item_id = Column(Integer, nullable=True) # 지워진 제품 id (외래 키 아님)
+    category_id = Column(Integer, nullable=True)
+    price = Column(Integer, nullable=True)
+    count = Column(Integer, nullable=True)
+    pay = Column(Boolean, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 
 class Category(Base):
@@ -49,6 +93,7 @@ class Category(Base):
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(255), nullable=True)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow) # 마지막 수정 시각 (ETag/Last-Modified)
 
 
 class Review(Base):
@@ -59,3 +104,107 @@ class Review(Base):
     star = Column(Integer, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     item_id = Column(Integer, ForeignKey("items.id"))
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow) # 마지막 수정 시각 (ETag/Last-Modified)
+
+    __table_args__ = (
+        # 제품별/사용자별 리뷰 조회
+        Index("ix_reviews_item_id_id", "item_id", "id"),
+        Index("ix_reviews_user_id_id", "user_id", "id"),
+    )
+
+
+# GPU 서버 3D 복원 작업 큐
+# queued -> processing (워커가 전송 중, locked_until 까지 점유) -> sent (GPU 서버가 접수) -> done (/api/receive)
+# 전송이 계속 실패하면 failed
+class GpuJob(Base):
+    __tablename__ = "gpu_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    video_uuid = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(String(1024), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # 워커가 실행할 작업을 찾는 조회
+        Index("ix_gpu_jobs_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_gpu_jobs_item_id_id", "item_id", "id"),
+    )
+
+
+# 카테고리 제품 일괄 삭제 작업 (purge.py)
+# queued -> running (locked_until 까지 점유) -> done / failed
+class PurgeJob(Base):
+    __tablename__ = "purge_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    category_name = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    items_total = Column(Integer, nullable=False, default=0) # 시작할 때 센 삭제 대상 제품 수
+    items_deleted = Column(Integer, nullable=False, default=0)
+    orders_deleted = Column(Integer, nullable=False, default=0) # 주문을 지우던 이전 버전의 작업
+    orders_archived = Column(Integer, nullable=False, default=0, server_default="0")
+    reviews_deleted = Column(Integer, nullable=False, default=0)
+    gpu_jobs_deleted = Column(Integer, nullable=False, default=0)
+    s3_objects_deleted = Column(Integer, nullable=False, default=0)
+    s3_errors = Column(Integer, nullable=False, default=0)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(String(1024), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# 카테고리/가격대별 제품 수 (제품 추가/삭제 시 같은 트랜잭션에서 더하고 뺀다, facets.py)
+# bucket 은 FACET_PRICE_BUCKETS 경계로 나눈 구간 번호, 가격이 없는 제품은 -1
+class CategoryPriceBucket(Base):
+    __tablename__ = "category_price_buckets"
+
+    category_id = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    item_count = Column(Integer, nullable=False, default=0)
+
+
+# 매출 집계 (주문 생성/결제 시 같은 트랜잭션에서 더한다, reports.py)
+# 리포트는 orders 를 읽지 않고 이 테이블만 읽는다. revenue 는 주문 금액(제품 가격 * 수량)의 합이다.
+class ItemDailySales(Base):
+    __tablename__ = "item_daily_sales"
+
+    day = Column(Date, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+    paid_count = Column(Integer, nullable=False, default=0)
+    unpaid_count = Column(Integer, nullable=False, default=0)
+    paid_revenue = Column(Integer, nullable=False, default=0)
+
+
+class CategoryDailySales(Base):
+    __tablename__ = "category_daily_sales"
+
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+    paid_count = Column(Integer, nullable=False, default=0)
+    unpaid_count = Column(Integer, nullable=False, default=0)
+    paid_revenue = Column(Integer, nullable=False, default=0)
+
+
+# Idempotency-Key 로 받은 요청의 처리 상태와 응답 (idempotency.py, CACHE_URL 이 없을 때 워커끼리 공유)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(320), primary_key=True) # "범위:키"
+    value = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # 만료된 키 정리
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,50 @@
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+# 커서는 마지막 행의 (정렬 키, id) 값을 base64 로 감싼 불투명한 문자열
+def encode_cursor(values) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+# (sort_column, id) 키셋 페이지네이션
+# OFFSET 대신 마지막으로 본 키 다음부터 인덱스를 탐색하므로 뒤 페이지도 첫 페이지만큼 빠르고,
+# 중간에 행이 추가되어도 페이지가 밀리지 않는다. skip 은 하위 호환용으로만 남겨 둔다.
+def paginate(query, id_column, limit: int, cursor: str = None, skip: int = None,
+             sort_column=None, descending: bool = False):
+    keys = [id_column] if sort_column is None else [sort_column, id_column]
+
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        if len(keys) == 1:
+            condition = id_column < values[0] if descending else id_column > values[0]
+        else:
+            row_key, cursor_key = tuple_(*keys), tuple_(*values)
+            condition = row_key < cursor_key if descending else row_key > cursor_key
+        query = query.filter(condition)
+
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+    return rows, next_cursor
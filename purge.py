@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+
+import cache
+import crud
+import facets
+import models
+from database import SessionLocal
+
+# 카테고리 제품 일괄 삭제 (DELETE /api/category)
+# 제품을 id 순으로 PURGE_BATCH_SIZE 개씩 지우고 배치마다 커밋해서 쓰기 잠금을 짧게 잡는다.
+# 제품의 리뷰/GPU 작업과 패싯 제품 수도 같은 배치에서 지우고, 커밋한 뒤 이미지/동영상/스플랫 S3 객체를 delete_objects 로 지운다.
+# 주문은 지우지 않고 당시 카테고리와 함께 archived_orders 로 옮긴다.
+# 매출 집계(item_daily_sales 등)는 그대로 남고, rebuild_sales_rollups 도 옮긴 주문을 함께 계산하므로 두 값이 같다.
+
+OTHER_CATEGORY_NAME = "기타"
+PURGE_BATCH_SIZE = max(int(os.getenv("PURGE_BATCH_SIZE", 500)), 1)
+# 배치 사이에 쉬는 시간(초): 그사이 다른 요청의 쓰기가 잠금을 잡을 수 있다
+PURGE_BATCH_PAUSE = float(os.getenv("PURGE_BATCH_PAUSE", 0.05))
+# 작업 하나를 점유하는 시간, 배치마다 연장한다
+# 프로세스가 죽어 연장되지 않은 작업은 다음에 서버가 뜰 때 이어서 지운다
+PURGE_JOB_LEASE = float(os.getenv("PURGE_JOB_LEASE", 300))
+# delete_objects 한 번에 지울 수 있는 최대 키 수
+S3_DELETE_BATCH = 1000
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# 제품과 함께 지우는 행: 모델 -> 작업의 삭제 수 컬럼
+DEPENDENTS = (
+    (models.Review, "reviews_deleted"),
+    (models.GpuJob, "gpu_jobs_deleted"),
+)
+
+
+def _claimable(now: datetime):
+    return or_(
+        models.PurgeJob.status == "queued",
+        # 점유한 프로세스가 사라진 작업
+        and_(models.PurgeJob.status == "running", models.PurgeJob.locked_until < now),
+    )
+
+
+# 삭제 작업 추가, 같은 카테고리를 지우는 중인 작업이 있으면 그 작업을 돌려준다
+def create_job(db, category_name: str = OTHER_CATEGORY_NAME):
+    job = db.query(models.PurgeJob).filter(
+        models.PurgeJob.category_name == category_name, models.PurgeJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(models.PurgeJob.id).first()
+    if job:
+        return job, False
+    job = models.PurgeJob(category_name=category_name)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job, True
+
+
+# 제품 행의 미디어 URL 을 버킷별 S3 키로 모은다 (S3 가 아닌 경로는 건너뛴다)
+def _s3_objects(rows) -> dict:
+    objects = defaultdict(set)
+    for row in rows:
+        urls = [row.image, row.video, row.splat, row.compact_splat]
+        for formats in (row.image_variants or {}).values():
+            urls.extend(formats.values())
+        for url in urls:
+            if url and ".s3" in urlparse(url).netloc:
+                bucket, key = crud.s3_location_from_url(url)
+                objects[bucket].add(key)
+    return objects
+
+
+# 버킷별로 최대 S3_DELETE_BATCH 개씩 지운다. (지운 수, 실패 수, 마지막 오류) 를 돌려준다
+def delete_s3_objects(objects: dict):
+    deleted = failed = 0
+    last_error = None
+    for bucket, keys in objects.items():
+        keys = sorted(keys)
+        for start in range(0, len(keys), S3_DELETE_BATCH):
+            chunk = keys[start:start + S3_DELETE_BATCH]
+            try:
+                response = crud.get_s3_client().delete_objects(
+                    Bucket=bucket, Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True}
+                )
+            except (BotoCoreError, ClientError) as e:
+                print(f"Failed to delete {len(chunk)} objects from {bucket}: {e!r}")
+                failed += len(chunk)
+                last_error = repr(e)
+                continue
+            errors = response.get("Errors", [])
+            deleted += len(chunk) - len(errors)
+            failed += len(errors)
+            if errors:
+                last_error = f"{bucket}/{errors[0].get('Key')}: {errors[0].get('Message')}"
+    return deleted, failed, last_error
+
+
+# 작업의 진행 상황을 더하고 점유 시간을 연장한다 (values 로 다른 컬럼도 함께 바꾼다)
+def _progress(db, job_id: int, counts: dict, **values):
+    values = {
+        "locked_until": datetime.utcnow() + timedelta(seconds=PURGE_JOB_LEASE),
+        **{name: getattr(models.PurgeJob, name) + count for name, count in counts.items()},
+        **values,
+    }
+    db.execute(
+        update(models.PurgeJob)
+        .where(models.PurgeJob.id == job_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# 제품의 주문을 archived_orders 로 옮기고 옮긴 수를 돌려준다
+def _archive_orders(db, item_ids: list) -> int:
+    Order = models.Order
+    columns = ["id", "user_id", "item_id", "category_id", "price", "count", "pay", "created_at"]
+    db.execute(
+        insert(models.ArchivedOrder).from_select(columns, select(
+            Order.id, Order.user_id, Order.item_id, crud.ORDER_CATEGORY, Order.price, Order.count, Order.pay,
+            Order.created_at,
+        ).where(Order.item_id.in_(item_ids)))
+    )
+    return db.execute(
+        delete(Order).where(Order.item_id.in_(item_ids)).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _purge_batch(db, job_id: int, rows):
+    item_ids = [row.id for row in rows]
+    counts = {"orders_archived": _archive_orders(db, item_ids)}
+    for model, name in DEPENDENTS:
+        counts[name] = db.execute(
+            delete(model).where(model.item_id.in_(item_ids)).execution_options(synchronize_session=False)
+        ).rowcount
+    counts["items_deleted"] = db.execute(
+        delete(models.Item).where(models.Item.id.in_(item_ids)).execution_options(synchronize_session=False)
+    ).rowcount
+    facets.record_items(db, [(row.category_id, row.price) for row in rows], sign=-1)
+    _progress(db, job_id, counts)
+    db.commit()
+    cache.invalidate_item(*item_ids)
+
+    # DB 에서 지운 뒤에 S3 객체를 지운다 (S3 삭제가 실패해도 제품이 깨진 링크를 갖지 않는다)
+    deleted, failed, last_error = delete_s3_objects(_s3_objects(rows))
+    values = {"last_error": last_error[:1024]} if last_error else {}
+    _progress(db, job_id, {"s3_objects_deleted": deleted, "s3_errors": failed}, **values)
+    db.commit()
+
+
+# 작업 실행: 점유에 성공한 프로세스만 지운다
+def run_job(job_id: int):
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(models.PurgeJob)
+            .where(models.PurgeJob.id == job_id, _claimable(now))
+            .values(status="running", locked_until=now + timedelta(seconds=PURGE_JOB_LEASE))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return
+
+        category_name = db.execute(
+            select(models.PurgeJob.category_name).where(models.PurgeJob.id == job_id)
+        ).scalar_one()
+        category_ids = select(models.Category.id).where(models.Category.name == category_name).scalar_subquery()
+        in_category = models.Item.category_id.in_(category_ids)
+
+        remaining = db.execute(select(func.count(models.Item.id)).where(in_category)).scalar_one()
+        _progress(db, job_id, {}, items_total=models.PurgeJob.items_deleted + remaining)
+        db.commit()
+
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(
+                    models.Item.id, models.Item.category_id, models.Item.price, models.Item.image,
+                    models.Item.image_variants, models.Item.video, models.Item.splat, models.Item.compact_splat,
+                )
+                .where(in_category, models.Item.id > last_id)
+                .order_by(models.Item.id)
+                .limit(PURGE_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            _purge_batch(db, job_id, rows)
+            time.sleep(PURGE_BATCH_PAUSE)
+
+        _progress(db, job_id, {}, status="done", locked_until=None, finished_at=datetime.utcnow())
+        db.commit()
+        print(f"Purge job {job_id} ({category_name}) done")
+    except Exception as e:
+        db.rollback()
+        print(f"Purge job {job_id} failed: {e!r}")
+        _progress(db, job_id, {}, status="failed", locked_until=None, last_error=repr(e)[:1024],
+                  finished_at=datetime.utcnow())
+        db.commit()
+    finally:
+        db.close()
+
+
+# 요청 스레드풀을 오래 잡지 않도록 작업마다 별도 스레드에서 실행한다
+# 서버가 내려가면 스레드도 끝나고, 커밋하지 못한 배치는 롤백되어 다음 시작 때 이어서 지운다
+def start(job_id: int) -> threading.Thread:
+    thread = threading.Thread(target=run_job, args=(job_id,), name=f"purge-{job_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+# 서버 시작 시 끝나지 않은 작업을 이어서 실행
+def resume_jobs():
+    db = SessionLocal()
+    try:
+        job_ids = db.execute(
+            select(models.PurgeJob.id).where(_claimable(datetime.utcnow())).order_by(models.PurgeJob.id)
+        ).scalars().all()
+    finally:
+        db.close()
+    for job_id in job_ids:
+        start(job_id)
@@ -0,0 +1,164 @@
+import os
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import case, delete, func, insert, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+# 매출 집계 (일/제품, 일/카테고리)
+# 주문 생성과 결제가 같은 트랜잭션에서 증분만 더하고(upsert), 리포트 API 는 orders 대신 이 테이블만 읽는다.
+# 집계 전의 주문이나 어긋난 값은 rebuild_sales_rollups 로 orders (와 archived_orders) 에서 다시 계산한다.
+# 날짜는 주문 시각(UTC) 기준이고, 결제는 결제한 날이 아니라 주문한 날의 값을 옮긴다.
+
+# 기간을 지정하지 않았을 때 리포트가 보여 주는 최근 일수
+REPORT_DEFAULT_DAYS = int(os.getenv("REPORT_DEFAULT_DAYS", 30))
+
+COUNTERS = ("units", "revenue", "paid_count", "unpaid_count", "paid_revenue")
+
+# 집계 테이블 -> 키 컬럼 이름
+ROLLUPS = (
+    (models.ItemDailySales, "item_id"),
+    (models.CategoryDailySales, "category_id"),
+)
+
+
+# (day, 키) 별 증분을 INSERT ... ON CONFLICT DO UPDATE 한 번으로 더한다
+# 키를 정렬해서 넣으므로 동시에 들어온 주문끼리 행 잠금 순서가 같다 (PostgreSQL 교착 방지)
+def _upsert(db: Session, model, key_name: str, deltas: dict):
+    if not deltas:
+        return
+    table = model.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", key_name],
+        set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS},
+    )
+    db.execute(statement, [
+        {"day": day, key_name: key, **dict(zip(COUNTERS, values))}
+        for (day, key), values in sorted(deltas.items())
+    ])
+
+
+# entries: (주문 시각, item_id, COUNTERS 순서의 증분) 목록
+# categories: 호출한 쪽이 이미 읽은 item_id -> category_id (없으면 조회한다)
+def _apply(db: Session, entries: list, categories: dict = None):
+    if categories is None:
+        item_ids = {item_id for _, item_id, _ in entries}
+        categories = dict(db.execute(
+            select(models.Item.id, models.Item.category_id).where(models.Item.id.in_(item_ids))
+        ).all())
+
+    deltas = {model: defaultdict(lambda: [0] * len(COUNTERS)) for model, _ in ROLLUPS}
+    for created_at, item_id, values in entries:
+        day = created_at.date()
+        for model, key in ((models.ItemDailySales, item_id), (models.CategoryDailySales, categories.get(item_id))):
+            if key is None:
+                continue
+            totals = deltas[model][(day, key)]
+            for i, value in enumerate(values):
+                totals[i] += value
+
+    for model, key_name in ROLLUPS:
+        _upsert(db, model, key_name, deltas[model])
+
+
+# 새 주문을 집계에 더한다 (커밋은 호출한 쪽에서 주문과 함께)
+def record_orders(db: Session, orders):
+    entries = []
+    for order in orders:
+        price = order.price or 0
+        paid = bool(order.pay)
+        entries.append((order.created_at, order.item_id, (
+            order.count or 0, price, int(paid), int(not paid), price if paid else 0,
+        )))
+    if entries:
+        _apply(db, entries)
+
+
+# 미결제 -> 결제 완료로 바뀐 주문을 집계에 반영한다
+def record_payment(db: Session, order: models.Order, categories: dict = None):
+    price = order.price or 0
+    _apply(db, [(order.created_at, order.item_id, (0, 0, 1, -1, price))], categories)
+
+
+# orders 에서 집계를 다시 계산한다 (since 를 주면 그 날짜부터만)
+# 카테고리 일괄 삭제로 archived_orders 에 옮긴 주문도 당시 제품/카테고리로 더한다
+# Session 과 Connection 모두 받는다 (마이그레이션에서도 사용)
+def rebuild_sales_rollups(db, since=None):
+    Order, Archived = models.Order, models.ArchivedOrder
+    sources = [
+        select(Order.created_at, Order.item_id, models.Item.category_id, Order.count, Order.price, Order.pay)
+            .outerjoin(models.Item, models.Item.id == Order.item_id),
+        select(Archived.created_at, Archived.item_id, Archived.category_id, Archived.count, Archived.price, Archived.pay),
+    ]
+    if since is not None:
+        start = datetime.combine(since, time.min)
+        sources = [source.where(source.selected_columns.created_at >= start) for source in sources]
+    orders = union_all(*sources).subquery("all_orders")
+
+    day = func.date(orders.c.created_at)
+    paid = case((orders.c.pay.is_(True), 1), else_=0)
+    totals = [
+        func.coalesce(func.sum(orders.c.count), 0),
+        func.coalesce(func.sum(orders.c.price), 0),
+        func.sum(paid),
+        func.sum(1 - paid),
+        func.coalesce(func.sum(case((orders.c.pay.is_(True), orders.c.price), else_=0)), 0),
+    ]
+    for model, key_name in ROLLUPS:
+        key = orders.c[key_name]
+        clear = delete(model)
+        if since is not None:
+            clear = clear.where(model.day >= since)
+        source = (
+            select(day, key, *totals)
+            .where(key.isnot(None), orders.c.created_at.isnot(None))
+            .group_by(day, key)
+        )
+        db.execute(clear)
+        db.execute(insert(model).from_select(["day", key_name, *COUNTERS], source))
+
+
+# ---------------------------------------------------------------------------
+# 리포트 (집계 테이블만 읽는다)
+# ---------------------------------------------------------------------------
+
+def date_range(start=None, end=None):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    return start, end
+
+
+def _sums(model):
+    return [func.sum(getattr(model, name)).label(name) for name in COUNTERS]
+
+
+# 기간 내 매출/판매량 상위 제품
+def top_items(db: Session, start, end, by: str = "revenue", limit: int = 10):
+    model = models.ItemDailySales
+    sums = _sums(model)
+    rows = db.execute(
+        select(model.item_id, *sums)
+        .where(model.day >= start, model.day <= end)
+        .group_by(model.item_id)
+        .order_by(sums[COUNTERS.index(by)].desc(), model.item_id)
+        .limit(limit)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+# 기간 내 카테고리별 매출 (daily 면 날짜별로 나눈다)
+def category_revenue(db: Session, start, end, daily: bool = False):
+    model = models.CategoryDailySales
+    keys = [model.category_id, model.day] if daily else [model.category_id]
+    rows = db.execute(
+        select(*keys, *_sums(model))
+        .where(model.day >= start, model.day <= end)
+        .group_by(*keys)
+        .order_by(*keys)
+    ).mappings().all()
+    return [dict(row) for row in rows]
@@ -1,6 +1,7 @@
-from typing import Optional
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional
 from fastapi import File, UploadFile
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class UserSchema(BaseModel):
@@ -25,8 +26,18 @@ class ItemResponseModel(BaseModel):
     price: float
     category_id: int
     image: Optional[str]
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     splat: Optional[str]
     video: Optional[str]
+    compact_splat: Optional[str] = None
+    review_count: int = 0
+    rating: float = 0.0
+    updated_at: Optional[datetime] = None
+
+# 키셋 페이지네이션 응답: next_cursor 를 다음 요청의 cursor 로 넘긴다 (마지막 페이지면 None)
+class ItemPage(BaseModel):
+    items: List[ItemResponseModel]
+    next_cursor: Optional[str] = None
     
 class OrderSchema(BaseModel):
     id: Optional[int] = None
@@ -36,6 +47,31 @@ class OrderSchema(BaseModel):
     count: int
     pay: bool
 
+# 주문/리뷰 내역에 함께 내려주는 제품 요약
+class ItemSummarySchema(BaseModel):
+    id: int
+    name: Optional[str] = None
+    image: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
+    price: Optional[float] = None
+
+class OrderHistorySchema(OrderSchema):
+    item: Optional[ItemSummarySchema] = None
+
+class OrderHistoryPage(BaseModel):
+    orders: List[OrderHistorySchema]
+    next_cursor: Optional[str] = None
+
+# 일괄 주문 한 줄 (가격은 서버에서 제품 가격 * 수량으로 계산)
+class OrderLineSchema(BaseModel):
+    user_id: int
+    item_id: int
+    count: int = Field(gt=0)
+    pay: bool = False
+
+class BatchOrderSchema(BaseModel):
+    orders: List[OrderLineSchema] = Field(min_length=1)
+
 class CategorySchema(BaseModel):
     id: Optional[int] = None
     name: str
@@ -45,4 +81,135 @@ class ReviewSchema(BaseModel):
     content: str
     star: int
     user_id: int
-    item_id: int
\ No newline at end of file
+    item_id: int
+
+class ReviewWithItemSchema(ReviewSchema):
+    item: Optional[ItemSummarySchema] = None
+
+class ReviewHistoryPage(BaseModel):
+    reviews: List[ReviewWithItemSchema]
+    next_cursor: Optional[str] = None
+
+class UserPage(BaseModel):
+    users: List[UserSchema]
+    next_cursor: Optional[str] = None
+
+class ReviewPage(BaseModel):
+    reviews: List[ReviewSchema]
+    next_cursor: Optional[str] = None
+
+class GpuJobSchema(BaseModel):
+    id: int
+    item_id: int
+    video_uuid: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+# 클라이언트 직접 업로드 (presigned URL)
+class PresignUploadRequest(BaseModel):
+    item_id: int
+    kind: Literal["image", "video"]
+    filename: str
+    content_type: str
+    size: int = Field(gt=0)
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+# method 가 POST 면 url 에 fields 를 폼으로 함께 보내고, MULTIPART 면 parts 의 URL 에 part_size 씩 PUT 한다
+class PresignUploadResponse(BaseModel):
+    key: str
+    method: Literal["POST", "MULTIPART"]
+    url: Optional[str] = None
+    fields: Optional[Dict[str, str]] = None
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    parts: Optional[List[PresignedPart]] = None
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class CompleteUploadRequest(BaseModel):
+    key: str
+    upload_id: str
+    parts: List[UploadedPart] = Field(min_length=1)
+
+class FinalizeMediaRequest(BaseModel):
+    kind: Literal["image", "video"]
+    key: str
+    size: Optional[int] = None
+
+# 카탈로그 일괄 등록 결과 (errors 는 CATALOG_MAX_REPORTED_ERRORS 개까지만 담는다)
+class CatalogImportError(BaseModel):
+    line: int
+    error: str
+
+class CatalogImportReport(BaseModel):
+    inserted: int
+    categories_created: int
+    error_count: int
+    errors: List[CatalogImportError]
+
+# 카탈로그 패싯 (GET /api/items/facets)
+class CategoryFacetSchema(BaseModel):
+    category_id: int
+    name: Optional[str] = None
+    item_count: int
+
+class PriceBucketSchema(BaseModel):
+    min_price: int
+    max_price: Optional[int] = None  # 마지막 구간은 상한 없음 (min_price 이상, max_price 미만)
+    item_count: int
+
+class ItemFacets(BaseModel):
+    categories: List[CategoryFacetSchema]
+    price_buckets: List[PriceBucketSchema]
+
+# 카테고리 제품 일괄 삭제 작업 (GET /api/purge-jobs/{id} 로 진행 상황 확인)
+class PurgeJobSchema(BaseModel):
+    id: int
+    category_name: str
+    status: str
+    items_total: int
+    items_deleted: int
+    orders_deleted: int
+    orders_archived: int
+    reviews_deleted: int
+    gpu_jobs_deleted: int
+    s3_objects_deleted: int
+    s3_errors: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+# 매출 리포트 (집계 테이블 기준, 기간은 UTC 날짜로 start~end 포함)
+class SalesTotalsSchema(BaseModel):
+    units: int
+    revenue: int
+    paid_count: int
+    unpaid_count: int
+    paid_revenue: int
+
+class ItemSalesSchema(SalesTotalsSchema):
+    item_id: int
+
+class CategorySalesSchema(SalesTotalsSchema):
+    category_id: int
+    day: Optional[date] = None
+
+class TopItemsReport(BaseModel):
+    start: date
+    end: date
+    items: List[ItemSalesSchema]
+
+class CategoryRevenueReport(BaseModel):
+    start: date
+    end: date
+    categories: List[CategorySalesSchema]
@@ -0,0 +1,158 @@
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# 제품명/설명 전문 검색 인덱스 (SQLite FTS5)
+# - items_fts: trigram 토크나이저, 3글자 이상 검색어의 부분 문자열 검색 (한글 포함)
+# - items_fts_prefix: 단어 접두어 인덱스, 1~2글자 검색어에서 단어 앞부분이 맞는 제품을 빠르게 찾는다
+#   (trigram 으로 찾을 수 없는 1~2글자 부분 문자열은 LIKE 로 찾는다, 아래 SEARCH_LIKE_SCAN_LIMIT 참고)
+# 두 테이블 모두 items 를 content 로 쓰고, 트리거가 items 의 INSERT/UPDATE/DELETE 를 그대로 반영한다.
+SEARCH_TABLES = {
+    "items_fts": "tokenize='trigram'",
+    "items_fts_prefix": "tokenize='unicode61', prefix='1 2'",
+}
+
+# bm25 가중치: 제품명이 설명보다 중요하다
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+TRIGRAM_MIN_LENGTH = 3
+# 검색어가 모두 1~2글자일 때 LIKE 부분 일치를 확인하는 최신 제품 수 (0 이면 단어 접두어만 찾는다)
+# 인덱스로 찾을 수 없는 검색이므로 전체 테이블 대신 id 가 큰 제품부터 이만큼만 읽는다.
+# 3글자 이상 단어가 함께 있으면 trigram 으로 찾은 제품만 LIKE 로 거르므로 제한이 없다.
+SEARCH_LIKE_SCAN_LIMIT = max(int(os.getenv("SEARCH_LIKE_SCAN_LIMIT", 10000)), 0)
+
+_search_index_enabled = {}
+
+
+def create_search_index(conn):
+    if conn.dialect.name != "sqlite":
+        # PostgreSQL 은 pg_trgm GIN 인덱스로 ilike 검색을 인덱스로 처리한다
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_items_name_trgm ON items USING gin (name gin_trgm_ops)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_items_description_trgm ON items USING gin (description gin_trgm_ops)"))
+        return
+
+    for table, options in SEARCH_TABLES.items():
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"name, description, content='items', content_rowid='id', {options})"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON items BEGIN "
+            f"INSERT INTO {table}(rowid, name, description) VALUES (new.id, new.name, new.description); "
+            f"END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON items BEGIN "
+            f"INSERT INTO {table}({table}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+            f"END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF name, description ON items BEGIN "
+            f"INSERT INTO {table}({table}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+            f"INSERT INTO {table}(rowid, name, description) VALUES (new.id, new.name, new.description); "
+            f"END"
+        ))
+        # 기존 데이터로 인덱스 채우기
+        conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+
+
+# 현재 DB 에 FTS 인덱스가 있는지 (엔진별로 한 번만 확인)
+def search_index_enabled(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _search_index_enabled:
+        if bind.dialect.name != "sqlite":
+            _search_index_enabled[key] = False
+        else:
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'")
+            ).first()
+            _search_index_enabled[key] = found is not None
+    return _search_index_enabled[key]
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+# 검색어를 FTS5 MATCH 식으로 바꾼다.
+# 3글자 이상 단어는 trigram MATCH 식으로, 1~2글자 단어는 trigram 으로 찾을 수 없으므로 LIKE '%단어%' 패턴으로 돌려준다.
+def build_match_query(query: str):
+    terms = query.split()
+    match = " AND ".join(_quote(term) for term in terms if len(term) >= TRIGRAM_MIN_LENGTH) or None
+    patterns = [_like_pattern(term) for term in terms if len(term) < TRIGRAM_MIN_LENGTH]
+    return match, patterns
+
+
+# 모든 단어의 단어 접두어 MATCH 식 (items_fts_prefix 용)
+def build_prefix_query(query: str):
+    return " AND ".join(_quote(term) + "*" for term in query.split()) or None
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _select(db: Session, sql: str, columns, params: dict):
+    statement = text(sql).columns(*[column.expression for column in columns])
+    return db.execute(statement, params).all()
+
+
+# 관련도(bm25) 순으로 제품 검색 (columns 로 지정한 items 컬럼만 튜플로 돌려준다)
+# 1~2글자 단어가 있으면 제품명/설명 부분 일치(LIKE)로 찾는다. 단어 접두어가 맞는 제품을 먼저 보여 주고,
+# 그 페이지가 접두어 인덱스만으로 채워지면 LIKE 검색을 건너뛴다.
+# LIKE 는 trigram 결과나 최신 SEARCH_LIKE_SCAN_LIMIT 개 제품에만 적용한다 (제한 없는 전체 스캔은 하지 않는다).
+def search_items(db: Session, query: str, columns, skip: int = 0, limit: int = 100):
+    match, patterns = build_match_query(query)
+    if match is None and not patterns:
+        return []
+    select_list = ", ".join(f"items.{column.key}" for column in columns)
+    params = {"match": match, "limit": limit, "skip": skip}
+    if not patterns:
+        return _select(db, (
+            f"SELECT {select_list} FROM items_fts JOIN items ON items.id = items_fts.rowid "
+            f"WHERE items_fts MATCH :match "
+            f"ORDER BY bm25(items_fts, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}), items.id "
+            f"LIMIT :limit OFFSET :skip"
+        ), columns, params)
+
+    params["prefix"] = build_prefix_query(query)
+    prefix_rows = _select(db, (
+        f"SELECT {select_list} FROM items_fts_prefix JOIN items ON items.id = items_fts_prefix.rowid "
+        f"WHERE items_fts_prefix MATCH :prefix "
+        f"ORDER BY bm25(items_fts_prefix, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}), items.id "
+        f"LIMIT :limit OFFSET :skip"
+    ), columns, params)
+    if len(prefix_rows) >= limit or (match is None and not SEARCH_LIKE_SCAN_LIMIT):
+        return prefix_rows
+
+    # LIKE 를 확인할 후보: trigram 으로 찾은 제품, 없으면 최신 SEARCH_LIKE_SCAN_LIMIT 개 제품
+    if match is not None:
+        candidates = (
+            "SELECT items.id, items.name, items.description FROM items_fts "
+            "JOIN items ON items.id = items_fts.rowid WHERE items_fts MATCH :match"
+        )
+    else:
+        params["scan_limit"] = SEARCH_LIKE_SCAN_LIMIT
+        candidates = "SELECT id, name, description FROM items ORDER BY id DESC LIMIT :scan_limit"
+    conditions = []
+    for i, pattern in enumerate(patterns):
+        params[f"pattern_{i}"] = pattern
+        conditions.append(
+            f"(candidates.name LIKE :pattern_{i} ESCAPE '\\' OR candidates.description LIKE :pattern_{i} ESCAPE '\\')"
+        )
+    # 접두어 검색 결과와 같은 순서를 유지하도록 접두어가 맞는 제품을 bm25 순으로 앞에 둔다
+    return _select(db, (
+        f"WITH prefix AS ("
+        f"SELECT rowid, bm25(items_fts_prefix, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank "
+        f"FROM items_fts_prefix WHERE items_fts_prefix MATCH :prefix), "
+        f"candidates AS ({candidates}), "
+        f"found AS (SELECT rowid AS id FROM prefix UNION SELECT id FROM candidates WHERE {' AND '.join(conditions)}) "
+        f"SELECT {select_list} FROM found JOIN items ON items.id = found.id LEFT JOIN prefix ON prefix.rowid = items.id "
+        f"ORDER BY prefix.rank IS NULL, prefix.rank, items.id "
+        f"LIMIT :limit OFFSET :skip"
+    ), columns, params)
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# 앱 모듈은 import 시점에 환경 변수를 읽으므로 먼저 설정한다 (임시 SQLite DB, 외부 서비스 없음)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.update({
+    "DB_URL": f"sqlite:///{tempfile.mkdtemp(prefix='shop-tests-')}/test.db",
+    "GPU_SERVER_URL": "http://gpu-stub",
+    "GPU_WORKER_ENABLED": "false",
+    "WARMUP_ENABLED": "false",
+    "S3_BUCKET": "test-bucket",
+    "S3_REGION": "ap-northeast-2",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+})
+for name in ("DB_READ_URL", "CACHE_URL", "WS_BROKER_URL", "S3_ENDPOINT_URL"):
+    os.environ.pop(name, None)
+
+import httpx
+import pytest
+from sqlalchemy import delete
+
+import cache
+import gpu
+import gpu_stub
+import migrations
+import models
+import websocket
+from database import Base, SessionLocal, async_engine, engine
+
+migrations.migrate(engine)
+
+
+# 테스트마다 빈 DB 와 빈 캐시로 시작한다
+@pytest.fixture(autouse=True)
+def clean_state():
+    cache.set_backend(cache.LRUTTLCache())
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+
+
+# 코루틴을 새 이벤트 루프에서 실행하고, 루프에 묶인 허브/HTTP 클라이언트/비동기 커넥션을 정리한다
+@pytest.fixture
+def run():
+    async def wrapped(coro):
+        try:
+            return await coro
+        finally:
+            await websocket.hub.close()
+            await gpu.close_http_client()
+            await async_engine.dispose()
+
+    return lambda coro: asyncio.run(wrapped(coro))
+
+
+# gpu.py 의 HTTP 클라이언트를 프로세스 안의 gpu_stub 앱으로 보낸다 (처리 시간 0, 실패 없음으로 시작)
+@pytest.fixture
+def gpu_server(monkeypatch):
+    def get_http_client():
+        if gpu._http_client is None or gpu._http_client.is_closed:
+            gpu._http_client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=gpu_stub.app), base_url="http://gpu-stub"
+            )
+        return gpu._http_client
+
+    monkeypatch.setattr(gpu, "get_http_client", get_http_client)
+    monkeypatch.setattr(gpu_stub, "STUB_PROCESS_SECONDS", 0)
+    monkeypatch.setattr(gpu_stub, "_failures_left", 0)
+    monkeypatch.setattr(gpu_stub, "progress", {"progress": 0, "elapsed_time": 0, "remain_time": 0})
+    gpu_stub.received.clear()
+    return gpu_stub
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def item(db):
+    category = models.Category(name="furniture")
+    db.add(category)
+    db.flush()
+    db_item = models.Item(name="chair", description="wooden chair", price=30000, category_id=category.id)
+    db.add(db_item)
+    db.commit()
+    return db_item
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+import idempotency
+import main
+import models
+from database import engine
+
+
+def test_retry_on_another_worker_replays_first_response(db, item, monkeypatch):
+    user = models.User(email="buyer@example.com")
+    db.add(user)
+    db.commit()
+    client = TestClient(main.app)
+    order = {"user_id": user.id, "item_id": item.id, "price": 0, "count": 2, "pay": False}
+    headers = {"Idempotency-Key": "order-1"}
+
+    # 워커마다 저장소 객체가 따로 있어도 같은 DB 테이블을 본다
+    monkeypatch.setattr(idempotency, "store", idempotency.DatabaseStore(engine))
+    first = client.post("/api/order/", json=order, headers=headers)
+    monkeypatch.setattr(idempotency, "store", idempotency.DatabaseStore(engine))
+    retry = client.post("/api/order/", json=order, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert client.post("/api/order/", json={**order, "count": 3}, headers=headers).status_code == 422
+    assert db.query(models.Order).count() == 1
+
+
+def test_expired_keys_are_reused_and_swept(db):
+    store = idempotency.DatabaseStore(engine, ttl=60)
+    assert store.add("order:a", {"done": False})
+    assert not store.add("order:a", {"done": False})
+    store.set("order:a", {"done": True})
+    assert store.get("order:a") == {"done": True}
+
+    db.execute(update(models.IdempotencyKey).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    assert store.get("order:a") is None
+    assert store.add("order:a", {"done": False})
+
+    assert store.add("order:b", {"done": False}, ttl=-1)
+    store.sweep(force=True)
+    assert [key for (key,) in db.query(models.IdempotencyKey.key)] == ["order:a"]
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import update
+
+import crud
+import jobs
+import models
+from database import SessionLocal
+
+
+def enqueue(item, video_uuid="video-1"):
+    with SessionLocal() as db:
+        job = jobs.enqueue(db, item.id, f"https://test-bucket.s3.amazonaws.com/{video_uuid}.mp4")
+        db.commit()
+        return job.id
+
+
+def load_job(job_id) -> models.GpuJob:
+    with SessionLocal() as db:
+        return db.get(models.GpuJob, job_id)
+
+
+def make_runnable(job_id):
+    with SessionLocal() as db:
+        db.execute(update(models.GpuJob).where(models.GpuJob.id == job_id).values(next_attempt_at=datetime.utcnow()))
+        db.commit()
+
+
+def test_failed_send_is_retried_after_backoff(run, gpu_server, item, db):
+    gpu_server._failures_left = 1
+    job_id = enqueue(item)
+
+    async def first_attempt():
+        claimed = await jobs.claim_jobs(1)
+        assert [job.id for job in claimed] == [job_id]
+        assert claimed[0].status == "processing"
+        await jobs.run_job(claimed[0])
+        # 백오프가 끝나기 전에는 다시 가져가지 않는다
+        return await jobs.claim_jobs(1)
+
+    assert run(first_attempt()) == []
+    job = load_job(job_id)
+    assert (job.status, job.attempts, job.locked_until) == ("queued", 1, None)
+    assert "500" in job.last_error
+    assert job.next_attempt_at > datetime.utcnow()
+    assert gpu_server.received == []
+
+    make_runnable(job_id)
+
+    async def second_attempt():
+        for claimed in await jobs.claim_jobs(1):
+            await jobs.run_job(claimed)
+
+    run(second_attempt())
+    job = load_job(job_id)
+    assert (job.status, job.attempts, job.last_error) == ("sent", 2, None)
+    assert gpu_server.received == [{"item_id": item.id, "video_uuid": "video-1"}]
+
+    # GPU 서버가 결과를 올리면 작업이 끝난다
+    db_item = crud.receive_splat(db, item.id, "video-1")
+    assert db_item.splat.endswith("/video-1.ply")
+    assert load_job(job_id).status == "done"
+
+
+def test_expired_lease_is_claimed_again(run, gpu_server, item, monkeypatch):
+    monkeypatch.setattr(jobs, "GPU_JOB_LEASE", 0.05)
+    job_id = enqueue(item)
+
+    async def claim_twice():
+        first = await jobs.claim_jobs(1)
+        # 다른 워커가 점유 중인 작업은 가져가지 않는다
+        during_lease = await jobs.claim_jobs(1)
+        await asyncio.sleep(0.1)
+        # 점유한 워커가 사라지고 점유 시간이 지나면 다시 가져간다
+        after_lease = await jobs.claim_jobs(1)
+        return first, during_lease, after_lease
+
+    first, during_lease, after_lease = run(claim_twice())
+    assert [job.id for job in first] == [job_id]
+    assert during_lease == []
+    assert [job.id for job in after_lease] == [job_id]
+
+
+def test_result_arriving_during_send_keeps_job_done(run, gpu_server, item, db):
+    job_id = enqueue(item)
+
+    async def claim():
+        return await jobs.claim_jobs(1)
+
+    claimed = run(claim())
+    crud.receive_splat(db, item.id, "video-1")
+
+    async def send():
+        await jobs.run_job(claimed[0])
+
+    run(send())
+    job = load_job(job_id)
+    assert (job.status, job.attempts) == ("done", 0)
+
+
+def test_job_fails_after_max_attempts(run, gpu_server, item, monkeypatch):
+    monkeypatch.setattr(jobs, "GPU_JOB_MAX_ATTEMPTS", 2)
+    gpu_server._failures_left = 5
+    job_id = enqueue(item)
+
+    async def attempt():
+        for claimed in await jobs.claim_jobs(1):
+            await jobs.run_job(claimed)
+
+    run(attempt())
+    assert load_job(job_id).status == "queued"
+    make_runnable(job_id)
+    run(attempt())
+
+    job = load_job(job_id)
+    assert (job.status, job.attempts) == ("failed", 2)
+    make_runnable(job_id)
+    assert run(jobs.claim_jobs(1)) == []
+
+
+def test_worker_drains_queue_with_retries(run, gpu_server, item, monkeypatch):
+    monkeypatch.setattr(jobs, "GPU_WORKER_CONCURRENCY", 2)
+    monkeypatch.setattr(jobs, "GPU_WORKER_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(jobs, "GPU_JOB_RETRY_BASE", 0.01)
+    # 워커가 만든 이벤트/루프는 테스트가 끝나면 되돌린다
+    monkeypatch.setattr(jobs, "_wakeup", None)
+    monkeypatch.setattr(jobs, "_loop", None)
+    gpu_server._failures_left = 2
+    job_ids = [enqueue(item, f"video-{i}") for i in range(3)]
+
+    async def drain():
+        worker = jobs.start_worker()
+        try:
+            deadline = asyncio.get_running_loop().time() + 5
+            while any(load_job(job_id).status != "sent" for job_id in job_ids):
+                assert asyncio.get_running_loop().time() < deadline, "worker did not drain the queue"
+                await asyncio.sleep(0.02)
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+
+    run(drain())
+    assert sorted(payload["video_uuid"] for payload in gpu_server.received) == ["video-0", "video-1", "video-2"]
+    assert sum(load_job(job_id).attempts for job_id in job_ids) == 5
@@ -0,0 +1,53 @@
+from sqlalchemy import select
+
+import crud
+import models
+import purge
+import reports
+import schemas
+
+
+def rollups(db):
+    return {
+        model.__tablename__: sorted(tuple(row) for row in db.execute(select(*model.__table__.c)).all())
+        for model, _ in reports.ROLLUPS
+    }
+
+
+def test_purge_archives_orders_and_keeps_rollups_rebuildable(db, item, monkeypatch):
+    monkeypatch.setattr(purge, "PURGE_BATCH_PAUSE", 0)
+    user = models.User(email="buyer@example.com")
+    kept_category = models.Category(name="kitchen")
+    db.add_all([user, kept_category])
+    db.flush()
+    kept = models.Item(name="cup", description="", price=5000, category_id=kept_category.id)
+    db.add(kept)
+    db.commit()
+
+    orders = crud.create_orders_batch(db, [
+        schemas.OrderLineSchema(user_id=user.id, item_id=item.id, count=2),
+        schemas.OrderLineSchema(user_id=user.id, item_id=item.id, count=1, pay=True),
+        schemas.OrderLineSchema(user_id=user.id, item_id=kept.id, count=3),
+    ])
+    crud.update_order_payment(db, orders[0].id)
+    before = rollups(db)
+    item_id, category_id = item.id, item.category_id
+
+    job, _ = purge.create_job(db, "furniture")
+    purge.run_job(job.id)
+    db.expire_all()
+
+    job = db.get(models.PurgeJob, job.id)
+    assert (job.status, job.items_deleted, job.orders_archived) == ("done", 1, 2)
+    archived = db.execute(select(models.ArchivedOrder).order_by(models.ArchivedOrder.id)).scalars().all()
+    assert [(order.id, order.item_id, order.category_id, order.pay) for order in archived] == [
+        (orders[0].id, item_id, category_id, True),
+        (orders[1].id, item_id, category_id, True),
+    ]
+    assert db.query(models.Order).count() == 1
+
+    # 지워진 제품의 매출은 집계에 남고, orders 에서 다시 계산해도 같다
+    assert rollups(db) == before
+    reports.rebuild_sales_rollups(db)
+    db.commit()
+    assert rollups(db) == before
@@ -0,0 +1,30 @@
+import pytest
+
+import crud
+import models
+import search
+
+
+@pytest.fixture
+def phones(db):
+    names = ["구형스마트폰", "폰케이스", "최신스마트폰"]
+    db.add_all([models.Item(name=name, description="", price=1000) for name in names])
+    db.commit()
+
+
+def found(db, query):
+    return [row.name for row in crud.search_items_by_name(db, query)]
+
+
+def test_short_terms_match_word_prefixes_first_then_substrings(db, phones):
+    assert found(db, "폰") == ["폰케이스", "구형스마트폰", "최신스마트폰"]
+
+
+def test_short_term_substring_scan_is_limited_to_newest_items(db, phones, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_LIKE_SCAN_LIMIT", 1)
+    assert found(db, "폰") == ["폰케이스", "최신스마트폰"]
+    # 3글자 이상 단어가 있으면 trigram 결과 안에서 찾으므로 제한과 상관없다
+    assert found(db, "폰 스마트") == ["구형스마트폰", "최신스마트폰"]
+
+    monkeypatch.setattr(search, "SEARCH_LIKE_SCAN_LIMIT", 0)
+    assert found(db, "폰") == ["폰케이스"]
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import os
+
+import pytest
+import requests
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from moto import mock_aws
+from starlette.datastructures import Headers
+
+import crud
+import main
+import models
+
+PART_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(crud, "S3_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(crud, "S3_MAX_CONCURRENT_PARTS", 2)
+    with mock_aws():
+        crud.close_s3_client()
+        client = crud.get_s3_client()
+        client.create_bucket(Bucket=crud.bucket_name, CreateBucketConfiguration={"LocationConstraint": "ap-northeast-2"})
+        yield client
+        crud.close_s3_client()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def upload_file(data: bytes, filename: str, content_type: str) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename, headers=Headers({"content-type": content_type}))
+
+
+def stored_object(s3, url: str):
+    s3_key = url.rsplit("/", 1)[-1]
+    response = s3.get_object(Bucket=crud.bucket_name, Key=s3_key)
+    return response["Body"].read(), response["ContentType"]
+
+
+def open_uploads(s3):
+    return s3.list_multipart_uploads(Bucket=crud.bucket_name).get("Uploads", [])
+
+
+def test_small_file_is_uploaded_in_one_request(s3):
+    url = asyncio.run(crud.upload_file_to_s3_streaming(upload_file(b"jpeg bytes", "photo.jpg", "image/jpeg")))
+    assert url.endswith(".jpg")
+    assert stored_object(s3, url) == (b"jpeg bytes", "image/jpeg")
+
+
+def test_large_file_is_uploaded_in_parts(s3):
+    data = os.urandom(PART_SIZE * 2 + 123)
+    url = asyncio.run(crud.upload_file_to_s3_streaming(upload_file(data, "clip.mp4", "video/mp4")))
+    assert stored_object(s3, url) == (data, "video/mp4")
+    assert open_uploads(s3) == []
+
+
+def test_failed_part_aborts_multipart_upload(s3, monkeypatch):
+    upload_part = s3.upload_part
+
+    def fail_second_part(**params):
+        if params["PartNumber"] == 2:
+            raise ConnectionError("connection reset")
+        return upload_part(**params)
+
+    monkeypatch.setattr(s3, "upload_part", fail_second_part)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(crud.upload_file_to_s3_streaming(upload_file(os.urandom(PART_SIZE * 3), "clip.mp4", "video/mp4")))
+    assert error.value.status_code == 500
+    assert open_uploads(s3) == []
+
+
+def test_presigned_post_upload_and_finalize_image(s3, client, item, monkeypatch):
+    processed = []
+    monkeypatch.setattr(main.media, "process_image", lambda item_id, image_url: processed.append((item_id, image_url)))
+    presign = client.post("/api/uploads/presign", json={
+        "item_id": item.id, "kind": "image", "filename": "photo.png", "content_type": "image/png", "size": 4,
+    }).json()
+    assert presign["method"] == "POST"
+    assert presign["key"].startswith(f"item-{item.id}-")
+
+    uploaded = requests.post(presign["url"], data=presign["fields"], files={"file": ("photo.png", b"\x89PNG")})
+    assert uploaded.status_code in (200, 204)
+
+    response = client.post(f"/api/items/{item.id}/media", json={"kind": "image", "key": presign["key"], "size": 4})
+    assert response.status_code == 200
+    assert response.json()["image"].endswith(presign["key"])
+    assert processed == [(item.id, response.json()["image"])]
+
+
+def test_presigned_multipart_upload_and_finalize_video(s3, client, item, db):
+    data = os.urandom(PART_SIZE * 2 + 1)
+    presign = client.post("/api/uploads/presign", json={
+        "item_id": item.id, "kind": "video", "filename": "clip.mp4", "content_type": "video/mp4", "size": len(data),
+    }).json()
+    assert presign["method"] == "MULTIPART"
+    assert presign["part_size"] == PART_SIZE
+    assert [part["part_number"] for part in presign["parts"]] == [1, 2, 3]
+
+    parts = []
+    for part in presign["parts"]:
+        start = (part["part_number"] - 1) * presign["part_size"]
+        uploaded = requests.put(part["url"], data=data[start:start + presign["part_size"]])
+        assert uploaded.status_code == 200
+        parts.append({"part_number": part["part_number"], "etag": uploaded.headers["ETag"]})
+
+    completed = client.post("/api/uploads/complete", json={
+        "key": presign["key"], "upload_id": presign["upload_id"], "parts": list(reversed(parts)),
+    })
+    assert completed.status_code == 200
+    assert stored_object(s3, presign["key"]) == (data, "video/mp4")
+
+    response = client.post(f"/api/items/{item.id}/media", json={"kind": "video", "key": presign["key"], "size": len(data)})
+    assert response.status_code == 200
+    job = db.query(models.GpuJob).filter(models.GpuJob.item_id == item.id).one()
+    assert (job.status, job.video_uuid) == ("queued", presign["key"].split(".")[0])
+
+    # 같은 동영상을 다시 등록해도 GPU 작업이 하나 더 생기지 않는다
+    again = client.post(f"/api/items/{item.id}/media", json={"kind": "video", "key": presign["key"], "size": len(data)})
+    assert again.status_code == 409
+    assert db.query(models.GpuJob).filter(models.GpuJob.item_id == item.id).count() == 1
+
+
+def test_presign_rejects_wrong_content_type_and_unknown_item(s3, client, item):
+    response = client.post("/api/uploads/presign", json={
+        "item_id": item.id, "kind": "video", "filename": "clip.mp4", "content_type": "image/png", "size": 10,
+    })
+    assert response.status_code == 400
+    response = client.post("/api/uploads/presign", json={
+        "item_id": 999, "kind": "video", "filename": "clip.mp4", "content_type": "video/mp4", "size": 10,
+    })
+    assert response.status_code == 404
+
+
+def test_complete_with_unknown_part_is_400(s3, client):
+    upload_id = s3.create_multipart_upload(Bucket=crud.bucket_name, Key="clip.mp4", ContentType="video/mp4")["UploadId"]
+    response = client.post("/api/uploads/complete", json={
+        "key": "clip.mp4", "upload_id": upload_id, "parts": [{"part_number": 1, "etag": "etag"}],
+    })
+    assert response.status_code == 400
+    assert open_uploads(s3) != []
+
+
+def test_finalize_checks_uploaded_object(s3, client, item, db):
+    key = f"{crud.item_media_key_prefix(item.id)}clip.mp4"
+    s3.put_object(Bucket=crud.bucket_name, Key=key, Body=b"video", ContentType="video/mp4")
+    s3.put_object(Bucket=crud.bucket_name, Key="clip.mp4", Body=b"video", ContentType="video/mp4")
+
+    def finalize(item_id, **request):
+        return client.post(f"/api/items/{item_id}/media", json=request).status_code
+
+    assert finalize(item.id, kind="video", key=f"{crud.item_media_key_prefix(item.id)}missing.mp4") == 400
+    assert finalize(item.id, kind="video", key=key, size=6) == 400
+    assert finalize(item.id, kind="image", key=key) == 400
+    assert finalize(999, kind="video", key=key) == 404
+    # 다른 제품용으로 발급한 키나 직접 고른 키는 등록할 수 없다
+    assert finalize(item.id, kind="video", key="clip.mp4") == 400
+    assert finalize(item.id, kind="video", key=f"{crud.item_media_key_prefix(item.id + 1)}clip.mp4") == 400
+
+    db.refresh(item)
+    assert (item.image, item.video) == (None, None)
+    assert db.query(models.GpuJob).count() == 0
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import fakeredis
+import httpx
+import pytest
+
+import websocket
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, message: str):
+        self.sent.append(json.loads(message))
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def redis_hub(server) -> websocket.Hub:
+    return websocket.Hub(websocket.RedisBroker(fakeredis.FakeAsyncRedis(server=server)))
+
+
+async def wait_until(predicate, timeout: float = 3):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def item_message(item_id, event, data) -> str:
+    return websocket.event_message(websocket.item_topic(item_id), event, data)
+
+
+def test_progress_does_not_overwrite_pending_job_event(run, redis_server, gpu_server):
+    topic = websocket.item_topic(1)
+
+    async def scenario():
+        hub = redis_hub(redis_server)
+        await hub.start()
+        connection = websocket.Connection(FakeWebSocket())
+        hub.subscribe(connection, topic)
+        try:
+            # 전송 작업이 돌기 전에 진행 상황, 작업 완료, 새 진행 상황이 연달아 온다
+            await hub.publish(topic, item_message(1, "progress", {"progress": 10}))
+            await hub.publish(topic, item_message(1, "job", {"status": "done"}))
+            latest = item_message(1, "progress", {"progress": 20})
+            await hub.publish(topic, latest)
+            await wait_until(lambda: hub.last_messages.get(topic, {}).get("progress") == latest)
+
+            sender = asyncio.create_task(connection.run_sender())
+            await wait_until(lambda: len(connection.websocket.sent) == 2)
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            return connection.websocket.sent
+        finally:
+            await hub.close()
+
+    sent = run(scenario())
+    assert [(message["event"], message["data"]) for message in sent] == [
+        ("progress", {"progress": 20}),
+        ("job", {"status": "done"}),
+    ]
+
+
+def test_events_reach_subscribers_on_other_workers(run, redis_server, gpu_server):
+    topic = websocket.item_topic(7)
+
+    async def scenario():
+        publisher, subscriber = redis_hub(redis_server), redis_hub(redis_server)
+        await publisher.start()
+        await subscriber.start()
+        connection = websocket.Connection(FakeWebSocket())
+        subscriber.subscribe(connection, topic)
+        sender = asyncio.create_task(connection.run_sender())
+        try:
+            await publisher.publish(topic, item_message(7, "job", {"status": "sent"}))
+            # 같은 메시지가 다시 오면 (여러 워커가 같은 진행 상황을 올린 경우) 한 번만 보낸다
+            await publisher.publish(topic, item_message(7, "progress", {"progress": 50}))
+            await publisher.publish(topic, item_message(7, "progress", {"progress": 50}))
+            await publisher.publish(topic, item_message(7, "job", {"status": "done"}))
+            await wait_until(lambda: any(message["data"] == {"status": "done"} for message in connection.websocket.sent))
+            await asyncio.sleep(0.05)
+            return connection.websocket.sent
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            await publisher.close()
+            await subscriber.close()
+
+    sent = run(scenario())
+    assert [(message["event"], message["data"]) for message in sent] == [
+        ("job", {"status": "sent"}),
+        ("progress", {"progress": 50}),
+        ("job", {"status": "done"}),
+    ]
+
+
+def test_late_subscriber_receives_last_message_of_each_event(run, redis_server, gpu_server):
+    topic = websocket.item_topic(3)
+
+    async def scenario():
+        hub = redis_hub(redis_server)
+        await hub.start()
+        try:
+            await hub.publish(topic, item_message(3, "job", {"status": "sent"}))
+            await hub.publish(topic, item_message(3, "progress", {"progress": 90}))
+            await wait_until(lambda: len(hub.last_messages.get(topic, {})) == 2)
+            connection = websocket.Connection(FakeWebSocket())
+            hub.subscribe(connection, topic)
+            return list(connection._pending)
+        finally:
+            await hub.close()
+
+    assert sorted(run(scenario())) == [(topic, "job"), (topic, "progress")]
+
+
+def test_full_queue_drops_progress_before_job_events(monkeypatch):
+    monkeypatch.setattr(websocket, "WS_SEND_QUEUE_SIZE", 2)
+    connection = websocket.Connection(FakeWebSocket())
+    connection.offer("item:1", "job", "job 1")
+    connection.offer("item:1", "progress", "progress 1")
+    connection.offer("item:2", "job", "job 2")
+    assert list(connection._pending.items()) == [(("item:1", "job"), "job 1"), (("item:2", "job"), "job 2")]
+
+    connection.offer("item:3", "job", "job 3")
+    assert list(connection._pending) == [("item:2", "job"), ("item:3", "job")]
+
+
+def test_progress_poll_backoff_starts_at_poll_interval(run, redis_server, monkeypatch):
+    monkeypatch.setattr(websocket, "PROGRESS_POLL_INTERVAL", 1)
+    monkeypatch.setattr(websocket, "PROGRESS_POLL_MAX_BACKOFF", 5)
+
+    async def get_progress():
+        raise httpx.ConnectError("gpu server down")
+
+    monkeypatch.setattr(websocket.gpu, "get_progress", get_progress)
+    hub = redis_hub(redis_server)
+    hub.subscribers[websocket.PROGRESS_TOPIC].add(object())
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == 5:
+            hub.subscribers.clear()
+
+    monkeypatch.setattr(websocket.asyncio, "sleep", sleep)
+    run(hub._poll_progress())
+    assert delays == [1, 2, 4, 5, 5]
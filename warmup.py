@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+import crud
+import gpu
+from database import engine, read_engine
+
+# 서버 시작 준비: 클라이언트와 DB 커넥션을 만들고 자주 읽는 카탈로그 페이지를 요청해 둔다.
+# 앱에 직접 요청을 보내므로 캐시는 실제 요청과 같은 키로 채워지고, FastAPI 가 첫 요청 때 만드는 라우트 정보도 미리 만들어진다.
+# 준비가 끝나야 /healthz/ready 가 200 을 돌려주므로 로드 밸런서는 준비된 워커에만 요청을 보낸다.
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# 미리 요청할 경로 (쉼표로 구분). 패싯은 카테고리 목록을 읽을 때 한 번 요청한다
+WARMUP_PATHS = [
+    path.strip()
+    for path in os.getenv("WARMUP_PATHS", "/api/items/,/api/items/?sort=rating,/api/items/?sort=newest").split(",")
+    if path.strip()
+]
+# 제품이 많은 순으로 첫 페이지를 미리 요청할 카테고리 수
+WARMUP_CATEGORIES = int(os.getenv("WARMUP_CATEGORIES", 10))
+
+_ready = False
+_seconds = None
+
+
+def _warm_connections():
+    for each in {engine, read_engine}:
+        with each.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+# 앱에 GET 요청을 보내고 (상태 코드, 본문) 을 돌려준다
+async def _get(app, target: str):
+    path, _, query = target.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"warmup")], "client": ("127.0.0.1", 0), "server": ("warmup", 80),
+    }
+    status, body = None, []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if status != 200:
+        print(f"Warmup GET {target} returned {status}")
+    return status, b"".join(body)
+
+
+async def _warm_catalog(app):
+    for target in WARMUP_PATHS:
+        await _get(app, target)
+    status, body = await _get(app, "/api/items/facets")
+    if status != 200 or WARMUP_CATEGORIES <= 0:
+        return
+    categories = sorted(json.loads(body)["categories"], key=lambda category: category["item_count"], reverse=True)
+    for category in categories[:WARMUP_CATEGORIES]:
+        await _get(app, f"/api/items/category/{category['category_id']}")
+
+
+# 서버 시작 후 백그라운드에서 실행한다. 실패해도 캐시가 빈 채로 요청을 받을 수 있으므로 준비 완료로 표시한다
+async def run(app):
+    global _ready, _seconds
+    start = time.perf_counter()
+    if WARMUP_ENABLED:
+        try:
+            gpu.get_http_client()
+            await run_in_threadpool(crud.get_s3_client)
+            await run_in_threadpool(_warm_connections)
+            await _warm_catalog(app)
+        except Exception as e:
+            print(f"Warmup failed: {e!r}")
+    _seconds = time.perf_counter() - start
+    _ready = True
+    print(f"Warmup done in {_seconds:.2f}s")
+
+
+def status() -> dict:
+    return {"ready": _ready, "warmup_seconds": None if _seconds is None else round(_seconds, 3)}
@@ -1,43 +1,415 @@
-import json
-from fastapi import FastAPI, WebSocket
 import asyncio
-import httpx
-import requests
+import json
+import os
+from collections import OrderedDict, defaultdict
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+import gpu
+import metrics
 
 app = FastAPI()
 
-# 클라이언트의 WebSocket 객체를 저장하는 딕셔너리
+# 진행 상황 폴링 주기(초)와 GPU 서버 오류 시 최대 대기 시간(초)
+PROGRESS_POLL_INTERVAL = float(os.getenv("GPU_PROGRESS_POLL_INTERVAL", 10))
+PROGRESS_POLL_MAX_BACKOFF = float(os.getenv("GPU_PROGRESS_POLL_MAX_BACKOFF", 60))
+
+# 워커 하나가 받는 최대 연결 수 (넘으면 1013 Try Again Later 로 닫는다)
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", 1000))
+# 연결마다 보내지 못하고 쌓아 두는 최대 토픽 수 (같은 토픽의 새 메시지는 이전 메시지를 덮어쓴다)
+WS_SEND_QUEUE_SIZE = max(int(os.getenv("WS_SEND_QUEUE_SIZE", 16)), 1)
+# 보낼 메시지가 없을 때 heartbeat 를 보내는 주기(초)
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", 20))
+# 메시지 하나를 보내는 데 이보다 오래 걸리는 느린 클라이언트는 끊는다
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 10))
+# 새 구독자에게 바로 보내 줄 토픽별 마지막 메시지를 몇 개까지 기억할지
+WS_LAST_MESSAGES = int(os.getenv("WS_LAST_MESSAGES", 10000))
+# redis://... 를 지정하면 워커끼리 메시지를 주고받는다 (없으면 프로세스 안에서만 전달)
+WS_BROKER_URL = os.getenv("WS_BROKER_URL")
+
+# GPU 서버 전체 진행 상황 ('send' 를 보낸 기존 클라이언트가 받는 토픽, 본문을 그대로 보낸다)
+PROGRESS_TOPIC = "progress"
+# 새 값이 오면 이전 값을 버려도 되는 이벤트 (작업 상태/스플랫 이벤트는 버리지 않는다)
+PROGRESS_EVENT = "progress"
+
+
+def item_topic(item_id) -> str:
+    return f"item:{item_id}"
+
+
+def video_topic(video_uuid) -> str:
+    return f"video:{video_uuid}"
+
+
+# ---------------------------------------------------------------------------
+# 브로커: 토픽 메시지를 모든 워커에 전달한다
+# 각 워커는 모든 토픽을 받고, 구독 중인 연결이 있는 토픽만 골라 보낸다.
+# ---------------------------------------------------------------------------
+
+# 프로세스 안에서만 전달 (워커 하나로 실행할 때, 기본값)
+class MemoryBroker:
+    def __init__(self):
+        self._queue = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+
+    async def publish(self, topic: str, message: str):
+        if self._queue is not None:
+            self._queue.put_nowait((topic, message))
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        self._queue = None
+
+
+# Redis 호환 pub/sub (redis.asyncio.Redis, fakeredis.FakeAsyncRedis 등)
+class RedisBroker:
+    def __init__(self, client, prefix: str = "ws:"):
+        self.client = client
+        self.prefix = prefix
+        self._pubsub = None
+
+    async def start(self):
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.psubscribe(self.prefix + "*")
+
+    async def publish(self, topic: str, message: str):
+        await self.client.publish(self.prefix + topic, message)
+
+    async def listen(self):
+        while True:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None or message["type"] != "pmessage":
+                continue
+            channel, data = message["channel"], message["data"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            if isinstance(data, bytes):
+                data = data.decode()
+            yield channel[len(self.prefix):], data
+
+    async def close(self):
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+def _create_broker():
+    if WS_BROKER_URL:
+        import redis.asyncio
+        return RedisBroker(redis.asyncio.Redis.from_url(WS_BROKER_URL))
+    return MemoryBroker()
+
+
+# ---------------------------------------------------------------------------
+# 연결: (토픽, 이벤트) 별 최신 메시지만 남기는 크기 제한 큐와 전송 작업
+# ---------------------------------------------------------------------------
+
+class Connection:
+    def __init__(self, websocket: WebSocket, heartbeat: bool = True):
+        self.websocket = websocket
+        self.topics = set()
+        # 'send' 로 구독한 기존 클라이언트는 진행 상황 본문만 받으므로 heartbeat 를 보내지 않는다
+        self.heartbeat = heartbeat
+        self._pending = OrderedDict()
+        self._ready = asyncio.Event()
+
+    # 보낼 메시지를 큐에 넣는다. 같은 토픽, 같은 이벤트의 보내지 못한 메시지는 새 메시지로 바꾼다
+    # (진행 상황이 작업 완료/스플랫 이벤트를 덮어쓰지 않는다).
+    # 큐가 가득 차면 가장 오래된 진행 상황을, 없으면 가장 오래된 메시지를 버린다 (느린 클라이언트가 서버 메모리를 잡지 않는다)
+    def offer(self, topic: str, event: str, message: str):
+        key = (topic, event)
+        if key in self._pending:
+            self._pending[key] = message
+            metrics.WS_MESSAGES_DROPPED.inc(reason="coalesced")
+        else:
+            if len(self._pending) >= WS_SEND_QUEUE_SIZE:
+                oldest = next((each for each in self._pending if each[1] == PROGRESS_EVENT), None)
+                if oldest is None:
+                    self._pending.popitem(last=False)
+                else:
+                    del self._pending[oldest]
+                metrics.WS_MESSAGES_DROPPED.inc(reason="queue_full")
+            self._pending[key] = message
+        self._ready.set()
+
+    async def run_sender(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=WS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                if self.heartbeat:
+                    await self._send(json.dumps({"event": "heartbeat"}))
+                continue
+            self._ready.clear()
+            while self._pending:
+                _, message = self._pending.popitem(last=False)
+                await self._send(message)
+
+    async def _send(self, message: str):
+        await asyncio.wait_for(self.websocket.send_text(message), timeout=WS_SEND_TIMEOUT)
+
+
+# ---------------------------------------------------------------------------
+# 허브: 토픽 구독 관리, 브로커에서 받은 메시지를 구독 중인 연결로 나눠 준다
+# ---------------------------------------------------------------------------
+
+class Hub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.subscribers = defaultdict(set)
+        # 토픽별 {이벤트: 마지막 메시지}: 새 구독자에게 바로 보내고, 여러 워커가 같은 진행 상황을 올려도 한 번만 전달한다
+        self.last_messages = OrderedDict()
+        self._listener = None
+        self._poller = None
+        self._loop = None
+
+    async def start(self):
+        if self._listener is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        await self.broker.start()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        for task in (self._poller, self._listener):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._poller = self._listener = self._loop = None
+        await self.broker.close()
+
+    async def _listen(self):
+        while True:
+            try:
+                async for topic, message in self.broker.listen():
+                    self._deliver(topic, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"WebSocket broker error: {e!r}")
+                await asyncio.sleep(1)
+
+    def _deliver(self, topic: str, message: str):
+        event = _event_of(topic, message)
+        last = self.last_messages.setdefault(topic, {})
+        self.last_messages.move_to_end(topic)
+        if last.get(event) == message:
+            return
+        last[event] = message
+        while len(self.last_messages) > WS_LAST_MESSAGES:
+            self.last_messages.popitem(last=False)
+        for connection in self.subscribers.get(topic, ()):
+            connection.offer(topic, event, message)
+
+    def subscribe(self, connection: Connection, topic: str):
+        if topic in connection.topics:
+            return
+        connection.topics.add(topic)
+        self.subscribers[topic].add(connection)
+        # 이미 받아 둔 메시지가 있으면 다음 갱신까지 기다리지 않고 바로 보낸다
+        for event, message in self.last_messages.get(topic, {}).items():
+            connection.offer(topic, event, message)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_progress())
+
+    def unsubscribe(self, connection: Connection, topic: str):
+        connection.topics.discard(topic)
+        subscribers = self.subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.subscribers[topic]
+        # 마지막 구독자가 나가면 폴링을 멈춘다
+        if not self.subscribers and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def disconnect(self, connection: Connection):
+        for topic in list(connection.topics):
+            self.unsubscribe(connection, topic)
+
+    async def publish(self, topic: str, message: str):
+        await self.start()
+        await self.broker.publish(topic, message)
+
+    # 스레드풀에서 도는 동기 코드용 (서버 이벤트 루프에 넘긴다, 허브가 시작되지 않았으면 버린다)
+    def publish_threadsafe(self, topic: str, message: str):
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.publish(topic, message), self._loop)
+        future.add_done_callback(_log_publish_error)
+
+    # 구독자가 있는 동안 GPU 서버를 조회해서 전체 진행 상황과 제품/동영상별 진행 상황을 올린다
+    async def _poll_progress(self):
+        import httpx
+        failures = 0
+        while self.subscribers:
+            try:
+                progress_info = await gpu.get_progress()
+            except httpx.HTTPError as e:
+                # GPU 서버 오류가 이어지면 조회 간격을 두 배씩 늘린다
+                failures += 1
+                delay = min(PROGRESS_POLL_INTERVAL * 2 ** (failures - 1), PROGRESS_POLL_MAX_BACKOFF)
+                print(f"Failed to get progress from GPU server (retry in {delay}s): {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            failures = 0
+            try:
+                await self.broker.publish(PROGRESS_TOPIC, progress_info)
+                for topic, message in progress_events(progress_info):
+                    await self.broker.publish(topic, message)
+            except Exception as e:
+                print(f"Failed to publish progress: {e!r}")
+            await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+
+
+def _log_publish_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Failed to publish WebSocket event: {future.exception()!r}")
+
+
+# 토픽 구독자에게 보내는 메시지 형식
+def event_message(topic: str, event: str, data) -> str:
+    return json.dumps({"topic": topic, "event": event, "data": data}, ensure_ascii=False)
+
+
+# 브로커에서 받은 메시지의 이벤트 이름 (전체 진행 상황 토픽은 GPU 서버 본문 그대로라 progress)
+def _event_of(topic: str, message: str) -> str:
+    if topic == PROGRESS_TOPIC:
+        return PROGRESS_EVENT
+    try:
+        return json.loads(message).get("event") or PROGRESS_EVENT
+    except (ValueError, AttributeError):
+        return PROGRESS_EVENT
+
+
+# GPU 서버 진행 상황에 item_id / video_uuid 가 있으면 해당 토픽으로도 보낸다
+def progress_events(progress_info: str):
+    try:
+        data = json.loads(progress_info)
+    except ValueError:
+        return []
+    if not isinstance(data, dict):
+        return []
+    topics = []
+    if data.get("item_id") is not None:
+        topics.append(item_topic(data["item_id"]))
+    if data.get("video_uuid"):
+        topics.append(video_topic(data["video_uuid"]))
+    return [(topic, event_message(topic, PROGRESS_EVENT, data)) for topic in topics]
+
+
+# 제품/동영상 토픽으로 이벤트 보내기 (GPU 작업 상태, 변환 완료 등)
+async def publish_item_event(item_id: int, event: str, data: dict, video_uuid: str = None):
+    for topic in _event_topics(item_id, video_uuid):
+        await hub.publish(topic, event_message(topic, event, data))
+
+
+def publish_item_event_threadsafe(item_id: int, event: str, data: dict, video_uuid: str = None):
+    for topic in _event_topics(item_id, video_uuid):
+        hub.publish_threadsafe(topic, event_message(topic, event, data))
+
+
+def _event_topics(item_id, video_uuid):
+    topics = [item_topic(item_id)]
+    if video_uuid:
+        topics.append(video_topic(video_uuid))
+    return topics
+
+
+hub = Hub(_create_broker())
+
+# 연결된 클라이언트 (id -> Connection), /metrics 의 websocket_connections
 client_connections = {}
 
+
+# 브로커 교체 (테스트에서 fakeredis 같은 로컬 대체재를 끼울 때)
+async def set_broker(broker):
+    global hub
+    await hub.close()
+    hub = Hub(broker)
+
+
+# 클라이언트 메시지 -> 구독할 토픽
+# 'send' 는 전체 진행 상황, JSON {"action": "subscribe" | "unsubscribe", "item_id": .., "video_uuid": ..}
+def _parse_request(data: str):
+    if data == "send":
+        return "subscribe", [PROGRESS_TOPIC]
+    try:
+        request = json.loads(data)
+    except ValueError:
+        return None, []
+    if not isinstance(request, dict) or request.get("action") not in ("subscribe", "unsubscribe"):
+        return None, []
+    topics = []
+    if request.get("item_id") is not None:
+        topics.append(item_topic(request["item_id"]))
+    if request.get("video_uuid"):
+        topics.append(video_topic(request["video_uuid"]))
+    return request["action"], topics
+
+
 # 웹 소켓 연결을 처리하는 핸들러
+# /ws?item_id=1&video_uuid=... 처럼 연결할 때 바로 구독할 수도 있다
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    try:
-        # 클라이언트의 WebSocket 객체를 저장
-        client_connections[id(websocket)] = websocket
+    if len(client_connections) >= WS_MAX_CONNECTIONS:
+        metrics.WS_CONNECTIONS_REJECTED.inc()
+        await websocket.close(code=1013)
+        return
 
-        # 클라이언트로부터 메시지를 수신하는 루프
-        while True:
-            # 클라이언트로부터 메시지 수신
-            data = await websocket.receive_text()
+    await hub.start()
+    connection = Connection(websocket, heartbeat=False)
+    client_connections[id(connection)] = connection
+    sender = asyncio.create_task(connection.run_sender())
+    receiver = asyncio.create_task(_receive(connection))
+    try:
+        params = websocket.query_params
+        for topic in ([item_topic(item_id) for item_id in params.getlist("item_id")]
+                      + [video_topic(video_uuid) for video_uuid in params.getlist("video_uuid")]):
+            connection.heartbeat = True
+            hub.subscribe(connection, topic)
 
-            # 클라이언트로부터 'send' 메시지를 수신했을 때마다 백그라운드 작업 시작
-            if data == "send":
-                await send_progress_until_done(websocket)
+        # 클라이언트가 끊거나, 느려서 전송이 WS_SEND_TIMEOUT 을 넘기면 끝난다
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                metrics.WS_SLOW_CLIENTS_CLOSED.inc()
+                try:
+                    await asyncio.wait_for(websocket.close(code=1008), timeout=WS_SEND_TIMEOUT)
+                except Exception:
+                    pass
+            elif error is not None and not isinstance(error, WebSocketDisconnect):
+                print(error)
     except Exception as e:
         print(e)
     finally:
-        # 연결이 종료되면 해당 WebSocket 객체를 딕셔너리에서 제거
-        del client_connections[id(websocket)]
+        # 서버가 요청 태스크를 취소해도 정리되도록 await 없이 정리한다
+        hub.disconnect(connection)
+        client_connections.pop(id(connection), None)
+        for task in (sender, receiver):
+            task.cancel()
 
-# 백그라운드 작업: 클라이언트에게 진행 상황을 보냄
-async def send_progress_until_done(websocket: WebSocket):
+
+async def _receive(connection: Connection):
     while True:
-        progress_info = await get_progress_from_gpu_server()
-        await websocket.send_text(progress_info)
-#    if progress_info["progress"] == 100:
-#        await websocket.close()
+        data = await connection.websocket.receive_text()
+        action, topics = _parse_request(data)
+        if data != "send" and action:
+            connection.heartbeat = True
+        for topic in topics:
+            if action == "subscribe":
+                hub.subscribe(connection, topic)
+            else:
+                hub.unsubscribe(connection, topic)
 
 
 #async def get_progress_from_gpu_server():
@@ -55,10 +427,3 @@ async def send_progress_until_done(websocket: WebSocket):
 #        progress += 10
 #        yield json.dumps(progress_info)  # JSON 형식으로 직렬화하여 반환
 #        await asyncio.sleep(2)
-
-async def get_progress_from_gpu_server():
-    response = requests.get("http://163.180.117.43:9003/api/proginfo")
-    progress_info = response.text  # JSON 형식의 응답을 파싱하여 진행 정보 추출
-    print(progress_info)
-    await asyncio.sleep(10)
-    return progress_info